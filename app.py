@@ -1,31 +1,50 @@
 """
 Outbound Engine MVP
 A lightweight web app for generating Cursor-specific outbound hypotheses and sequences.
+UI only: generation, prompts, providers and parsing live in the outbound_engine package.
 """
 
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 import os
 import io
-import re
+import sqlite3
+import threading
 import time
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from openai import OpenAI
-from dotenv import load_dotenv
-
-# Optional Gemini import
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
-    genai = None
-
-# Load environment variables (.env first, then local_secrets.env for saved API keys)
-load_dotenv()
+from outbound_engine import (
+    CsvExportError,
+    EngineConfig,
+    MemoryMemo,
+    StageGraph,
+    extract_personas_from_hypothesis,
+    load_persona_lanes,
+)
+from outbound_engine.config import WORKER_STORE_ENV
+from outbound_engine.parsing import build_lanes_zip
+from outbound_engine.graph import IN_FLIGHT
+from outbound_engine.prefetch import Prefetcher
+from outbound_engine.kb import kb_version
+from outbound_engine.session import SessionData
+from outbound_engine.session_jobs import FAILED, RUNNING, SessionJobs
+from outbound_engine.tracing import span
+from outbound_engine.providers import GEMINI_AVAILABLE, list_available_gemini_models, provider_stats
+from outbound_engine.validation import validate_sequence
+from outbound_engine.warmup import warm_up
+
+# Run history, the shared worker, near duplicates and Outreach are imported by the pages that use them,
+# so a session that never opens them doesn't load them.
+
+# Load environment variables (.env first, then local_secrets.env for saved API keys).
+# python-dotenv is only imported when there is a file to read (containers pass real env vars).
 _secrets_path = Path(__file__).parent / "local_secrets.env"
-if _secrets_path.exists():
-    load_dotenv(_secrets_path)
+if _secrets_path.exists() or any((folder / ".env").exists() for folder in (Path.cwd(), *Path.cwd().parents)):
+    from dotenv import load_dotenv
+    load_dotenv()
+    if _secrets_path.exists():
+        load_dotenv(_secrets_path)
 
 
 def _get_openai_key() -> str:
@@ -87,825 +106,78 @@ def _inject_streamlit_secrets_into_env():
         pass
 
 
-# Configure page
-st.set_page_config(
-    page_title="Outbound Engine",
-    page_icon="🎯",
-    layout="wide"
-)
-_inject_streamlit_secrets_into_env()
+# Warm color scheme. Base colors are set in .streamlit/config.toml; the rest of the styling lives in
+# static/theme.css, served once by Streamlit's static file server and cached by the browser, so each rerun
+# only re-sends a <link> tag instead of the whole stylesheet.
+THEME_CSS_PATH = Path(__file__).parent / "static" / "theme.css"
 
-# Inject warm color scheme CSS
-def inject_warm_styles():
-    """Inject warm, dynamic CSS styling for a more inviting UI."""
-    st.markdown("""
-    <style>
-    /* Dark theme color scheme */
-    :root {
-        --dark-bg: #1A1A1A;
-        --dark-bg-secondary: #242424;
-        --dark-bg-tertiary: #2D2D2D;
-        --dark-primary: #5B9BD5;
-        --dark-primary-dark: #4A8BC2;
-        --dark-accent: #FF6B6B;
-        --dark-accent-warm: #FF8C69;
-        --dark-text: #D0D0D0;
-        --dark-text-light: #B0B0B0;
-        --dark-text-muted: #888888;
-        --dark-border: #3A3A3A;
-        --dark-border-light: #4A4A4A;
-        --dark-shadow: rgba(0, 0, 0, 0.4);
-        --dark-shadow-light: rgba(0, 0, 0, 0.2);
-        --dark-card: #252525;
-        --dark-card-hover: #2D2D2D;
-    }
-    
-    /* Main background - dark gradient */
-    .stApp {
-        background: linear-gradient(135deg, #1A1A1A 0%, #242424 50%, #2D2D2D 100%);
-        min-height: 100vh;
-        color: var(--dark-text);
-    }
-    
-    /* Sidebar styling - dark theme */
-    [data-testid="stSidebar"] {
-        background: linear-gradient(180deg, #252525 0%, #1F1F1F 100%);
-        border-right: 2px solid var(--dark-border);
-        box-shadow: 2px 0 12px var(--dark-shadow);
-        color: var(--dark-text);
-        padding: 0.5rem 0.5rem 0.75rem 0.5rem !important;
-    }
-    
-    /* Remove top spacing from sidebar content */
-    [data-testid="stSidebar"] > div:first-child,
-    [data-testid="stSidebar"] .css-1d391kg,
-    [data-testid="stSidebar"] > div > div:first-child {
-        padding-top: 0 !important;
-        margin-top: 0 !important;
-    }
-    
-    /* Remove top margin from first element in sidebar */
-    [data-testid="stSidebar"] .element-container:first-child,
-    [data-testid="stSidebar"] .stMarkdown:first-child {
-        margin-top: 0 !important;
-        padding-top: 0 !important;
-    }
-    
-    /* Remove top spacing from first heading */
-    [data-testid="stSidebar"] h3:first-of-type {
-        margin-top: 0 !important;
-        padding-top: 0 !important;
-    }
-    
-    /* Reduce spacing in sidebar sections */
-    [data-testid="stSidebar"] .stMarkdown {
-        margin-bottom: 0.25rem !important;
-        margin-top: 0.25rem !important;
-    }
-    
-    [data-testid="stSidebar"] .stMarkdown p {
-        margin-bottom: 0.5rem !important;
-        margin-top: 0.25rem !important;
-    }
-    
-    [data-testid="stSidebar"] .stMarkdown h3 {
-        margin-top: 0.5rem !important;
-        margin-bottom: 0.25rem !important;
-        padding-bottom: 0.25rem !important;
-    }
-    
-    [data-testid="stSidebar"] .element-container {
-        margin-bottom: 0.5rem !important;
-    }
-    
-    [data-testid="stSidebar"] hr {
-        margin: 0.5rem 0 !important;
-        border-width: 1px !important;
-    }
-    
-    /* Reduce spacing between buttons */
-    [data-testid="stSidebar"] .stButton {
-        margin-bottom: 0.25rem !important;
-    }
-    
-    /* Reduce spacing for status badges */
-    [data-testid="stSidebar"] .status-badge {
-        margin: 0.15rem !important;
-    }
-    
-    /* Compact checkbox and radio spacing */
-    [data-testid="stSidebar"] .stCheckbox,
-    [data-testid="stSidebar"] .stRadio {
-        margin-bottom: 0.5rem !important;
-    }
-    
-    /* Reduce spacing for text inputs */
-    [data-testid="stSidebar"] .stTextInput {
-        margin-bottom: 0.5rem !important;
-    }
-    
-    /* Reduce spacing for info boxes */
-    [data-testid="stSidebar"] .stInfo,
-    [data-testid="stSidebar"] .stSuccess,
-    [data-testid="stSidebar"] .stWarning,
-    [data-testid="stSidebar"] .stError {
-        margin-bottom: 0.5rem !important;
-        padding: 0.5rem !important;
-    }
-    
-    /* Main content area - dark card background */
-    .main .block-container {
-        background: linear-gradient(135deg, rgba(37, 37, 37, 0.95) 0%, rgba(30, 30, 30, 0.95) 100%);
-        padding: 2rem;
-        border-radius: 16px;
-        box-shadow: 0 4px 20px var(--dark-shadow);
-        margin-top: 1rem;
-        border: 1px solid var(--dark-border);
-        color: var(--dark-text);
-    }
-    
-    /* Headers */
-    h1 {
-        color: var(--dark-text) !important;
-        font-weight: 700;
-        margin-bottom: 0.5rem;
-    }
-    
-    h2, h3 {
-        color: var(--dark-text) !important;
-        font-weight: 600;
-    }
-    
-    /* Ensure all headings have good contrast */
-    h3 {
-        color: var(--dark-text) !important;
-        opacity: 1 !important;
-    }
-    
-    /* Fix any markdown headings that might have low contrast */
-    .stMarkdown h3,
-    .main h3 {
-        color: var(--dark-text) !important;
-    }
-    
-    /* Buttons - primary */
-    .stButton > button[kind="primary"] {
-        background: linear-gradient(135deg, var(--dark-primary) 0%, var(--dark-primary-dark) 100%);
-        color: #E0E0E0;
-        border: none;
-        border-radius: 8px;
-        font-weight: 600;
-        transition: all 0.3s ease;
-        box-shadow: 0 2px 8px rgba(91, 155, 213, 0.3);
-    }
-    
-    .stButton > button[kind="primary"]:hover {
-        transform: translateY(-1px);
-        box-shadow: 0 4px 12px rgba(91, 155, 213, 0.4);
-        background: linear-gradient(135deg, #6BA5D8 0%, #5B9BD5 100%);
-        color: #E8E8E8;
-    }
-    
-    /* Buttons - secondary (including refresh button) */
-    .stButton > button:not([kind="primary"]),
-    button[kind="secondary"],
-    .stButton button {
-        background: linear-gradient(135deg, #2D2D2D 0%, #252525 100%) !important;
-        color: var(--dark-text) !important;
-        border: 1.5px solid var(--dark-border) !important;
-        border-radius: 8px;
-        font-weight: 500;
-        transition: all 0.3s ease;
-        box-shadow: 0 2px 4px var(--dark-shadow-light);
-    }
-    
-    .stButton > button:not([kind="primary"]):hover,
-    button[kind="secondary"]:hover,
-    .stButton button:hover {
-        background: linear-gradient(135deg, #353535 0%, #2D2D2D 100%) !important;
-        border-color: var(--dark-primary) !important;
-        transform: translateY(-1px);
-        box-shadow: 0 4px 8px var(--dark-shadow);
-        color: var(--dark-text) !important;
-    }
-    
-    /* Text inputs and text areas */
-    .stTextInput > div > div > input,
-    .stTextArea > div > div > textarea {
-        background: #2D2D2D;
-        border: 1.5px solid var(--dark-border);
-        border-radius: 8px;
-        padding: 0.5rem;
-        transition: all 0.3s ease;
-        box-shadow: inset 0 2px 4px var(--dark-shadow);
-        color: var(--dark-text);
-        caret-color: var(--dark-primary);
-    }
-    
-    .stTextInput > div > div > input:focus,
-    .stTextArea > div > div > textarea:focus {
-        background: #333333;
-        border-color: var(--dark-primary);
-        box-shadow: 0 0 0 3px rgba(91, 155, 213, 0.2), inset 0 2px 4px var(--dark-shadow);
-        color: var(--dark-text);
-        caret-color: var(--dark-primary);
-    }
-    
-    /* Ensure text cursor (caret) is visible in all inputs and textareas */
-    input[type="text"],
-    input[type="password"],
-    textarea {
-        caret-color: #5B9BD5 !important;
-    }
-    
-    .stTextInput > div > div > input::placeholder,
-    .stTextArea > div > div > textarea::placeholder {
-        color: var(--dark-text-muted);
-    }
-    
-    /* Select boxes */
-    .stSelectbox > div > div > select {
-        background: #2D2D2D;
-        border: 1.5px solid var(--dark-border);
-        border-radius: 8px;
-        box-shadow: inset 0 2px 4px var(--dark-shadow);
-        color: var(--dark-text);
-    }
-    
-    /* Info boxes and alerts */
-    .stInfo {
-        background-color: rgba(91, 155, 213, 0.15);
-        border-left: 4px solid var(--dark-primary);
-        border-radius: 6px;
-        color: var(--dark-text);
-    }
-    
-    .stSuccess {
-        background-color: rgba(46, 204, 113, 0.15);
-        border-left: 4px solid #2ECC71;
-        border-radius: 6px;
-        color: var(--dark-text);
-    }
-    
-    .stWarning {
-        background-color: rgba(255, 193, 7, 0.15);
-        border-left: 4px solid #FFC107;
-        border-radius: 6px;
-        color: var(--dark-text);
-    }
-    
-    .stError {
-        background-color: rgba(231, 76, 60, 0.15);
-        border-left: 4px solid #E74C3C;
-        border-radius: 6px;
-        color: var(--dark-text);
-    }
-    
-    /* Radio buttons and checkboxes */
-    .stRadio > div,
-    .stCheckbox > div {
-        background: linear-gradient(135deg, #2D2D2D 0%, #252525 100%);
-        padding: 0.75rem;
-        border-radius: 8px;
-        border: 1px solid var(--dark-border);
-        box-shadow: 0 2px 4px var(--dark-shadow-light);
-        color: var(--dark-text);
-    }
-    
-    .stRadio > div > label,
-    .stCheckbox > div > label {
-        color: var(--dark-text);
-    }
-    
-    /* Dividers */
-    hr {
-        border-color: var(--dark-border);
-        margin: 1.5rem 0;
-    }
-    
-    /* Markdown content */
-    .stMarkdown {
-        color: var(--dark-text);
-        line-height: 1.6;
-    }
-    
-    .stMarkdown p {
-        color: var(--dark-text);
-    }
-    
-    .stMarkdown code {
-        background: #1F1F1F;
-        color: var(--dark-accent);
-        padding: 0.2rem 0.4rem;
-        border-radius: 4px;
-    }
-    
-    /* Dataframes */
-    .stDataFrame {
-        border-radius: 8px;
-        overflow: hidden;
-        box-shadow: 0 2px 8px var(--dark-shadow);
-        background: #2D2D2D;
-    }
-    
-    .stDataFrame table {
-        background: #2D2D2D;
-        color: var(--dark-text);
-    }
-    
-    .stDataFrame th {
-        background: #1F1F1F;
-        color: var(--dark-text);
-    }
-    
-    .stDataFrame td {
-        background: #2D2D2D;
-        color: var(--dark-text);
-        border-color: var(--dark-border);
-    }
-    
-    /* Sidebar buttons */
-    [data-testid="stSidebar"] .stButton > button {
-        background: linear-gradient(135deg, #2D2D2D 0%, #252525 100%);
-        border: 1.5px solid var(--dark-border);
-        transition: all 0.2s ease;
-        box-shadow: 0 2px 4px var(--dark-shadow-light);
-        color: var(--dark-text);
-    }
-    
-    [data-testid="stSidebar"] .stButton > button:hover {
-        background: linear-gradient(135deg, #353535 0%, #2D2D2D 100%);
-        border-color: var(--dark-primary);
-        box-shadow: 0 4px 8px var(--dark-shadow);
-        transform: translateX(2px);
-        color: var(--dark-text);
-    }
-    
-    /* Spinner */
-    .stSpinner > div {
-        border-color: var(--dark-primary) transparent transparent transparent;
-    }
-    
-    /* Badges and Status Indicators */
-    .status-badge {
-        display: inline-block;
-        padding: 0.35rem 0.75rem;
-        border-radius: 20px;
-        font-size: 0.85rem;
-        font-weight: 600;
-        margin: 0.25rem;
-    }
-    
-    .badge-demo {
-        background: linear-gradient(135deg, #4A3A3A 0%, #3A2A2A 100%);
-        color: var(--dark-text-light);
-        box-shadow: 0 2px 4px var(--dark-shadow);
-        border: 1px solid var(--dark-border);
-    }
-    
-    .badge-ai {
-        background: linear-gradient(135deg, #3A4A5A 0%, #2A3A4A 100%);
-        color: var(--dark-text-light);
-        box-shadow: 0 2px 4px var(--dark-shadow);
-        border: 1px solid var(--dark-border-light);
-    }
-    
-    .badge-connected {
-        background: linear-gradient(135deg, #2A4A3A 0%, #1A3A2A 100%);
-        color: var(--dark-text-light);
-        box-shadow: 0 2px 4px var(--dark-shadow);
-        border: 1px solid var(--dark-border-light);
-    }
-    
-    .badge-disconnected {
-        background: #3A3A3A;
-        color: var(--dark-text-muted);
-        border: 1px solid var(--dark-border);
-    }
-    
-    /* Breadcrumb Navigation */
-    .breadcrumb {
-        display: flex;
-        align-items: center;
-        gap: 0.5rem;
-        margin-bottom: 1.5rem;
-        padding: 0.75rem 1rem;
-        background: linear-gradient(135deg, #2D2D2D 0%, #252525 100%);
-        border-radius: 8px;
-        border: 1px solid var(--dark-border);
-        box-shadow: 0 2px 8px var(--dark-shadow);
-    }
-    
-    .breadcrumb-item {
-        color: var(--dark-text-light);
-        font-size: 0.9rem;
-        font-weight: 500;
-    }
-    
-    .breadcrumb-item.active {
-        color: var(--dark-primary);
-        font-weight: 600;
-    }
-    
-    .breadcrumb-separator {
-        color: var(--dark-border-light);
-        margin: 0 0.25rem;
-    }
-    
-    /* Step Indicator */
-    .step-indicator {
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-        margin: 1.5rem 0;
-        padding: 1rem;
-        background: linear-gradient(135deg, #2D2D2D 0%, #252525 100%);
-        border-radius: 12px;
-        border: 1px solid var(--dark-border);
-        box-shadow: 0 2px 12px var(--dark-shadow);
-    }
-    
-    .step-item {
-        flex: 1;
-        display: flex;
-        flex-direction: column;
-        align-items: center;
-        position: relative;
-    }
-    
-    .step-item:not(:last-child)::after {
-        content: '';
-        position: absolute;
-        top: 1.25rem;
-        left: 60%;
-        width: 80%;
-        height: 2px;
-        background: var(--dark-border);
-        z-index: 0;
-    }
-    
-    .step-item.completed:not(:last-child)::after {
-        background: var(--dark-primary);
-    }
-    
-    .step-number {
-        width: 2.5rem;
-        height: 2.5rem;
-        border-radius: 50%;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        font-weight: 600;
-        margin-bottom: 0.5rem;
-        position: relative;
-        z-index: 1;
-        background: linear-gradient(135deg, #2D2D2D 0%, #252525 100%);
-        border: 2px solid var(--dark-border);
-        color: var(--dark-text-light);
-        transition: all 0.3s ease;
-        box-shadow: 0 2px 6px var(--dark-shadow);
-    }
-    
-    .step-item.active .step-number {
-        background: linear-gradient(135deg, #3A5A7A 0%, #2A4A6A 100%);
-        color: var(--dark-text-light);
-        border-color: var(--dark-primary);
-        box-shadow: 0 2px 8px var(--dark-shadow);
-        transform: scale(1.1);
-    }
-    
-    .step-item.completed .step-number {
-        background: linear-gradient(135deg, #2A5A4A 0%, #1A4A3A 100%);
-        color: var(--dark-text-light);
-        border-color: var(--dark-border-light);
-    }
-    
-    .step-label {
-        font-size: 0.85rem;
-        font-weight: 500;
-        color: var(--dark-text-light);
-        text-align: center;
-    }
-    
-    .step-item.active .step-label {
-        color: var(--dark-primary);
-        font-weight: 600;
-    }
-    
-    /* Enhanced Typography */
-    body {
-        font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif;
-        letter-spacing: -0.01em;
-    }
-    
-    h1 {
-        letter-spacing: -0.02em;
-        line-height: 1.2;
-    }
-    
-    h2, h3 {
-        letter-spacing: -0.01em;
-        line-height: 1.3;
-    }
-    
-    p {
-        line-height: 1.7;
-        color: var(--dark-text);
-    }
-    
-    /* Card/Container Styling */
-    .content-card {
-        background: linear-gradient(135deg, #2D2D2D 0%, #252525 100%);
-        padding: 1.5rem;
-        border-radius: 12px;
-        border: 1px solid var(--dark-border);
-        box-shadow: 0 2px 12px var(--dark-shadow);
-        margin-bottom: 1.5rem;
-        transition: all 0.3s ease;
-        color: var(--dark-text);
-    }
-    
-    .content-card:hover {
-        background: linear-gradient(135deg, #353535 0%, #2D2D2D 100%);
-        box-shadow: 0 4px 20px var(--dark-shadow);
-        transform: translateY(-2px);
-        border-color: var(--dark-primary);
-    }
-    
-    /* Enhanced Input Groups */
-    .input-group {
-        margin-bottom: 1.5rem;
-    }
-    
-    .input-group label {
-        display: block;
-        margin-bottom: 0.5rem;
-        font-weight: 600;
-        color: var(--dark-text);
-        font-size: 0.95rem;
-    }
-    
-    /* Loading States */
-    @keyframes pulse {
-        0%, 100% {
-            opacity: 1;
-        }
-        50% {
-            opacity: 0.5;
-        }
-    }
-    
-    .loading {
-        animation: pulse 2s cubic-bezier(0.4, 0, 0.6, 1) infinite;
-    }
-    
-    /* Success Animation */
-    @keyframes successPop {
-        0% {
-            transform: scale(0.8);
-            opacity: 0;
-        }
-        50% {
-            transform: scale(1.05);
-        }
-        100% {
-            transform: scale(1);
-            opacity: 1;
-        }
-    }
-    
-    .success-animation {
-        animation: successPop 0.4s ease-out;
-    }
-    
-    /* Enhanced Spacing */
-    .section-spacing {
-        margin-top: 2rem;
-        margin-bottom: 2rem;
-    }
-    
-    /* Text Area Enhancements */
-    .stTextArea > div > div > textarea {
-        min-height: 120px;
-        resize: vertical;
-    }
-    
-    /* Enhanced Selectbox */
-    .stSelectbox > div > div > select {
-        cursor: pointer;
-    }
-    
-    /* Tooltip Enhancements */
-    [data-testid="stTooltipIcon"] {
-        color: var(--dark-primary);
-    }
-    
-    /* Sidebar Enhancements */
-    [data-testid="stSidebar"] .stMarkdown h3 {
-        margin-top: 1rem;
-        margin-bottom: 0.75rem;
-        padding-bottom: 0.5rem;
-        border-bottom: 2px solid var(--dark-border);
-        color: var(--dark-text);
-    }
-    
-    [data-testid="stSidebar"] .stMarkdown {
-        color: var(--dark-text);
-    }
-    
-    /* Enhanced Radio Buttons */
-    .stRadio > div > label {
-        padding: 0.5rem;
-        border-radius: 6px;
-        transition: all 0.2s ease;
-        color: var(--dark-text);
-    }
-    
-    .stRadio > div > label:hover {
-        background: linear-gradient(135deg, #353535 0%, #2D2D2D 100%);
-    }
-    
-    /* Enhanced Checkbox */
-    .stCheckbox > label {
-        font-weight: 500;
-        color: var(--dark-text);
-    }
-    
-    /* Smooth Transitions */
-    * {
-        transition: background-color 0.2s ease, border-color 0.2s ease, color 0.2s ease;
-    }
-    
-    /* Focus States */
-    button:focus-visible,
-    input:focus-visible,
-    textarea:focus-visible,
-    select:focus-visible {
-        outline: 2px solid var(--dark-primary);
-        outline-offset: 2px;
-    }
-    
-    /* Streamlit default element overrides for dark theme */
-    .stSelectbox label,
-    .stTextInput label,
-    .stTextArea label {
-        color: var(--dark-text);
-    }
-    
-    /* Code blocks */
-    pre {
-        background: #1F1F1F !important;
-        color: var(--dark-text) !important;
-        border: 1px solid var(--dark-border);
-    }
-    
-    code {
-        background: #1F1F1F;
-        color: var(--dark-accent);
-    }
-    
-    /* Streamlit header/deploy bar - dark theme */
-    header[data-testid="stHeader"],
-    .stApp > header {
-        background: linear-gradient(135deg, #252525 0%, #1F1F1F 100%) !important;
-        border-bottom: 1px solid var(--dark-border) !important;
-    }
-    
-    header[data-testid="stHeader"] > div,
-    .stApp > header > div {
-        background: transparent !important;
-    }
-    
-    header[data-testid="stHeader"] button,
-    header[data-testid="stHeader"] a,
-    .stApp > header button,
-    .stApp > header a {
-        color: var(--dark-text-light) !important;
-    }
-    
-    header[data-testid="stHeader"] button:hover,
-    header[data-testid="stHeader"] a:hover,
-    .stApp > header button:hover,
-    .stApp > header a:hover {
-        color: var(--dark-text) !important;
-    }
-    
-    /* Hide or style the deploy button area */
-    #MainMenu,
-    [data-testid="stHeader"] {
-        visibility: visible;
-        background: linear-gradient(135deg, #252525 0%, #1F1F1F 100%) !important;
-    }
-    
-    /* Style the hamburger menu */
-    button[title="View app source"],
-    button[title="Get help"],
-    button[title="Deploy"],
-    [data-testid="stHeader"] button {
-        background: transparent !important;
-        color: var(--dark-text-light) !important;
-    }
-    
-    [data-testid="stHeader"] button:hover {
-        background: rgba(255, 255, 255, 0.05) !important;
-        color: var(--dark-text) !important;
-    }
-    </style>
-    """, unsafe_allow_html=True)
 
-# Inject styles on app load
-inject_warm_styles()
+@st.cache_resource
+def _theme_css() -> str:
+    return THEME_CSS_PATH.read_text(encoding="utf-8")
 
-# Initialize session state
-if "page" not in st.session_state:
-    st.session_state.page = "input"
-if "research_data" not in st.session_state:
-    st.session_state.research_data = {}
-if "hypothesis" not in st.session_state:
-    st.session_state.hypothesis = None
-if "personas" not in st.session_state:
-    st.session_state.personas = []
-if "selected_persona" not in st.session_state:
-    st.session_state.selected_persona = None
-if "sequence" not in st.session_state:
-    st.session_state.sequence = None
-if "sequences" not in st.session_state:
-    st.session_state.sequences = {}  # lane_id -> content (scalable sequences by persona lane)
-if "selected_lanes" not in st.session_state:
-    st.session_state.selected_lanes = []  # list of lane ids user chose (1-3)
-if "current_sequence_lane_id" not in st.session_state:
-    st.session_state.current_sequence_lane_id = None  # which lane's sequence is displayed
-if "prospect_info" not in st.session_state:
-    st.session_state.prospect_info = {}
-if "ae_handoff" not in st.session_state:
-    st.session_state.ae_handoff = None
-
-
-def get_openai_client():
-    """Get OpenAI client with API key from Streamlit secrets, env, or sidebar."""
-    api_key = _get_openai_key()
-    if api_key:
-        return OpenAI(api_key=api_key)
-    return None
-
-
-def list_available_gemini_models():
-    """List available Gemini models for debugging."""
-    if not GEMINI_AVAILABLE:
-        return []
-    api_key = _get_gemini_key()
-    if not api_key:
-        return []
+
+def _static_css_served() -> bool:
+    """Older Streamlit static servers send .css as text/plain (with nosniff), which browsers won't apply."""
     try:
-        genai.configure(api_key=api_key)
-        models = genai.list_models()
-        available = []
-        for model in models:
-            if 'generateContent' in model.supported_generation_methods:
-                available.append(model.name)
-        return available
-    except Exception as e:
-        return []
+        from streamlit.web.server.app_static_file_handler import SAFE_APP_STATIC_FILE_EXTENSIONS
+    except ImportError:
+        return True
+    return ".css" in SAFE_APP_STATIC_FILE_EXTENSIONS
 
 
-def get_gemini_client():
-    """Get Gemini client with API key from Streamlit secrets, env, or sidebar."""
-    if not GEMINI_AVAILABLE:
-        return None
-    api_key = _get_gemini_key()
-    if api_key:
-        genai.configure(api_key=api_key)
-        # Try different model names in order of preference
-        model_names = [
-            'gemini-1.5-flash',
-            'gemini-1.5-pro',
-            'gemini-pro',
-            'models/gemini-1.5-flash',
-            'models/gemini-1.5-pro',
-            'models/gemini-pro'
-        ]
-        
-        # First, try to list available models and use the first one that supports generateContent
-        try:
-            models = genai.list_models()
-            for model in models:
-                if 'generateContent' in model.supported_generation_methods:
-                    # Extract model name (remove 'models/' prefix if present)
-                    model_name = model.name.replace('models/', '')
-                    return genai.GenerativeModel(model_name)
-        except:
-            pass
-        
-        # Fallback: try model names directly
-        for model_name in model_names:
-            try:
-                return genai.GenerativeModel(model_name)
-            except:
-                continue
-        
-        # If all else fails, try the first one and let it error
-        return genai.GenerativeModel('gemini-1.5-flash')
-    return None
+def _theme_markup() -> str:
+    """What each rerun sends for styling: a link to the static stylesheet, or the stylesheet inline when
+    static serving is off (e.g. the app was started from another directory)."""
+    if st.get_option("server.enableStaticServing") and _static_css_served():
+        version = f"{THEME_CSS_PATH.stat().st_mtime_ns:x}"  # new URL whenever the file changes
+        return f'<link rel="stylesheet" href="app/static/theme.css?v={version}">'
+    return f"<style>\n{_theme_css()}</style>"
+
+
+def inject_warm_styles():
+    """Apply the warm dark theme styling (records the bytes it sends per rerun)."""
+    markup = _theme_markup()
+    st.session_state.theme_bytes = len(markup.encode("utf-8"))
+    st.markdown(markup, unsafe_allow_html=True)
+
+def init_session_state():
+    """Initialize session state defaults (once per session)."""
+    if "page" not in st.session_state:
+        st.session_state.page = "input"
+    if "session_data" not in st.session_state:
+        st.session_state.session_data = SessionData()  # the current run; reset_session() clears it
+    if "stage_memo" not in st.session_state:
+        st.session_state.stage_memo = MemoryMemo(budget=session().budget)  # node key -> output; survives resets so unchanged stages aren't re-paid
+    if "prefetcher" not in st.session_state:
+        st.session_state.prefetcher = Prefetcher()  # speculative lane sequences; its budget is per session
+    if "session_jobs" not in st.session_state:
+        st.session_state.session_jobs = SessionJobs()  # generation runs here so reruns don't abort it
+
+
+def near_duplicates():
+    """This session's near-duplicate tier (opt-in: hypotheses for barely-edited research), created on first use."""
+    if "near_duplicates" not in st.session_state:
+        from outbound_engine.similarity import NearDuplicates
+        st.session_state.near_duplicates = NearDuplicates()
+    return st.session_state.near_duplicates
+
+
+def session() -> SessionData:
+    """The current run (research, hypothesis, lanes, sequences, exports, handoff) for this session."""
+    return st.session_state.session_data
+
+
+def reset_session(rerun: bool = True):
+    """Start over: stop this session's background work and clear the run, back on the input page. API keys,
+    provider and demo mode stay; the stage memo stays too, so regenerating unchanged inputs costs nothing.
+    rerun=False lets the caller load something into the fresh run first."""
+    session_jobs().cancel()
+    session().reset()
+    st.session_state.pipeline_jobs = {}
+    st.session_state.page = "input"
+    if rerun:
+        st.rerun()
 
 
 def get_ai_provider():
@@ -913,889 +185,412 @@ def get_ai_provider():
     return st.session_state.get("ai_provider", "gemini")  # Default to Gemini
 
 
-def generate_demo_hypothesis(research_data: dict) -> str:
-    """Generate a realistic demo hypothesis without API calls."""
-    company_info = research_data.get("company_info", "").lower()
-    job_postings = research_data.get("job_postings", "").lower()
-    news_signals = research_data.get("news_signals", "").lower()
-    
-    # Extract company name if possible
-    company_name = "this company"
-    if company_info:
-        lines = company_info.split("\n")
-        for line in lines[:3]:
-            if "company" in line or "inc" in line or "corp" in line or "ltd" in line:
-                company_name = line.split()[0] if line.split() else "this company"
-                break
-    
-    # Detect signals
-    has_funding = "funding" in news_signals or "raised" in news_signals or "series" in news_signals
-    has_hiring = "hiring" in job_postings or "engineer" in job_postings or "developer" in job_postings
-    has_devex = "devex" in job_postings or "developer experience" in job_postings or "platform" in job_postings
-    
-    hypothesis = f"""## Why This Account
-
-{company_name.title()} appears to be a strong fit for Cursor based on several indicators:
-
-**Company Scale & Engineering Focus:**
-- Based on the research provided, this organization demonstrates significant engineering investment
-- The presence of relevant job postings suggests an active, growing engineering organization
-- This indicates the scale necessary to benefit from AI-powered developer productivity tools
-
-**Tech Stack & Digital Maturity:**
-- The research suggests a modern, engineering-forward culture
-- Active hiring in technical roles indicates ongoing investment in engineering capabilities
-- This aligns with Cursor's ideal customer profile of companies prioritizing developer experience
-
-**Budget Indicators:**
-{f"- Recent funding activity suggests budget availability for developer tooling investments" if has_funding else "- Growth indicators suggest potential budget for productivity tools"}
-
----
-
-## Why Now
-
-Several timely signals create urgency for outreach:
-
-**Immediate Triggers:**
-{f"- Active hiring in engineering roles - perfect timing to introduce productivity tools as teams scale" if has_hiring else "- Engineering team growth creates opportunity for productivity improvements"}
-{f"- Platform/DevEx team formation or expansion indicates focus on developer experience" if has_devex else "- Active engineering investment suggests openness to productivity solutions"}
-
-**Pain Points Likely Experienced:**
-- Scaling engineering teams while maintaining velocity
-- Onboarding new developers efficiently
-- Managing context-switching and productivity bottlenecks
-- Justifying engineering headcount growth to leadership
-
-**Connection to Cursor Value Props:**
-- Cursor's 2-3x velocity improvement directly addresses scaling challenges
-- Codebase understanding accelerates onboarding for new team members
-- AI-powered development helps teams ship faster without proportional headcount increases
-
----
-
-## Proof Points / Evidence to Cite
-- Relevant job postings (e.g. Platform Engineering, DevEx roles) — include URL if pasted in research
-- Engineering headcount or scale indicators from research
-- Recent funding, product launch, or conference mentions — include URL/source if in research
-- Any specific stats or quotes from the research (e.g. "300+ apps", "1B uses")
-
----
-
-## Tech Stack
-- List any languages, frameworks, infrastructure, or tools mentioned in the research
-- If not specified: "Not specified in research"
-
----
-
-## Risks / Why We Might Lose
-- Existing AI coding tool commitment (name a specific competitor only if the research indicates which one)
-- Budget or timing constraints
-- Other disqualifiers suggested by the research (avoid generic "lengthy enterprise security review")
-"""
-    
-    return hypothesis
-
-
-def generate_demo_sequence(lane: dict, hypothesis: str, prospect_info: dict) -> str:
-    """Generate a realistic demo sequence without API calls. lane = dict with id, name, example_titles, hook, cursor_play, peer_pivot."""
-    first_name = prospect_info.get('first_name') or '[First Name]'
-    company = prospect_info.get('company') or '[Company]'
-    lane_name = lane.get("name", "Internal Tool Owners")
-    
-    sequence = f"""# Outbound Sequence — {lane_name}
-
-## Sequence Overview
-**Persona lane:** {lane_name}
-**Total Steps:** 8
-**Duration:** 14 days
-**Channels:** Email, LinkedIn, Phone
-
----
-
-## Step 1: Initial Email (Day 1)
-**Type:** Email
-**Subject:** Your DevEx team caught my attention
-
-**Body:**
-
-Hi {first_name},
-
-I noticed {company} is building out your developer experience function - saw the Platform Engineering role you're hiring for.
-
-At similar companies, we've seen DevEx teams struggle with developer tool adoption. Teams try new tools, but they don't stick because they don't understand the full codebase context.
-
-Cursor is different - it's an AI code editor built from the ground up with codebase understanding. When developers ask questions about your authentication system across 50 files, Cursor actually knows the answer.
-
-Quick question: What's your biggest challenge with developer productivity right now?
-
-Best,
-[Your Name]
-
----
-
-## Step 2: LinkedIn Connection (Day 2)
-**Type:** LinkedIn
-**Message:**
-
-Hi {first_name}, I saw your role at {company} and thought you might be interested in connecting. I work with engineering leaders on developer productivity - would love to share what I'm seeing in the market.
-
----
-
-## Step 3: Follow-up Email (Day 4)
-**Type:** Email
-**Subject:** Re: Your DevEx team caught my attention
-
-**Body:**
-
-Hi {first_name},
-
-Following up on my note about developer productivity at {company}.
-
-One thing I didn't mention: Cursor is built on VS Code, so your developers can start using it immediately with zero learning curve. All their extensions, settings, and workflows work exactly the same.
-
-We've seen 90%+ adoption in the first 30 days at companies like yours - developers actually ask for it.
-
-Worth a 15-minute conversation?
-
-Best,
-[Your Name]
-
----
-
-## Step 4: LinkedIn Message (Day 5)
-**Type:** LinkedIn
-**Message:**
-
-{first_name}, curious - are you evaluating any AI coding tools for your team? Seeing a lot of interest from DevEx leaders right now.
-
----
-
-## Step 5: Value Email (Day 7)
-**Type:** Email
-**Subject:** Quick question about {company}'s engineering velocity
-
-**Body:**
-
-Hi {first_name},
-
-I've been thinking about the scaling challenges you're likely facing as you grow the engineering team.
-
-One thing we hear consistently: teams using Cursor report 2-3x faster development velocity. Not just autocomplete - actual codebase understanding that helps with refactoring, debugging, and onboarding.
-
-If you're open to it, I'd love to show you a quick demo on your actual codebase. Takes 15 minutes and you'll see the difference immediately.
-
-Does next week work for a brief call?
-
-Best,
-[Your Name]
-
----
-
-## Step 6: Phone Call Attempt (Day 9)
-**Type:** Phone
-**Opener:**
-
-Hi {first_name}, this is [Your Name] from Cursor. I've been emailing you about developer productivity tools - do you have 2 minutes?
-
-**If voicemail:**
-Hi {first_name}, this is [Your Name] from Cursor. I've been reaching out about AI-powered developer productivity tools. I noticed {company} is investing heavily in engineering, and I thought you'd be interested in what we're seeing - teams using Cursor are shipping 2-3x faster. Would love to connect - my number is [phone]. Talk soon.
-
----
-
-## Step 7: Final Email (Day 11)
-**Type:** Email
-**Subject:** Last try - developer productivity at {company}
-
-**Body:**
-
-Hi {first_name},
-
-I know you're busy, so I'll keep this short.
+def engine_config() -> EngineConfig:
+    """Explicit engine config for this session (provider, keys from secrets/env/sidebar, demo mode)."""
+    return EngineConfig(
+        provider=get_ai_provider(),
+        openai_api_key=_get_openai_key(),
+        gemini_api_key=_get_gemini_key(),
+        demo_mode=st.session_state.get("demo_mode", False),
+    )
 
-{company} is clearly investing in engineering - the Platform Engineering role you're hiring for is proof of that. The question is: are your developers as productive as they could be?
 
-Cursor helps engineering teams ship faster without adding headcount. It's what GitHub Copilot would be if it understood your entire codebase.
+@st.cache_resource
+def _start_warm_up() -> threading.Thread:
+    """Once per server process: warm the KB cache and provider clients in the background (a no-op after
+    `python -m outbound_engine serve`, which warms up before the server starts)."""
+    thread = threading.Thread(target=warm_up, args=(EngineConfig.from_env(),), name="warm-up", daemon=True)
+    thread.start()
+    return thread
 
-If this isn't the right time, no worries. But if you're curious, I'm happy to show you what it looks like in action.
 
-Best,
-[Your Name]
+@st.cache_resource
+def _worker_store():
+    """Shared worker store when this app runs behind `python -m outbound_engine worker` (else None)."""
+    path = os.getenv(WORKER_STORE_ENV)
+    if not path:
+        return None
+    from outbound_engine.jobstore import JobStore
+    return JobStore(path)
 
----
 
-## Step 8: Breakup Email (Day 14)
-**Type:** Email
-**Subject:** Closing the loop
+def stage_graph() -> StageGraph:
+    """Stage graph for this session: unchanged stages come from the session memo instead of the provider.
+    With a shared worker, calls and the memo belong to the worker (shared by every app process)."""
+    near = near_duplicates() if st.session_state.get("near_duplicates_enabled") else None
+    store = _worker_store()
+    if store is not None:
+        from outbound_engine.worker import WorkerGraph
+        return WorkerGraph(engine_config(), store, notify=_notify, near_duplicates=near)
+    return StageGraph(engine_config(), memo=st.session_state.stage_memo, notify=_notify, near_duplicates=near)
 
-**Body:**
 
-Hi {first_name},
+@st.cache_resource
+def _pipeline_executor() -> ThreadPoolExecutor:
+    """Pool for background downstream stages, shared by every session in this server process."""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="pipeline")
 
-Haven't heard back, so I'll assume this isn't a priority right now. That's totally fine - timing matters.
 
-If that changes, or if you'd like to stay in touch for when it makes sense, just let me know.
+def _default_lane():
+    """First selected persona lane (the multiselect defaults to the first lane)."""
+    lanes = load_persona_lanes()
+    by_label = {f"{lane['id']}. {lane['name']}": lane for lane in lanes}
+    for label in st.session_state.get("persona_lane_multiselect") or []:
+        if label in by_label:
+            return by_label[label]
+    return lanes[0] if lanes else None
 
-Best of luck with the engineering growth at {company}.
 
-Best,
-[Your Name]
+def start_pipeline(hypothesis: str):
+    """Opt-in: as soon as the hypothesis lands, generate the AE handoff and the default lane's sequence in the background."""
+    st.session_state.pipeline_jobs = {}
+    if not st.session_state.get("pipeline_enabled") or st.session_state.get("demo_mode"):
+        return
+    lane = _default_lane()
+    if not lane:
+        return
+    jobs = stage_graph().submit_downstream(
+        session_jobs().scoped(_pipeline_executor()),
+        hypothesis,
+        lane,
+        session().prospect_info,
+        reference_customers=session().research_data.get("reference_customers", "")
+    )
+    if jobs:
+        st.session_state.pipeline_jobs = {"lane": lane, **jobs}
 
----
 
-## Personalization Notes
-- Reference specific job postings or team formations from research
-- Connect to actual pain points mentioned in hypothesis
-- Adjust messaging based on persona's likely concerns
-- Use company-specific signals throughout sequence
-"""
-    
-    return sequence
+def start_prefetch(hypothesis: str, personas: list):
+    """Opt-in: generate the lanes this hypothesis most likely calls for in the background (within the session budget)."""
+    if not st.session_state.get("prefetch_enabled") or st.session_state.get("demo_mode"):
+        return
+    pipeline_lane = (st.session_state.get("pipeline_jobs") or {}).get("lane")
+    st.session_state.prefetcher.start(
+        stage_graph(),
+        session_jobs().scoped(_pipeline_executor()),
+        hypothesis,
+        personas,
+        load_persona_lanes(),
+        session().prospect_info,
+        reference_customers=session().research_data.get("reference_customers", ""),
+        skip_lane_ids={pipeline_lane["id"]} if pipeline_lane else ()
+    )
 
 
-def load_file(filepath: str) -> str:
-    """Load a file from the project directory."""
-    file_path = Path(__file__).parent / filepath
-    if file_path.exists():
-        return file_path.read_text()
-    return ""
+def render_pipeline_status():
+    jobs = st.session_state.get("pipeline_jobs") or {}
+    if "lane" not in jobs:
+        return
+    pending = [name for name in ("handoff", "sequence") if not jobs[name].done()]
+    lane_name = jobs["lane"]["name"]
+    if pending:
+        st.caption(f"⏳ Preparing the AE handoff and the {lane_name} sequence in the background...")
+    else:
+        st.caption(f"✅ AE handoff and {lane_name} sequence are ready.")
 
 
-def load_kb_files() -> dict:
-    """Load knowledge base files if they exist."""
-    kb_files = {
-        "cursor_encyclopedia": "kb/cursor_encyclopedia.md",
-        "voice": "kb/voice.md",
-        "offers": "kb/offers.md",
-        "sequence_patterns": "kb/sequence_patterns.md",
-        "personalization": "kb/personalization_playbook.md"
-    }
-    
-    kb_content = {}
-    for key, filepath in kb_files.items():
-        content = load_file(filepath)
-        if content:
-            kb_content[key] = content
-    
-    return kb_content
+# Partial reruns: functions decorated with st.fragment (Streamlit >= 1.37) rerun on their own when their
+# widgets change, or every run_every seconds, instead of rerunning the whole page.
 
 
-def load_persona_lanes() -> list:
-    """Load and parse persona lanes from kb/persona_lanes.md. Returns list of dicts with id, name, example_titles, hook, cursor_play, peer_pivot (optional)."""
-    content = load_file("kb/persona_lanes.md")
-    if not content:
-        return []
-    lanes = []
-    # Split by ## N. (e.g. ## 1. Big Picture Leaders)
-    blocks = re.split(r"\n##\s+(\d+)\.\s+", content)[1:]  # skip intro before first ##
-    for i in range(0, len(blocks), 2):
-        if i + 1 >= len(blocks):
-            break
-        num, rest = blocks[i], blocks[i + 1]
-        name_line = rest.split("\n")[0].strip()
-        name = name_line.split("**")[0].strip() or name_line
-        text = rest
-
-        def _extract(label: str) -> str:
-            m = re.search(r"\*\*" + re.escape(label) + r"\*\*[:\s]*(.*?)(?=\n\*\*|\n---|\Z)", text, re.DOTALL)
-            return m.group(1).strip() if m else ""
-
-        lanes.append({
-            "id": num,
-            "name": name,
-            "example_titles": _extract("Example titles"),
-            "hook": _extract("Hook"),
-            "cursor_play": _extract("Cursor play"),
-            "peer_pivot": _extract("Peer pivot") or ""
-        })
-    return lanes
-
-
-def generate_hypothesis_with_ai(prompt: str, provider: str) -> str:
-    """Generate text using the specified AI provider."""
-    if provider == "gemini":
-        model = get_gemini_client()
-        if not model:
-            raise Exception("Gemini API key not configured")
-        try:
-            response = model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.7,
-                    max_output_tokens=8192,
-                )
-            )
-            return response.text
-        except Exception as e:
-            error_msg = str(e)
-            st.session_state["last_api_error_raw"] = error_msg  # full message from Gemini
-            # Check for rate limit errors
-            if "429" in error_msg or "quota" in error_msg.lower() or "rate limit" in error_msg.lower() or "resource_exhausted" in error_msg.lower():
-                raise Exception("RATE_LIMIT")
-            raise e
-    else:  # OpenAI
-        client = get_openai_client()
-        if not client:
-            raise Exception("OpenAI API key not configured")
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are an expert B2B sales strategist. Generate a complete, actionable outbound hypothesis. Always finish every section and sentence—do not stop mid-sentence or omit sections. You MUST include all five sections including Tech Stack and Risks."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=8192
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            error_msg = str(e)
-            # Check for quota/authentication errors
-            if "quota" in error_msg.lower() or "insufficient" in error_msg.lower() or "429" in error_msg:
-                raise Exception("QUOTA_EXCEEDED")
-            raise e
-
-
-def generate_hypothesis(research_data: dict, use_demo: bool = False) -> str:
-    """Generate outbound hypothesis using AI or demo mode."""
-    # Check if demo mode is enabled
-    if use_demo or st.session_state.get("demo_mode", False):
-        return generate_demo_hypothesis(research_data)
-    
-    provider = get_ai_provider()
-    
-    # Load prompts
-    cursor_context = load_file("prompts/cursor_context.md")
-    hypothesis_template = load_file("prompts/hypothesis.md")
-    
-    # Load knowledge base files (for personalization guidance)
-    kb_content = load_kb_files()
-    
-    # Build the prompt
-    prompt = hypothesis_template.replace("{{company_info}}", research_data.get("company_info", "Not provided"))
-    prompt = prompt.replace("{{job_postings}}", research_data.get("job_postings", "Not provided"))
-    prompt = prompt.replace("{{linkedin_profiles}}", research_data.get("linkedin_profiles", "Not provided"))
-    prompt = prompt.replace("{{news_signals}}", research_data.get("news_signals", "Not provided"))
-    prompt = prompt.replace("{{cursor_context}}", cursor_context)
-    
-    # Inject KB content if available (Cursor encyclopedia + personalization for hypothesis quality)
-    if kb_content.get("cursor_encyclopedia"):
-        prompt += "\n\n## Cursor Technical & Competitive Context\n\n" + kb_content["cursor_encyclopedia"] + "\n\n"
-    if kb_content.get("personalization"):
-        prompt += "\n\n## Personalization Guidelines\n\n" + kb_content["personalization"] + "\n\n"
-    
-    # Add system context for Gemini (which doesn't have separate system messages)
-    if provider == "gemini":
-        prompt = f"You are an expert B2B sales strategist. Generate a complete, actionable outbound hypothesis. Your response MUST include all five sections (Why This Account, Why Now, Proof Points, Tech Stack, Risks). Do not stop after section 2—always complete sections 3, 4, and 5. Use up to 8192 tokens if needed.\n\n{prompt}"
-    
+def rerun_fragment():
+    """Rerun just the calling fragment."""
     try:
-        return generate_hypothesis_with_ai(prompt, provider)
-    except Exception as e:
-        error_msg = str(e)
-        st.session_state["last_api_error"] = error_msg
-        if "QUOTA_EXCEEDED" in error_msg or "RATE_LIMIT" in error_msg:
-            # Retry once after a short wait (Gemini free tier has strict RPM limits)
-            st.info("⏳ Rate limit hit. Waiting 20 seconds and retrying once...")
-            time.sleep(20)
-            try:
-                return generate_hypothesis_with_ai(prompt, provider)
-            except Exception as retry_e:
-                st.session_state["last_api_error"] = str(retry_e)
-                st.warning("⚠️ **Rate limit still in effect.** Gemini's free tier allows ~15 requests/minute. Wait a minute and try again, or enable billing in [Google AI Studio](https://aistudio.google.com) for higher limits. Using demo mode for this run.")
-                return generate_demo_hypothesis(research_data)
-        # Show actual error so user can see invalid key, permission, etc.
-        st.error(f"⚠️ **API Error**: {error_msg[:500]}")
-        st.info("Switching to demo mode. If this is an auth/key error, check Streamlit Secrets (GEMINI_API_KEY) and redeploy.")
-        if provider == "openai":
-            try:
-                st.session_state.ai_provider = "gemini"
-                return generate_hypothesis_with_ai(prompt, "gemini")
-            except:
-                return generate_demo_hypothesis(research_data)
-        return generate_demo_hypothesis(research_data)
-
-
-def extract_personas_from_hypothesis(hypothesis: str, use_api: bool = False) -> list:
-    """Extract persona recommendations from the hypothesis. use_api=False avoids an extra API call (saves quota)."""
-    if st.session_state.get("demo_mode", False):
-        return ["VP/Director of Engineering", "Platform/DevEx Engineering Lead", "CTO"]
-    # Text-based extraction first (no API call) - sequences use persona lanes now
-    out = []
-    if "VP" in hypothesis or "Director" in hypothesis:
-        out.append("VP/Director of Engineering")
-    if "Platform" in hypothesis or "DevEx" in hypothesis:
-        out.append("Platform/DevEx Engineering Lead")
-    if "CTO" in hypothesis:
-        out.append("CTO")
-    if out:
-        return out
-    if not use_api:
-        return ["VP/Director of Engineering", "Platform/DevEx Engineering Lead", "CTO"]
-    provider = get_ai_provider()
-    prompt = f"Extract the recommended target personas from this sales hypothesis. Return ONLY a Python list of job titles, nothing else. Example: [\"VP Engineering\", \"DevEx Lead\", \"CTO\"]\n\n{hypothesis}"
-    
-    try:
-        if provider == "gemini":
-            model = get_gemini_client()
-            if model:
-                response = model.generate_content(
-                    prompt,
-                    generation_config=genai.types.GenerationConfig(
-                        temperature=0,
-                        max_output_tokens=200,
-                    )
-                )
-                content = response.text.strip()
-        else:  # OpenAI
-            client = get_openai_client()
-            if not client:
-                raise Exception("No API key")
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "Extract the recommended target personas from this sales hypothesis. Return ONLY a Python list of job titles, nothing else. Example: [\"VP Engineering\", \"DevEx Lead\", \"CTO\"]"},
-                    {"role": "user", "content": hypothesis}
-                ],
-                temperature=0,
-                max_tokens=200
-            )
-            content = response.choices[0].message.content.strip()
-        
-        # Try to evaluate as a Python list
-        import ast
-        personas = ast.literal_eval(content)
-        if isinstance(personas, list) and len(personas) > 0:
-            return personas
-    except Exception:
-        pass
-    return ["VP/Director of Engineering", "Platform/DevEx Engineering Lead", "CTO"]
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()  # this run isn't a fragment rerun
 
 
-def generate_sequence(lane: dict, hypothesis: str, prospect_info: dict, use_demo: bool = False, reference_customers: str = "") -> str:
-    """Generate outbound sequence for a persona lane (scalable across prospects). lane = dict with id, name, example_titles, hook, cursor_play, peer_pivot. reference_customers = optional list of current customers to cite in 1-2 steps."""
-    # Check if demo mode is enabled
-    if use_demo or st.session_state.get("demo_mode", False):
-        return generate_demo_sequence(lane, hypothesis, prospect_info)
-    
-    provider = get_ai_provider()
-    
-    # Load templates
-    cursor_context = load_file("prompts/cursor_context.md")
-    sequence_template = load_file("prompts/sequence.md")
-    sequence_structure = load_file("templates/sequence_structure.md")
-    
-    # Load knowledge base files
-    kb_content = load_kb_files()
-    
-    # Build prospect context: use placeholders if no prospect provided
-    has_prospect = prospect_info.get("first_name") and prospect_info.get("company")
-    if has_prospect:
-        prospect_context = f"""
-Prospect (for this draft)—USE THESE EXACT NAMES IN THE COPY; do not use [Company] or [First Name]:
-- Name: {prospect_info.get('first_name', '')} {prospect_info.get('last_name', '').strip() or ''}
-- Title: {prospect_info.get('title', lane.get('name', ''))}
-- Company: {prospect_info.get('company', '')}
-- Email: {prospect_info.get('email', '') or 'unknown@company.com'}
-"""
-    else:
-        prospect_context = """
-No specific prospect—use placeholders so this sequence can scale:
-- Use [First Name] where you would use their first name
-- Use [Company] where you would use their company name
-- Keep tone and messaging tailored to this persona lane; they can fill in details when they use it
-"""
-    
-    peer_pivot_block = ""
-    if lane.get("peer_pivot"):
-        peer_pivot_block = "\n**Peer pivot (optional):** " + lane["peer_pivot"]
-    
-    # Build the prompt
-    prompt = sequence_template.replace("{{persona_lane_name}}", lane.get("name", ""))
-    prompt = prompt.replace("{{persona_lane_titles}}", lane.get("example_titles", ""))
-    prompt = prompt.replace("{{persona_lane_hook}}", lane.get("hook", ""))
-    prompt = prompt.replace("{{persona_lane_play}}", lane.get("cursor_play", ""))
-    prompt = prompt.replace("{{persona_lane_peer_pivot}}", peer_pivot_block)
-    prompt = prompt.replace("{{prospect_context}}", prospect_context)
-    prompt = prompt.replace("{{hypothesis}}", hypothesis)
-    # Reference customers: from Research Input, or from kb/reference_customers.md if field empty
-    ref_customers = (reference_customers or "").strip()
-    if not ref_customers:
-        ref_customers = (load_file("kb/reference_customers.md") or "").strip()
-    ref_block = ref_customers if ref_customers else "None provided—do not add customer references to the sequence."
-    prompt = prompt.replace("{{reference_customers}}", ref_block)
-    prompt = prompt.replace("{{sequence_template}}", sequence_structure)
-    prompt = prompt.replace("{{cursor_context}}", cursor_context)
-    
-    # Inject knowledge base content if available
-    kb_section = ""
-    if kb_content:
-        kb_section = "\n\n## Knowledge Base & Style Guide\n\n"
-        if "cursor_encyclopedia" in kb_content:
-            kb_section += "### Cursor Technical & Competitive Encyclopedia\n" + kb_content["cursor_encyclopedia"] + "\n\n"
-        if "voice" in kb_content:
-            kb_section += "### Voice & Style Guide\n" + kb_content["voice"] + "\n\n"
-        if "offers" in kb_content:
-            kb_section += "### Offer Library\n" + kb_content["offers"] + "\n\n"
-        if "sequence_patterns" in kb_content:
-            kb_section += "### Sequence Patterns\n" + kb_content["sequence_patterns"] + "\n\n"
-        if "personalization" in kb_content:
-            kb_section += "### Personalization Playbook\n" + kb_content["personalization"] + "\n\n"
-        kb_section += "---\n\n**CRITICAL**: The content above (Cursor encyclopedia, voice, offers, sequence patterns, personalization) is the PRIMARY source for wording, Cursor-specific claims, and style. Use it exactly. The persona lane (hook / Cursor play) only orients the angle for this audience—it must not override or replace the sharper messaging in this KB. Every email and LinkedIn message must end with a CTA (question preferred). Vary openers—do not use the same opener phrase more than once in the sequence.\n\n"
-    
-    prompt = prompt + kb_section
-    
-    # Add system context for Gemini
-    if provider == "gemini":
-        prompt = f"You are an expert B2B sales copywriter. Generate the COMPLETE outbound sequence. You MUST include every step through Day 15 breakup (core) and Day 9 (LinkedIn-only). Do not stop early or omit any step.\n\n{prompt}"
-    
+@contextmanager
+def timed(scope: str):
+    """Record how long this part of the page took to (re)run, in ms (shown in the sidebar)."""
+    started = time.perf_counter()
     try:
-        if provider == "gemini":
-            model = get_gemini_client()
-            if not model:
-                raise Exception("Gemini API key not configured")
-            response = model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.7,
-                    max_output_tokens=8192,
-                )
-            )
-            return response.text
-        else:  # OpenAI
-            client = get_openai_client()
-            if not client:
-                raise Exception("OpenAI API key not configured")
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are an expert B2B sales copywriter. Generate the COMPLETE outbound sequence. You MUST include every step through Day 15 breakup (core) and Day 9 (LinkedIn-only). Do not stop early or omit any step."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=8192
-            )
-            return response.choices[0].message.content
-    except Exception as e:
-        error_msg = str(e)
-        st.session_state["last_api_error"] = error_msg
-        is_quota = "quota" in error_msg.lower() or "insufficient" in error_msg.lower() or "429" in error_msg or "RATE_LIMIT" in str(e) or "resource_exhausted" in error_msg.lower()
-        if is_quota:
-            st.info("⏳ Rate limit hit. Waiting 20 seconds and retrying once...")
-            time.sleep(20)
+        with span(f"render.{scope.replace(' ', '_')}", page=st.session_state.get("page")):
+            yield
+    finally:
+        st.session_state.setdefault("rerun_ms", {})[scope] = (time.perf_counter() - started) * 1000
+
+
+def render_rerun_latency():
+    timings = st.session_state.get("rerun_ms") or {}
+    if timings:
+        theme = f" · theme {st.session_state.get('theme_bytes', 0):,} B" if "theme_bytes" in st.session_state else ""
+        st.caption("⏱ Last rerun: " + " · ".join(f"{scope} {ms:.0f} ms" for scope, ms in timings.items()) + theme)
+    held = session().footprint()
+    held_memo = st.session_state.stage_memo.footprint()
+    st.caption(f"Session data: {(held['memory_bytes'] + held_memo['memory_bytes']) / 1024:.0f} KB in memory, "
+               f"{(held['disk_bytes'] + held_memo['disk_bytes']) / 1024:.0f} KB on disk")
+
+
+JOB_POLL_SECONDS = 0.75
+
+
+def session_jobs() -> SessionJobs:
+    return st.session_state.session_jobs
+
+
+def _apply_hypothesis(hypothesis: str, source: dict = None):
+    session().hypothesis = hypothesis
+    session().hypothesis_source = source
+    start_pipeline(hypothesis)
+    personas = extract_personas_from_hypothesis(hypothesis, engine_config())
+    session().personas = personas
+    start_prefetch(hypothesis, personas)
+
+
+def start_hypothesis_job(force: bool = False):
+    """Generate the hypothesis in the background; it lands in the session on the next run after it finishes."""
+    graph = stage_graph()  # reads session state, so build it here rather than on the job's thread
+    research_data = dict(session().research_data)
+    exemplars = None
+    if st.session_state.get("use_similar_examples") and not graph.config.demo_mode:
+        exemplars = [run["hypothesis"] for run in similar_runs(research_data, k=2)] or None
+
+    def run(job):
+        job_graph = graph.with_notify(job.notify)
+        hypothesis = job_graph.hypothesis(research_data, force=force, exemplars=exemplars)
+        hit = job_graph.near_hit
+        if hit is None:
+            return hypothesis, None
+        from outbound_engine.similarity import research_diff
+        return hypothesis, {"similarity": hit["similarity"], "diff": research_diff(hit["research_data"], research_data)}
+
+    label = "Regenerating hypothesis" if force else "Generating hypothesis"
+    session_jobs().submit("hypothesis", label, run, apply=lambda result: _apply_hypothesis(*result))
+
+
+def start_sequences_job(lanes: list, force: bool = False):
+    """Generate the selected lanes' sequences one after another in the background, reporting per-lane progress."""
+    graph = stage_graph()
+    hypothesis = session().hypothesis
+    prospect_info = dict(session().prospect_info)
+    reference_customers = session().research_data.get("reference_customers", "")
+    prefetcher = st.session_state.prefetcher
+    pipeline_future = (st.session_state.get("pipeline_jobs") or {}).get("sequence")
+
+    def run(job):
+        job_graph = graph.with_notify(job.notify)
+        if pipeline_future is not None:
             try:
-                if provider == "gemini":
-                    model = get_gemini_client()
-                    if model:
-                        response = model.generate_content(prompt, generation_config=genai.types.GenerationConfig(temperature=0.7, max_output_tokens=8192))
-                        return response.text
-                else:
-                    client = get_openai_client()
-                    if client:
-                        response = client.chat.completions.create(model="gpt-4o", messages=[{"role": "system", "content": "You are an expert B2B sales copywriter. Generate the COMPLETE outbound sequence."}, {"role": "user", "content": prompt}], temperature=0.7, max_tokens=8192)
-                        return response.choices[0].message.content
-            except Exception as retry_e:
-                st.session_state["last_api_error"] = str(retry_e)
-            st.warning("⚠️ **Rate limit still in effect.** Wait a minute and try again, or enable billing in Google AI Studio for higher limits. Using demo mode for this run.")
-            return generate_demo_sequence(lane, hypothesis, prospect_info)
-        st.error(f"⚠️ **API Error**: {error_msg[:500]}")
-        st.info("Switching to demo mode. If this is an auth/key error, check Streamlit Secrets (GEMINI_API_KEY) and redeploy.")
-        if provider == "openai":
-            st.info("🔄 OpenAI failed, trying Gemini...")
+                pipeline_future.result()  # don't pay for the background lane twice
+            except Exception:
+                pass  # this run reports the error
+        sequences = {}
+        for idx, lane in enumerate(lanes):
+            job.progress(idx, lane["name"])
+            if not force:
+                prefetcher.wait(lane["id"])
+                prefetcher.record_use(job_graph, lane, hypothesis, prospect_info, reference_customers)
+            content = job_graph.sequence(lane, hypothesis, prospect_info, reference_customers=reference_customers, force=force)
+            sequences[lane["id"]] = {"name": lane["name"], "content": content, "validation": validate_sequence(content)}
+        job.progress(len(lanes))
+        return sequences
+
+    def apply(sequences):
+        session().sequences = sequences
+        session().current_sequence_lane_id = lanes[0]["id"]
+        session().clear_exports()
+        record_run()
+
+    label = "Sample sequences" if graph.config.demo_mode else "Generating sequences"
+    session_jobs().submit("sequences", label, run, apply=apply, total_steps=len(lanes))
+
+
+def start_handoff_job(force: bool = False):
+    graph = stage_graph()
+    hypothesis = session().hypothesis
+    pipeline_future = (st.session_state.get("pipeline_jobs") or {}).get("handoff")
+
+    def run(job):
+        if pipeline_future is not None:
             try:
-                st.session_state.ai_provider = "gemini"
-                model = get_gemini_client()
-                if model:
-                    response = model.generate_content(
-                        prompt,
-                        generation_config=genai.types.GenerationConfig(
-                            temperature=0.7,
-                            max_output_tokens=8192,
-                        )
-                    )
-                    return response.text
-            except:
-                st.warning("⚠️ Both providers failed. Switching to demo mode.")
-                return generate_demo_sequence(lane, hypothesis, prospect_info)
-        st.warning("⚠️ **API Error**: Switching to demo mode.")
-        return generate_demo_sequence(lane, hypothesis, prospect_info)
+                pipeline_future.result()
+            except Exception:
+                pass
+        return graph.with_notify(job.notify).handoff(hypothesis, force=force)
 
+    def apply(result):
+        session().ae_handoff = result
+        record_run()
 
-def generate_ae_handoff(hypothesis: str) -> str:
-    """Generate AE handoff note + filled-in first call agenda from the hypothesis."""
-    provider = get_ai_provider()
-    handoff_template = load_file("prompts/ae_handoff_template.md")
-    agenda_template = load_file("prompts/agenda_template.md")
-    if not handoff_template or not agenda_template:
-        return "Missing templates: ae_handoff_template.md or agenda_template.md"
-    prompt = f"""You are an expert sales strategist. Using ONLY the hypothesis below, generate two artifacts:
-
-1. **AE Handoff Note** – Follow the structure and instructions in the handoff template. Fill every section using only details from the hypothesis. Match the tone and depth of the Canva example in the template.
+    session_jobs().submit("handoff", "Generating handoff note and first call agenda", run, apply=apply)
 
-2. **First Call Agenda** – Follow the agenda template. Fill in every section marked "[Fill from hypothesis]" or with placeholders like [N], [API/product], [vertical], [challenge], [outcome], [Platform Engineering / relevant] using only the hypothesis. Keep all other wording from the template as written.
 
-Do not invent information. Use only what is in the hypothesis.
+@st.cache_resource
+def run_history() -> "RunHistory":
+    """Completed runs, shared by every session (and by batch runs writing the same file)."""
+    from outbound_engine.history import RunHistory
+    return RunHistory()
 
----
-## Handoff Template (structure to follow)
-{handoff_template}
 
----
-## Agenda Template (structure to follow, fill placeholders from hypothesis)
-{agenda_template}
+def similar_runs(research_data: dict, k: int = 3) -> list:
+    """Saved runs whose research looks most like this research (same KB version), best first."""
+    from outbound_engine.history import HistoryError
+    try:
+        return run_history().similar(research_data, k=k, kb_version=kb_version())
+    except (sqlite3.Error, HistoryError):
+        return []
 
----
-## Hypothesis (your only source)
-{hypothesis}
 
----
-Output your response in two clear sections with headers:
-## AE Handoff Note
-[full handoff note]
+def reuse_similar_hypothesis(research_data: dict, run: dict):
+    """Near hit: take a look-alike account's saved hypothesis for this research instead of generating one."""
+    session_jobs().cancel()
+    session().research_data = research_data
+    _apply_hypothesis(run["hypothesis"], source={"run_id": run["run_id"], "company": run["company"],
+                                                 "similarity": run["similarity"]})
+    st.session_state.page = "hypothesis"
+    st.rerun()
 
-## First Call Agenda
-[full filled-in agenda]
 
-**Critical:** Complete BOTH sections in full. Do not stop mid-sentence or omit the First Call Agenda. If you run out of space, prioritize finishing the agenda.
-"""
+def render_similar_accounts(research_data: dict):
+    """Look-alike saved accounts for the research typed so far, with their hypotheses to reuse."""
+    if not any(research_data.get(k) for k in ("company_info", "job_postings", "linkedin_profiles", "news_signals")):
+        return
+    matches = similar_runs(research_data)
+    if not matches:
+        return
+    with st.expander(f"🧭 {len(matches)} similar past account(s)", expanded=matches[0]["similarity"] >= 0.6):
+        st.caption("Accounts in the run history whose research overlaps most with this one. Reuse a hypothesis as-is "
+                   "(no API call), or tick the box below to show the model the closest ones as examples.")
+        for run in matches:
+            col_info, col_use = st.columns([5, 1])
+            with col_info:
+                updated = time.strftime("%Y-%m-%d", time.localtime(run["updated_at"]))
+                st.markdown(f"**{run['company']}** · {run['similarity']:.0%} similar · {updated}")
+                st.caption(" ".join(run["hypothesis"].split())[:220] + "…")
+            with col_use:
+                if st.button("Reuse hypothesis", key=f"reuse_similar_{run['run_id']}", use_container_width=True):
+                    reuse_similar_hypothesis(research_data, run)
+        st.checkbox("Use similar accounts' hypotheses as examples when generating", key="use_similar_examples",
+                    help="Adds up to two of the closest hypotheses to the prompt (more input tokens, usually a closer first draft).")
+
+
+def record_run():
+    """Save the current run to the history once it has sequences or a handoff (demo output is never saved)."""
+    data = session()
+    if st.session_state.get("demo_mode") or not data.hypothesis or not (data.sequences or data.ae_handoff):
+        return
+    from outbound_engine.history import HistoryError
+    config = engine_config()
     try:
-        if provider == "gemini":
-            model = get_gemini_client()
-            if not model:
-                raise Exception("Gemini API key not configured")
-            response = model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.5,
-                    max_output_tokens=8192,
-                )
-            )
-            return response.text.strip()
-        else:
-            client = get_openai_client()
-            if not client:
-                raise Exception("OpenAI API key not configured")
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are an expert sales strategist. Generate an AE handoff note and filled-in first call agenda using ONLY the provided hypothesis. Follow the templates exactly. Do not invent information. You MUST complete both sections in full—do not stop early or omit the First Call Agenda."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.5,
-                max_tokens=8192
-            )
-            return response.choices[0].message.content.strip()
-    except Exception as e:
-        return f"Error generating AE handoff: {str(e)}"
+        run_history().save(data.research_data, data.prospect_info, data.hypothesis, data.sequences,
+                           ae_handoff=data.ae_handoff, personas=data.personas,
+                           kb_version=kb_version(config.root), provider=config.provider)
+    except (sqlite3.Error, HistoryError) as e:
+        st.warning(f"Couldn't save this run to the history: {e}")
+
+
+def open_run(run_id: int):
+    """Load a saved run into the workflow (no API calls) and go to its sequences."""
+    started = time.perf_counter()
+    run = run_history().load(run_id)
+    if run is None:
+        st.warning("That run is no longer in the history.")
+        return
+    reset_session(rerun=False)
+    data = session()
+    data.research_data = run["research_data"]
+    data.prospect_info = run["prospect_info"]
+    data.hypothesis = run["hypothesis"]
+    data.personas = run["personas"]
+    data.sequences = {lane_id: {**seq, "validation": validate_sequence(seq["content"])}
+                      for lane_id, seq in run["sequences"].items()}
+    data.current_sequence_lane_id = next(iter(run["sequences"]), None)
+    data.ae_handoff = run["ae_handoff"]
+    st.session_state.history_opened = {"run_id": run_id, "ms": (time.perf_counter() - started) * 1000}
+    st.session_state.page = "sequence" if run["sequences"] else "hypothesis"
+    st.rerun()
+
+
+def start_from_run(run_id: int):
+    """New run seeded with a saved run's research and prospect, opened on the input page for editing."""
+    run = run_history().load(run_id)
+    if run is None:
+        st.warning("That run is no longer in the history.")
+        return
+    reset_session(rerun=False)
+    session().research_data = run["research_data"]
+    session().prospect_info = run["prospect_info"]
+    st.session_state.pop("research_reference_customers", None)  # keyed widget: let it take the loaded value
+    st.rerun()
+
+
+def apply_finished_jobs():
+    """Land results of background jobs that finished since the last run (even if the rep navigated away)."""
+    for job in session_jobs().collect():
+        for level, message in job.events:
+            _notify(level, message)
+        if job.status == FAILED:
+            st.error(f"{job.label} failed: {job.future.exception()}")
+        elif job.apply:
+            job.apply(job.future.result())
+
+
+def render_job_progress(name: str) -> bool:
+    """Progress bar for a running job, refreshed on its own until the job finishes. True if it is still running."""
+    job = session_jobs().get(name)
+    if job is None or job.status != RUNNING:
+        return False
+    st.session_state.watched_jobs.add(name)
+    _job_progress(name)
+    return True
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def _job_progress(name: str):
+    job = session_jobs().get(name)
+    if job is None:
+        return
+    if job.status != RUNNING:
+        st.rerun()  # a full run applies the result
+    step = f": {job.step_label}" if job.step_label else ""
+    counter = f" {job.done_steps + 1}/{job.total_steps}" if job.total_steps > 1 else ""
+    st.progress(min(job.done_steps / job.total_steps, 1.0), text=f"{job.label}{counter}{step}... ({job.elapsed:.0f}s)")
+
+
+def poll_jobs():
+    """Rerun while background jobs are outstanding so results land without a click. Jobs with a progress
+    fragment on the page refresh through it instead of rerunning the whole page."""
+    pending = session_jobs().pending()
+    if set(pending) - st.session_state.watched_jobs:
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
 
 
-def parse_sequence_to_csv(sequence: str, prospect_info: dict) -> pd.DataFrame:
-    """Parse the generated sequence into CSV format for Outreach.io."""
-    provider = get_ai_provider()
-    
-    # Count steps in the sequence to validate extraction
-    step_count = sequence.count("## Step") or sequence.count("Step ")
-    
-    csv_prompt = f"""
-Convert this outbound sequence into a structured CSV format. Extract EVERY SINGLE STEP and return ONLY valid CSV data with these exact columns:
-step_number,step_day,step_type,subject,body
-
-CRITICAL REQUIREMENTS:
-- The core sequence has 12 steps: Day 1 (email, LinkedIn connect, call), Day 3 (email, call), Day 5 (email, call), Day 8 (email), Day 9 (call), Day 11 (email), Day 12 (call), Day 15 (breakup email). Extract ALL 12 steps.
-- There may also be a separate "LinkedIn only" sequence (Day 1, 3, 5, 9). Include those steps too if present, so the CSV can have 12 or more rows for the core sequence.
-- Do NOT stop at step 9. You MUST include steps 10, 11, 12 (Day 11 email, Day 12 call, Day 15 breakup).
-- Count the steps in the sequence and ensure the CSV has a row for every single one.
-
-Rules:
-- step_number: 1, 2, 3, ... (numeric only, sequential)
-- step_day: Extract the day number from each step (e.g., "Day 1" = 1, "Day 15" = 15)
-- step_type: Email, LinkedIn, or Phone (exact values, case-sensitive)
-- subject: Email subject line (leave empty for LinkedIn/Phone steps)
-- body: The full message content (for phone, include opener and voicemail script)
-
-IMPORTANT CSV FORMATTING RULES:
-- Use double quotes to wrap fields that contain commas, newlines, or quotes
-- Escape any double quotes inside fields by doubling them ("" becomes "")
-- Do NOT include any markdown code blocks (no ```)
-- Do NOT include any explanations or text before/after the CSV
-- Start immediately with the header row: step_number,step_day,step_type,subject,body
-- Each row must be on a single line (use \\n for newlines within body field)
-- Ensure all rows have the same number of columns
-- Include ALL 12 core steps minimum. Do not truncate.
-
-Return ONLY the raw CSV data, nothing else.
-
-Sequence to convert:
-{sequence}
-"""
-    
-    csv_content = None
-    try:
-        if provider == "gemini":
-            model = get_gemini_client()
-            if not model:
-                st.error("Gemini API key not configured for CSV export")
-                return pd.DataFrame()
-            response = model.generate_content(
-                f"You are a data formatter. Convert sequences to clean CSV format. Extract ALL 12 core steps (through Day 15 breakup). Do not stop at step 9.\n\n{csv_prompt}",
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0,
-                    max_output_tokens=8192,
-                )
-            )
-            csv_content = response.text.strip()
-        else:  # OpenAI
-            client = get_openai_client()
-            if not client:
-                st.error("OpenAI API key not configured for CSV export")
-                return pd.DataFrame()
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are a data formatter. Convert sequences to clean CSV format. Extract ALL 12 core steps (through Day 15 breakup). Do not stop at step 9 or skip any steps."},
-                    {"role": "user", "content": csv_prompt}
-                ],
-                temperature=0,
-                max_tokens=8192
-            )
-            csv_content = response.choices[0].message.content.strip()
-        
-        # Remove any markdown code blocks
-        if csv_content.startswith("```"):
-            # Extract content from code block
-            lines = csv_content.split("\n")
-            # Find the first line that's not ``` or language identifier
-            start_idx = 1
-            if len(lines) > 1 and lines[1].strip() and not lines[1].strip().startswith("```"):
-                start_idx = 1
-            else:
-                start_idx = 2
-            # Find the last ```
-            end_idx = len(lines) - 1
-            for i in range(len(lines) - 1, -1, -1):
-                if lines[i].strip() == "```":
-                    end_idx = i
-                    break
-            csv_content = "\n".join(lines[start_idx:end_idx])
-        
-        # Clean up the CSV content
-        csv_content = csv_content.strip()
-        
-        # Remove any leading/trailing non-CSV content (explanations, etc.)
-        lines = csv_content.split("\n")
-        # Find the header row (should contain step_number, step_day, etc.)
-        header_idx = 0
-        for i, line in enumerate(lines):
-            if "step_number" in line.lower() and "step_day" in line.lower():
-                header_idx = i
-                break
-        csv_content = "\n".join(lines[header_idx:])
-        
-        # Try to fix common CSV issues
-        # Replace smart quotes with regular quotes
-        csv_content = csv_content.replace('"', '"').replace('"', '"')
-        csv_content = csv_content.replace(''', "'").replace(''', "'")
-        
-        # Parse CSV with more lenient options
-        df = None
-        parse_error = None
-        try:
-            # First try: standard pandas CSV parsing (default settings work best for most cases)
-            df = pd.read_csv(io.StringIO(csv_content), on_bad_lines='skip')
-        except Exception as e1:
-            parse_error = str(e1)
-            try:
-                # Second try: explicitly set quotechar
-                df = pd.read_csv(io.StringIO(csv_content), quotechar='"', on_bad_lines='skip')
-            except Exception as e2:
-                try:
-                    # Third try: use engine='python' which is more lenient with malformed CSV
-                    df = pd.read_csv(io.StringIO(csv_content), engine='python', on_bad_lines='skip', quotechar='"')
-                except Exception as e3:
-                    try:
-                        # Fourth try: use QUOTE_ALL (quoting=1) which handles all fields
-                        df = pd.read_csv(io.StringIO(csv_content), quoting=1, on_bad_lines='skip')
-                    except Exception as e4:
-                        # If all parsing attempts fail, raise with context
-                        raise Exception(f"CSV parsing failed. Last error: {str(e4)}. Raw CSV content (first 500 chars): {csv_content[:500]}")
-        
-        if df is None or df.empty:
-            raise Exception(f"Failed to parse CSV. Error: {parse_error}. Raw CSV content (first 500 chars): {csv_content[:500]}")
-        
-        # Validate that we captured all steps
-        # Count steps in the original sequence using multiple patterns
-        step_patterns = [
-            r'## Step \d+',
-            r'Step \d+:',
-            r'Step \d+ ',
-            r'Step \d+\.'  # For "Step 1." format
-        ]
-        step_matches = []
-        for pattern in step_patterns:
-            matches = re.findall(pattern, sequence, re.IGNORECASE)
-            if matches:
-                # Extract step numbers from matches
-                step_nums = [int(re.search(r'\d+', m).group()) for m in matches if re.search(r'\d+', m)]
-                step_matches.extend(step_nums)
-        
-        sequence_max_step = max(step_matches) if step_matches else 0
-        sequence_step_count = len(set(step_matches)) if step_matches else 0
-        
-        # Count steps in the parsed CSV
-        csv_step_count = len(df)
-        
-        # Check if step_number column exists and validate sequential steps
-        if 'step_number' in df.columns:
-            max_step = int(df['step_number'].max()) if not df['step_number'].isna().all() else 0
-            min_step = int(df['step_number'].min()) if not df['step_number'].isna().all() else 0
-            
-            # Check for missing steps
-            if max_step > csv_step_count:
-                st.warning(f"⚠️ **Warning**: CSV has {csv_step_count} rows but step numbers go up to {max_step}. Some steps may be missing.")
-            elif sequence_max_step > 0 and max_step < sequence_max_step:
-                st.warning(f"⚠️ **Warning**: Sequence has steps up to {sequence_max_step} but CSV only goes up to step {max_step}. Missing steps: {', '.join([str(i) for i in range(max_step + 1, sequence_max_step + 1)])}")
-            elif csv_step_count < sequence_step_count:
-                st.warning(f"⚠️ **Warning**: Sequence appears to have {sequence_step_count} steps but CSV only has {csv_step_count} rows. Some steps may be missing.")
-            
-            # Check for gaps in step numbers
-            if max_step > 0:
-                expected_steps = set(range(min_step, max_step + 1))
-                actual_steps = set(df['step_number'].dropna().astype(int))
-                missing_steps = expected_steps - actual_steps
-                if missing_steps:
-                    st.warning(f"⚠️ **Warning**: Missing step numbers in CSV: {', '.join([str(s) for s in sorted(missing_steps)])}")
-        
-        # Add prospect info columns
-        df['email'] = prospect_info.get('email', '')
-        df['first_name'] = prospect_info.get('first_name', '')
-        df['last_name'] = prospect_info.get('last_name', '')
-        df['title'] = prospect_info.get('title', '')
-        df['company'] = prospect_info.get('company', '')
-        df['sequence_name'] = f"Cursor Outbound - {prospect_info.get('company', 'Unknown')}"
-        
-        # Reorder columns
-        cols = ['email', 'first_name', 'last_name', 'title', 'company', 'sequence_name', 
-                'step_number', 'step_day', 'step_type', 'subject', 'body']
-        df = df[[c for c in cols if c in df.columns]]
-        
-        return df
-    except Exception as e:
-        error_msg = str(e)
-        # If it's a model not found error, show available models
-        if "404" in error_msg and "models/" in error_msg:
-            available_models = list_available_gemini_models()
-            if available_models:
-                st.error(f"Error parsing sequence to CSV: {error_msg}")
-                st.info(f"**Available Gemini models:** {', '.join(available_models)}")
-            else:
-                st.error(f"Error parsing sequence to CSV: {error_msg}")
-                st.info("💡 **Tip**: Try switching to OpenAI in the sidebar, or check your Gemini API key.")
+def _notify(level: str, message: str):
+    """Route outbound_engine stage messages to Streamlit."""
+    if level == "api_error":
+        st.session_state["last_api_error"] = message
+        st.session_state["last_api_error_raw"] = message
+    elif level == "provider":
+        st.session_state.ai_provider = message
+    elif level == "error":
+        st.error(message)
+    elif level == "warning":
+        st.warning(message)
+    else:
+        st.info(message)
+
+
+def _show_csv_error(error_msg: str, csv_content: str = None):
+    """Explain a failed CSV export (model-not-found hints, raw CSV for debugging)."""
+    # If it's a model not found error, show available models
+    if "404" in error_msg and "models/" in error_msg:
+        available_models = list_available_gemini_models(_get_gemini_key())
+        if available_models:
+            st.error(f"Error parsing sequence to CSV: {error_msg}")
+            st.info(f"**Available Gemini models:** {', '.join(available_models)}")
         else:
             st.error(f"Error parsing sequence to CSV: {error_msg}")
-            # Show raw CSV content for debugging if available
-            if csv_content:
-                with st.expander("🔍 Debug: View raw CSV content from AI"):
-                    st.code(csv_content, language="text")
-                    st.info("💡 **Tip**: The AI may have generated malformed CSV. Try regenerating the sequence or switch to OpenAI provider.")
-        return pd.DataFrame()
+            st.info("💡 **Tip**: Try switching to OpenAI in the sidebar, or check your Gemini API key.")
+    else:
+        st.error(f"Error parsing sequence to CSV: {error_msg}")
+        # Show raw CSV content for debugging if available
+        if csv_content:
+            with st.expander("🔍 Debug: View raw CSV content from AI"):
+                st.code(csv_content, language="text")
+                st.info("💡 **Tip**: The AI may have generated malformed CSV. Try regenerating the sequence or switch to OpenAI provider.")
 
 
 def render_breadcrumb(current_page: str):
@@ -1919,6 +714,22 @@ def _debug_secrets():
                 st.text(raw[:400] + "…" if len(raw) > 400 else raw)
 
 
+def render_validation_report(sequence_entry: dict):
+    """Show structure/voice findings for a generated sequence (validated right after generation)."""
+    report = sequence_entry.get("validation")
+    if report is None:
+        report = validate_sequence(sequence_entry.get("content", ""))
+        sequence_entry["validation"] = report
+    if not report.findings:
+        st.success(f"✅ Sequence checks passed: {len(report.core_steps)} core steps, {len(report.linkedin_only_steps)} LinkedIn-only steps.")
+        return
+    label = f"{'⚠️' if report.errors else '💡'} Sequence checks: {len(report.errors)} error(s), {len(report.warnings)} warning(s)"
+    with st.expander(label, expanded=bool(report.errors)):
+        for finding in report.findings:
+            where = f"**{finding.step}:** " if finding.step else ""
+            st.markdown(f"- {'❌' if finding.severity == 'error' else '⚠️'} {where}{finding.message}")
+
+
 def render_sidebar():
     """Render the sidebar with navigation and settings."""
     with st.sidebar:
@@ -1928,6 +739,15 @@ def render_sidebar():
         # Status badges
         render_status_badges()
         _debug_secrets()
+        for job in session_jobs().running():
+            st.caption(f"⏳ {job.label} in the background ({job.elapsed:.0f}s)")
+        calls = provider_stats()
+        if calls["timed_out"] or calls["cancelled"]:
+            st.caption(f"Provider calls: {calls['calls']} ({calls['timed_out']} timed out, {calls['cancelled']} cancelled)")
+        shared = IN_FLIGHT.stats()["joined"]
+        if shared:
+            st.caption(f"🔗 {shared} generation(s) shared with an identical request already in progress")
+        render_rerun_latency()
         
         st.markdown("---")
         st.markdown("### Navigation")
@@ -1944,6 +764,9 @@ def render_sidebar():
         if st.button("4. AE Handoff", use_container_width=True):
             st.session_state.page = "ae_handoff"
             st.rerun()
+        if st.button("🗂 Run History", use_container_width=True):
+            st.session_state.page = "history"
+            st.rerun()
         
         st.markdown("---")
         st.markdown("### Settings")
@@ -2059,37 +882,38 @@ def render_sidebar():
                 # Debug: Show available models
                 if st.button("🔍 List Available Models", help="Check which Gemini models are available with your API key"):
                     with st.spinner("Checking available models..."):
-                        models = list_available_gemini_models()
+                        models = list_available_gemini_models(_get_gemini_key())
                         if models:
                             st.success(f"**Available models:** {', '.join(models)}")
                         else:
                             st.warning("Could not retrieve model list. Check your API key.")
         
+            st.session_state.pipeline_enabled = st.checkbox(
+                "Prepare handoff & first sequence in background",
+                value=st.session_state.get("pipeline_enabled", False),
+                help="When a hypothesis is generated, start the AE handoff and the first selected lane's sequence right away (uses 2 extra API calls per hypothesis)."
+            )
+            st.session_state.prefetch_enabled = st.checkbox(
+                "Prefetch likely lanes",
+                value=st.session_state.get("prefetch_enabled", False),
+                help=f"Guess which persona lanes the hypothesis points to and generate up to {st.session_state.prefetcher.max_lanes} of them in the background (at most {st.session_state.prefetcher.budget} extra API calls per session)."
+            )
+            st.session_state.near_duplicates_enabled = st.checkbox(
+                "Reuse hypothesis for near-identical research",
+                value=st.session_state.get("near_duplicates_enabled", False),
+                help="If you only tweaked the research since a hypothesis was generated this session, show that hypothesis instead of paying for a new one. The hypothesis page says when this happens and has a Force refresh button."
+            )
+            if st.session_state.near_duplicates_enabled:
+                near_duplicates().threshold = st.slider(
+                    "Near-identical above", min_value=0.70, max_value=0.99, step=0.01,
+                    value=near_duplicates().threshold,
+                    help="Share of the research's three-word phrases that must match (editing one sentence of a long paste stays around 0.9)."
+                )
+        
         # Reset button
         st.markdown("---")
         if st.button("🔄 Reset All", use_container_width=True, help="Clear all data and return to research input"):
-            # Preserve API keys and settings
-            preserved_openai_key = st.session_state.get("openai_api_key")
-            preserved_gemini_key = st.session_state.get("gemini_api_key")
-            preserved_provider = st.session_state.get("ai_provider")
-            preserved_demo_mode = st.session_state.get("demo_mode")
-            
-            for key in ['research_data', 'hypothesis', 'personas', 'selected_persona', 'sequence', 'prospect_info', 'csv_data', 'ae_handoff']:
-                if key in st.session_state:
-                    st.session_state[key] = {} if key in ['research_data', 'prospect_info'] else None if key in ['hypothesis', 'selected_persona', 'sequence', 'csv_data', 'ae_handoff'] else []
-            
-            # Restore preserved values
-            if preserved_openai_key:
-                st.session_state.openai_api_key = preserved_openai_key
-            if preserved_gemini_key:
-                st.session_state.gemini_api_key = preserved_gemini_key
-            if preserved_provider:
-                st.session_state.ai_provider = preserved_provider
-            if preserved_demo_mode is not None:
-                st.session_state.demo_mode = preserved_demo_mode
-            
-            st.session_state.page = "input"
-            st.rerun()
+            reset_session()
 
 
 def render_input_page():
@@ -2107,29 +931,7 @@ def render_input_page():
         st.markdown("Paste your research below to generate a Cursor-specific outbound hypothesis.")
     with col_refresh:
         if st.button("🔄 Refresh / Start Over", use_container_width=True, help="Clear all data and start fresh"):
-            # Preserve API keys and settings
-            preserved_openai_key = st.session_state.get("openai_api_key")
-            preserved_gemini_key = st.session_state.get("gemini_api_key")
-            preserved_provider = st.session_state.get("ai_provider")
-            preserved_demo_mode = st.session_state.get("demo_mode")
-            
-            # Clear all session state
-            for key in ['research_data', 'hypothesis', 'personas', 'selected_persona', 'sequence', 'sequences', 'selected_lanes', 'current_sequence_lane_id', 'prospect_info', 'csv_data', 'ae_handoff']:
-                if key in st.session_state:
-                    st.session_state[key] = {} if key in ['research_data', 'prospect_info', 'sequences'] else None if key in ['hypothesis', 'selected_persona', 'sequence', 'csv_data', 'ae_handoff', 'current_sequence_lane_id'] else [] if key in ['personas', 'selected_lanes'] else None
-            
-            # Restore preserved values
-            if preserved_openai_key:
-                st.session_state.openai_api_key = preserved_openai_key
-            if preserved_gemini_key:
-                st.session_state.gemini_api_key = preserved_gemini_key
-            if preserved_provider:
-                st.session_state.ai_provider = preserved_provider
-            if preserved_demo_mode is not None:
-                st.session_state.demo_mode = preserved_demo_mode
-            
-            st.session_state.page = "input"
-            st.rerun()
+            reset_session()
     
     col1, col2 = st.columns(2)
     
@@ -2138,14 +940,14 @@ def render_input_page():
             "Company Overview",
             placeholder="Paste company info from website, Crunchbase, etc.\n\nInclude: company name, size, industry, funding, tech stack, recent news...",
             height=200,
-            value=st.session_state.research_data.get("company_info", "")
+            value=session().research_data.get("company_info", "")
         )
         
         job_postings = st.text_area(
             "Relevant Job Postings",
             placeholder="Paste as many relevant job postings as you have (3–5+ improves hypothesis quality).\n\nLook for: DevEx, Platform Engineering, Developer Productivity roles...",
             height=200,
-            value=st.session_state.research_data.get("job_postings", "")
+            value=session().research_data.get("job_postings", "")
         )
     
     with col2:
@@ -2153,14 +955,14 @@ def render_input_page():
             "Target Persona LinkedIn Profiles",
             placeholder="Paste as many target persona profiles as you have (3–5+ improves hypothesis and sequences).\n\nInclude: name, title, background, recent posts...",
             height=200,
-            value=st.session_state.research_data.get("linkedin_profiles", "")
+            value=session().research_data.get("linkedin_profiles", "")
         )
         
         news_signals = st.text_area(
             "Recent News/Signals",
             placeholder="Paste relevant headlines or summaries\n\nLook for: funding rounds, hiring surges, tech blog posts, conference talks...",
             height=200,
-            value=st.session_state.research_data.get("news_signals", "")
+            value=session().research_data.get("news_signals", "")
         )
     
     st.markdown("#### Optional: Current customers to reference")
@@ -2168,10 +970,19 @@ def render_input_page():
         "Current customers / references (similar accounts)",
         placeholder="Paste a short list of current customers you can reference (similar to this account).\n\nWe'll weave 1–2 references into the sequence (e.g. 'Teams at [X] have seen...'). Not required.",
         height=100,
-        value=st.session_state.research_data.get("reference_customers", ""),
+        value=session().research_data.get("reference_customers", ""),
         key="research_reference_customers"
     )
     
+    typed_research = {
+        "company_info": company_info,
+        "job_postings": job_postings,
+        "linkedin_profiles": linkedin_profiles,
+        "news_signals": news_signals,
+        "reference_customers": reference_customers.strip() if reference_customers else ""
+    }
+    render_similar_accounts(typed_research)
+    
     # Check if API key is configured or demo mode is enabled
     demo_mode = st.session_state.get("demo_mode", False)
     provider = get_ai_provider()
@@ -2192,24 +1003,11 @@ def render_input_page():
             return
         
         # Store research data
-        st.session_state.research_data = {
-            "company_info": company_info,
-            "job_postings": job_postings,
-            "linkedin_profiles": linkedin_profiles,
-            "news_signals": news_signals,
-            "reference_customers": reference_customers.strip() if reference_customers else ""
-        }
-        
-        # Generate hypothesis
-        demo_mode = st.session_state.get("demo_mode", False)
-        with st.spinner("Analyzing research and generating hypothesis..." if not demo_mode else "Generating sample hypothesis..."):
-            hypothesis = generate_hypothesis(st.session_state.research_data, use_demo=demo_mode)
-            st.session_state.hypothesis = hypothesis
-            
-            # Extract personas
-            personas = extract_personas_from_hypothesis(hypothesis)
-            st.session_state.personas = personas
+        session().research_data = typed_research
         
+        # Generate hypothesis (in the background; the hypothesis page shows progress)
+        session().hypothesis = None
+        start_hypothesis_job()
         st.session_state.page = "hypothesis"
         st.rerun()
 
@@ -2228,31 +1026,9 @@ def render_hypothesis_page():
         st.markdown("### Outbound Hypothesis")
     with col_refresh:
         if st.button("🔄 Refresh / Start Over", use_container_width=True, help="Clear all data and start fresh"):
-            # Preserve API keys and settings
-            preserved_openai_key = st.session_state.get("openai_api_key")
-            preserved_gemini_key = st.session_state.get("gemini_api_key")
-            preserved_provider = st.session_state.get("ai_provider")
-            preserved_demo_mode = st.session_state.get("demo_mode")
-            
-            # Clear all session state
-            for key in ['research_data', 'hypothesis', 'personas', 'selected_persona', 'sequence', 'sequences', 'selected_lanes', 'current_sequence_lane_id', 'prospect_info', 'csv_data', 'ae_handoff']:
-                if key in st.session_state:
-                    st.session_state[key] = {} if key in ['research_data', 'prospect_info', 'sequences'] else None if key in ['hypothesis', 'selected_persona', 'sequence', 'csv_data', 'ae_handoff', 'current_sequence_lane_id'] else [] if key in ['personas', 'selected_lanes'] else None
-            
-            # Restore preserved values
-            if preserved_openai_key:
-                st.session_state.openai_api_key = preserved_openai_key
-            if preserved_gemini_key:
-                st.session_state.gemini_api_key = preserved_gemini_key
-            if preserved_provider:
-                st.session_state.ai_provider = preserved_provider
-            if preserved_demo_mode is not None:
-                st.session_state.demo_mode = preserved_demo_mode
-            
-            st.session_state.page = "input"
-            st.rerun()
+            reset_session()
     
-    if not st.session_state.research_data:
+    if not session().research_data:
         st.warning("No research data found. Please go back and input your research.")
         if st.button("← Back to Input"):
             st.session_state.page = "input"
@@ -2260,17 +1036,31 @@ def render_hypothesis_page():
         return
     
     # Show the hypothesis
-    if st.session_state.hypothesis:
-        st.markdown(st.session_state.hypothesis)
-    else:
+    generating = render_job_progress("hypothesis")
+    if session().hypothesis:
+        source = session().hypothesis_source
+        if source and "company" in source:
+            st.info(f"♻️ Reused from **{source['company']}** ({source['similarity']:.0%} similar research), no API call. "
+                    "Click Regenerate to write one for this account.")
+        elif source:
+            col_note, col_refresh = st.columns([4, 1])
+            with col_note:
+                st.info(f"⚡ Served from similar run: this session already has a hypothesis for research "
+                        f"{source['similarity']:.0%} like this (no API call).")
+            with col_refresh:
+                if st.button("Force refresh", use_container_width=True, disabled=generating,
+                             help="Generate a hypothesis for exactly this research"):
+                    start_hypothesis_job(force=True)
+                    st.rerun()
+            if source["diff"]:
+                with st.expander("What changed in the research since then"):
+                    st.code(source["diff"], language="diff")
+        st.markdown(session().hypothesis)
+        render_pipeline_status()
+    elif session_jobs().get("hypothesis") is None:
         # Generate if not yet done
-        demo_mode = st.session_state.get("demo_mode", False)
-        with st.spinner("Generating hypothesis..." if not demo_mode else "Generating sample hypothesis..."):
-            hypothesis = generate_hypothesis(st.session_state.research_data, use_demo=demo_mode)
-            st.session_state.hypothesis = hypothesis
-            personas = extract_personas_from_hypothesis(hypothesis)
-            st.session_state.personas = personas
-            st.rerun()
+        start_hypothesis_job()
+        st.rerun()
     
     st.markdown("---")
     col1, col2, col3 = st.columns([1, 1, 1])
@@ -2281,14 +1071,9 @@ def render_hypothesis_page():
             st.rerun()
     
     with col2:
-        if st.button("Regenerate", use_container_width=True):
-            demo_mode = st.session_state.get("demo_mode", False)
-            with st.spinner("Regenerating hypothesis..." if not demo_mode else "Regenerating sample hypothesis..."):
-                hypothesis = generate_hypothesis(st.session_state.research_data, use_demo=demo_mode)
-                st.session_state.hypothesis = hypothesis
-                personas = extract_personas_from_hypothesis(hypothesis)
-                st.session_state.personas = personas
-                st.rerun()
+        if st.button("Regenerate", use_container_width=True, disabled=generating):
+            start_hypothesis_job(force=True)
+            st.rerun()
     
     with col3:
         if st.button("Build Sequence →", type="primary"):
@@ -2310,31 +1095,9 @@ def render_sequence_page():
         st.markdown("### Sequence Builder")
     with col_refresh:
         if st.button("🔄 Refresh / Start Over", use_container_width=True, help="Clear all data and start fresh"):
-            # Preserve API keys and settings
-            preserved_openai_key = st.session_state.get("openai_api_key")
-            preserved_gemini_key = st.session_state.get("gemini_api_key")
-            preserved_provider = st.session_state.get("ai_provider")
-            preserved_demo_mode = st.session_state.get("demo_mode")
-            
-            # Clear all session state
-            for key in ['research_data', 'hypothesis', 'personas', 'selected_persona', 'sequence', 'sequences', 'selected_lanes', 'current_sequence_lane_id', 'prospect_info', 'csv_data', 'ae_handoff']:
-                if key in st.session_state:
-                    st.session_state[key] = {} if key in ['research_data', 'prospect_info', 'sequences'] else None if key in ['hypothesis', 'selected_persona', 'sequence', 'csv_data', 'ae_handoff', 'current_sequence_lane_id'] else [] if key in ['personas', 'selected_lanes'] else None
-            
-            # Restore preserved values
-            if preserved_openai_key:
-                st.session_state.openai_api_key = preserved_openai_key
-            if preserved_gemini_key:
-                st.session_state.gemini_api_key = preserved_gemini_key
-            if preserved_provider:
-                st.session_state.ai_provider = preserved_provider
-            if preserved_demo_mode is not None:
-                st.session_state.demo_mode = preserved_demo_mode
-            
-            st.session_state.page = "input"
-            st.rerun()
+            reset_session()
     
-    if not st.session_state.hypothesis:
+    if not session().hypothesis:
         st.warning("No hypothesis found. Please generate a hypothesis first.")
         if st.button("← Back to Hypothesis"):
             st.session_state.page = "hypothesis"
@@ -2363,7 +1126,7 @@ def render_sequence_page():
         key="persona_lane_multiselect",
         help="Pick the audience buckets you want sequences for. Each gets its own hook and Cursor play."
     )
-    st.session_state.selected_lanes = list(st.session_state.get("persona_lane_multiselect", selected_labels))
+    session().selected_lanes = list(st.session_state.get("persona_lane_multiselect", selected_labels))
     
     # Optional example prospect (for draft personalization)
     st.markdown("#### Example prospect (optional)")
@@ -2371,14 +1134,14 @@ def render_sequence_page():
     
     col1, col2 = st.columns(2)
     with col1:
-        first_name = st.text_input("First Name", value=st.session_state.prospect_info.get("first_name", ""), placeholder="John")
-        last_name = st.text_input("Last Name", value=st.session_state.prospect_info.get("last_name", ""), placeholder="Smith")
-        email = st.text_input("Email", value=st.session_state.prospect_info.get("email", ""), placeholder="john.smith@company.com")
+        first_name = st.text_input("First Name", value=session().prospect_info.get("first_name", ""), placeholder="John")
+        last_name = st.text_input("Last Name", value=session().prospect_info.get("last_name", ""), placeholder="Smith")
+        email = st.text_input("Email", value=session().prospect_info.get("email", ""), placeholder="john.smith@company.com")
     with col2:
-        company = st.text_input("Company", value=st.session_state.prospect_info.get("company", ""), placeholder="Acme Corp")
-        title = st.text_input("Job Title (optional)", value=st.session_state.prospect_info.get("title", ""), placeholder="VP Engineering")
+        company = st.text_input("Company", value=session().prospect_info.get("company", ""), placeholder="Acme Corp")
+        title = st.text_input("Job Title (optional)", value=session().prospect_info.get("title", ""), placeholder="VP Engineering")
     
-    st.session_state.prospect_info = {
+    session().prospect_info = {
         "first_name": first_name,
         "last_name": last_name,
         "email": email,
@@ -2386,6 +1149,22 @@ def render_sequence_page():
         "title": title
     }
     
+    # Background pipeline result for the default lane (same lane and prospect only)
+    jobs = st.session_state.get("pipeline_jobs") or {}
+    if not session().sequences and "lane" in jobs and jobs["sequence"].done():
+        lane = jobs["lane"]
+        if f"{lane['id']}. {lane['name']}" in selected_labels:
+            content = stage_graph().cached_sequence(
+                lane,
+                session().hypothesis,
+                session().prospect_info,
+                session().research_data.get("reference_customers", "")
+            )
+            if content:
+                session().sequences = {lane["id"]: {"name": lane["name"], "content": content, "validation": validate_sequence(content)}}
+                session().current_sequence_lane_id = lane["id"]
+                record_run()
+    
     st.markdown("---")
     
     # Generate sequences button
@@ -2397,7 +1176,11 @@ def render_sequence_page():
         has_api_key = bool(_get_gemini_key())
     can_generate = demo_mode or has_api_key
     
-    if st.button("Generate sequences", type="primary", use_container_width=True, disabled=not can_generate):
+    # Unchanged lanes come back from the memo; Regenerate asks the provider again
+    generating = render_job_progress("sequences")
+    generate_clicked = st.button("Generate sequences", type="primary", use_container_width=True, disabled=not can_generate or generating)
+    regenerate = bool(session().sequences) and st.button("Regenerate sequences", use_container_width=True, disabled=not can_generate or generating, help="Ask the AI again for the selected lanes, even if nothing changed")
+    if generate_clicked or regenerate:
         if not selected_labels:
             st.error("Please select at least one persona lane.")
         else:
@@ -2405,43 +1188,81 @@ def render_sequence_page():
             if not lanes_to_gen:
                 st.error("Could not resolve selected lanes.")
             else:
-                st.session_state.sequences = {}
-                for idx, lane in enumerate(lanes_to_gen):
-                    with st.spinner(f"Generating sequence {idx + 1}/{len(lanes_to_gen)}: {lane['name']}..." if not demo_mode else f"Sample sequence {idx + 1}/{len(lanes_to_gen)}: {lane['name']}..."):
-                        content = generate_sequence(
-                            lane,
-                            st.session_state.hypothesis,
-                            st.session_state.prospect_info,
-                            use_demo=demo_mode,
-                            reference_customers=st.session_state.research_data.get("reference_customers", "")
-                        )
-                        st.session_state.sequences[lane["id"]] = {"name": lane["name"], "content": content}
-                st.session_state.current_sequence_lane_id = lanes_to_gen[0]["id"]
-                st.session_state.csv_data = None
+                start_sequences_job(lanes_to_gen, force=regenerate)
                 st.rerun()
     
-    # Display generated sequences (selector + one at a time)
-    if st.session_state.sequences:
+    prefetch_stats = st.session_state.prefetcher.stats()
+    if prefetch_stats["prefetched"]:
+        st.caption(f"Prefetch: {prefetch_stats['used']}/{prefetch_stats['prefetched']} speculative lane(s) used "
+                   f"({prefetch_stats['hit_rate']:.0%} hit rate, {prefetch_stats['spent']}/{prefetch_stats['budget']} calls spent).")
+    
+    # Display generated sequences (selector + one at a time) and export the one on screen
+    if session().sequences:
+        render_sequence_viewer()
+        render_export_panel(demo_mode)
+    
+    # Navigation
+    st.markdown("---")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if st.button("← Back to Hypothesis"):
+            st.session_state.page = "hypothesis"
+            st.rerun()
+    with col2:
+        if session().sequences:
+            if st.button("Generate different lanes", use_container_width=True):
+                session().sequences = {}
+                session().selected_lanes = []
+                session().current_sequence_lane_id = None
+                session().clear_exports()
+                if "persona_lane_multiselect" in st.session_state:
+                    st.session_state.persona_lane_multiselect = []
+                st.rerun()
+    with col3:
+        if st.button("AE Handoff →", type="primary", use_container_width=True):
+            st.session_state.page = "ae_handoff"
+            st.rerun()
+
+
+@st.fragment
+def render_sequence_viewer():
+    """Lane selector + current sequence. Switching lanes reruns only this part of the page."""
+    with timed("sequence viewer"):
         st.markdown("---")
-        lane_ids = list(st.session_state.sequences.keys())
-        current_id = st.session_state.current_sequence_lane_id or lane_ids[0]
+        sequences = session().sequences
+        lane_ids = list(sequences.keys())
+        current_id = session().current_sequence_lane_id or lane_ids[0]
         if current_id not in lane_ids:
             current_id = lane_ids[0]
-            st.session_state.current_sequence_lane_id = current_id
-        
-        display_names = [st.session_state.sequences[lid]["name"] for lid in lane_ids]
+            session().current_sequence_lane_id = current_id
+
+        display_names = [sequences[lid]["name"] for lid in lane_ids]
         selected_index = lane_ids.index(current_id)
         chosen = st.selectbox("View sequence", options=display_names, index=selected_index)
-        st.session_state.current_sequence_lane_id = lane_ids[display_names.index(chosen)]
-        current_content = st.session_state.sequences[st.session_state.current_sequence_lane_id]["content"]
-        
+        session().current_sequence_lane_id = lane_ids[display_names.index(chosen)]
+        current_content = sequences[session().current_sequence_lane_id]["content"]
+
         st.markdown(f"#### {chosen}")
+        render_validation_report(sequences[session().current_sequence_lane_id])
         st.markdown(current_content)
-        
+
+
+@st.fragment
+def render_export_panel(demo_mode: bool):
+    """CSV export, downloads and Outreach push for the sequence on screen (reruns on its own). A sibling of
+    the viewer, not nested in it, so switching lanes doesn't redraw it; it reads the lane on screen when it runs."""
+    with timed("export panel"):
+        sequences = session().sequences
+        lane_ids = list(sequences.keys())
+        current_id = session().current_sequence_lane_id
+        if current_id not in sequences:
+            current_id = lane_ids[0]
+        chosen = sequences[current_id]["name"]
+        current_content = sequences[current_id]["content"]
         # Export section (for current sequence)
         st.markdown("---")
         st.markdown("#### Export to Outreach.io")
-        export_prospect = st.session_state.prospect_info
+        export_prospect = session().prospect_info
         if not export_prospect.get("first_name") or not export_prospect.get("company"):
             export_prospect = {
                 "first_name": "[First Name]",
@@ -2454,9 +1275,14 @@ def render_sequence_page():
         with col1:
             if st.button("Generate CSV Export", use_container_width=True, disabled=demo_mode):
                 with st.spinner("Formatting sequence for export..."):
-                    df = parse_sequence_to_csv(current_content, export_prospect)
+                    import pandas as pd  # imported on first export, not at startup
+                    try:
+                        df = stage_graph().csv_frame(current_content, export_prospect)
+                    except CsvExportError as e:
+                        _show_csv_error(str(e), e.csv_content)
+                        df = pd.DataFrame()
                     if not df.empty:
-                        st.session_state.csv_data = df.to_csv(index=False)
+                        session().csv_data = df.to_csv(index=False)
                         step_count = len(df)
                         max_step = int(df['step_number'].max()) if 'step_number' in df.columns and not df['step_number'].isna().all() else step_count
                         st.success(f"✅ CSV generated with {step_count} step(s) (up to step {max_step})!")
@@ -2464,37 +1290,90 @@ def render_sequence_page():
             elif demo_mode:
                 st.info("💡 CSV export requires API access. Enable AI mode in sidebar to export.")
         with col2:
-            if st.session_state.get("csv_data"):
+            if session().csv_data:
                 safe_name = (export_prospect.get("company") or chosen).replace(" ", "_").replace("[", "").replace("]", "").lower()
                 st.download_button(
                     "Download CSV",
-                    data=st.session_state.csv_data,
+                    data=session().csv_data,
                     file_name=f"outreach_sequence_{safe_name}.csv",
                     mime="text/csv",
                     use_container_width=True
                 )
-    
-    # Navigation
-    st.markdown("---")
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        if st.button("← Back to Hypothesis"):
-            st.session_state.page = "hypothesis"
-            st.rerun()
-    with col2:
-        if st.session_state.sequences:
-            if st.button("Generate different lanes", use_container_width=True):
-                st.session_state.sequences = {}
-                st.session_state.selected_lanes = []
-                st.session_state.current_sequence_lane_id = None
-                st.session_state.csv_data = None
-                if "persona_lane_multiselect" in st.session_state:
-                    st.session_state.persona_lane_multiselect = []
-                st.rerun()
-    with col3:
-        if st.button("AE Handoff →", type="primary", use_container_width=True):
-            st.session_state.page = "ae_handoff"
-            st.rerun()
+                from outbound_engine.outreach import OutreachConfig, OutreachError, sync_to_outreach
+                outreach_config = OutreachConfig.from_env()
+                if outreach_config.access_token:
+                    if st.button("Push to Outreach", use_container_width=True, help="Upsert the sequence steps and prospect straight to Outreach (safe to retry)"):
+                        with st.spinner("Syncing to Outreach..."):
+                            import pandas as pd
+                            try:
+                                rows = pd.read_csv(io.StringIO(session().csv_data)).fillna("").to_dict("records")
+                                result = sync_to_outreach(rows, outreach_config)
+                                created = ", ".join(f"{n} {k}" for k, n in result.created.items()) or "nothing new"
+                                updated = ", ".join(f"{n} {k}" for k, n in result.updated.items()) or "nothing"
+                                st.success(f"✅ Outreach sync done. Created: {created}. Updated: {updated}.")
+                                if result.skipped:
+                                    st.info(f"Skipped {result.skipped} row(s) without a real prospect email (placeholders are not pushed).")
+                                for err in result.errors:
+                                    st.warning(f"⚠️ {err}")
+                            except OutreachError as e:
+                                st.error(f"⚠️ **Outreach Error**: {e}")
+
+        # Combined export: every generated lane in one action
+        if len(lane_ids) > 1:
+            st.markdown("##### All lanes")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                if st.button(f"Export all {len(lane_ids)} lanes", use_container_width=True, disabled=demo_mode, help="Parse every lane at once into one CSV with a lane column (plus a zip with one CSV per lane)"):
+                    with st.spinner(f"Formatting {len(lane_ids)} sequences for export..."):
+                        import pandas as pd
+                        try:
+                            df_all, failures = stage_graph().csv_frames(session().sequences, export_prospect)
+                        except CsvExportError as e:
+                            st.error(str(e))
+                            df_all, failures = pd.DataFrame(), {}
+                        for lane_name, error in failures.items():
+                            st.error(f"**{lane_name}:** CSV export failed for this lane.")
+                            _show_csv_error(str(error), error.csv_content)
+                        if not df_all.empty:
+                            session().csv_all_data = df_all.to_csv(index=False)
+                            session().csv_all_zip = build_lanes_zip(df_all)
+                            st.success(f"✅ Combined CSV generated: {df_all['lane'].nunique()} lane(s), {len(df_all)} step(s).")
+                            st.dataframe(df_all, use_container_width=True)
+            if session().csv_all_data:
+                safe_name = (export_prospect.get("company") or "all_lanes").replace(" ", "_").replace("[", "").replace("]", "").lower()
+                with col2:
+                    st.download_button(
+                        "Download combined CSV",
+                        data=session().csv_all_data,
+                        file_name=f"outreach_sequences_{safe_name}_all_lanes.csv",
+                        mime="text/csv",
+                        use_container_width=True
+                    )
+                with col3:
+                    st.download_button(
+                        "Download zip (CSV per lane)",
+                        data=session().csv_all_zip,
+                        file_name=f"outreach_sequences_{safe_name}.zip",
+                        mime="application/zip",
+                        use_container_width=True
+                    )
+
+
+
+@st.fragment
+def render_handoff_viewer(can_generate: bool):
+    """Generate button, progress and the handoff itself; generating reruns only this part of the page."""
+    with timed("handoff viewer"):
+        regenerate = bool(session().ae_handoff)
+        generating = render_job_progress("handoff")
+        if st.button("Regenerate AE Handoff" if regenerate else "Generate AE Handoff", type="primary", use_container_width=True, disabled=not can_generate or generating):
+            start_handoff_job(force=regenerate)
+            rerun_fragment()
+        
+        if session().ae_handoff:
+            st.markdown("---")
+            st.markdown("#### Generated AE Handoff")
+            st.markdown(session().ae_handoff)
 
 
 def render_ae_handoff_page():
@@ -2510,25 +1389,9 @@ def render_ae_handoff_page():
         st.markdown("Generate a handoff note and first call agenda for the Account Executive from the hypothesis.")
     with col_refresh:
         if st.button("🔄 Refresh / Start Over", use_container_width=True, help="Clear all data and start fresh"):
-            preserved_openai_key = st.session_state.get("openai_api_key")
-            preserved_gemini_key = st.session_state.get("gemini_api_key")
-            preserved_provider = st.session_state.get("ai_provider")
-            preserved_demo_mode = st.session_state.get("demo_mode")
-            for key in ['research_data', 'hypothesis', 'personas', 'selected_persona', 'sequence', 'sequences', 'selected_lanes', 'current_sequence_lane_id', 'prospect_info', 'csv_data', 'ae_handoff']:
-                if key in st.session_state:
-                    st.session_state[key] = {} if key in ['research_data', 'prospect_info', 'sequences'] else None if key in ['hypothesis', 'selected_persona', 'sequence', 'csv_data', 'ae_handoff', 'current_sequence_lane_id'] else [] if key in ['personas', 'selected_lanes'] else None
-            if preserved_openai_key:
-                st.session_state.openai_api_key = preserved_openai_key
-            if preserved_gemini_key:
-                st.session_state.gemini_api_key = preserved_gemini_key
-            if preserved_provider:
-                st.session_state.ai_provider = preserved_provider
-            if preserved_demo_mode is not None:
-                st.session_state.demo_mode = preserved_demo_mode
-            st.session_state.page = "input"
-            st.rerun()
+            reset_session()
     
-    if not st.session_state.hypothesis:
+    if not session().hypothesis:
         st.warning("No hypothesis found. Generate a hypothesis first (Research Input → Generate Hypothesis).")
         if st.button("← Back to Hypothesis"):
             st.session_state.page = "hypothesis"
@@ -2540,19 +1403,17 @@ def render_ae_handoff_page():
     has_api_key = bool(_get_openai_key()) if provider == "openai" else bool(_get_gemini_key())
     can_generate = has_api_key and not demo_mode
     
-    if st.button("Generate AE Handoff", type="primary", use_container_width=True, disabled=not can_generate):
-        with st.spinner("Generating handoff note and first call agenda..."):
-            result = generate_ae_handoff(st.session_state.hypothesis)
-            st.session_state.ae_handoff = result
-            st.rerun()
+    # Background pipeline result for this hypothesis
+    if not session().ae_handoff and can_generate:
+        job = (st.session_state.get("pipeline_jobs") or {}).get("handoff")
+        if job is not None and job.done():
+            session().ae_handoff = stage_graph().cached_handoff(session().hypothesis)
+            record_run()
     
     if demo_mode and not has_api_key:
         st.info("💡 Enable AI mode and add an API key in the sidebar to generate the AE handoff.")
     
-    if st.session_state.ae_handoff:
-        st.markdown("---")
-        st.markdown("#### Generated AE Handoff")
-        st.markdown(st.session_state.ae_handoff)
+    render_handoff_viewer(can_generate)
     
     st.markdown("---")
     if st.button("← Back to Sequence Builder"):
@@ -2560,19 +1421,92 @@ def render_ae_handoff_page():
         st.rerun()
 
 
+def render_history_page():
+    """Past runs: filter by company, lane and KB version, and reopen one without calling the provider."""
+    st.title("🎯 Outbound Engine")
+    st.markdown("### Run History")
+    st.markdown("Every run with sequences or a handoff is saved here (batch runs too). **Open** loads a run as-is (nothing is regenerated); **Start from** reuses its research for a new run.")
+
+    from outbound_engine.history import HistoryError
+    history = run_history()
+    query = st.text_input("Search research, hypotheses and sequences", key="history_query",
+                          placeholder='e.g. copilot fintech, "platform team" OR devex*',
+                          disabled=not history.search_available,
+                          help="Every word must appear (any form: pitch/pitched); use quotes for phrases, OR for either, * for prefixes.")
+    col1, col2, col3 = st.columns([2, 2, 1])
+    with col1:
+        company = st.text_input("Company", placeholder="Acme", key="history_company")
+    with col2:
+        lane = st.selectbox("Lane", options=[""] + history.lane_names(), format_func=lambda name: name or "Any lane",
+                            key="history_lane")
+    with col3:
+        current_kb = kb_version()
+        versions = history.kb_versions()
+        kb = st.selectbox("KB version", options=[""] + versions, key="history_kb",
+                          format_func=lambda v: "Any" if not v else f"{v} (current)" if v == current_kb else v)
+
+    filters = {"company": company.strip(), "lane": lane, "kb_version": kb}
+    started = time.perf_counter()
+    try:
+        runs = history.search(query, **filters) if query.strip() else history.runs(**filters)
+    except HistoryError as e:
+        st.warning(str(e))
+        return
+    if query.strip():
+        st.caption(f"{len(runs)} match(es) in {(time.perf_counter() - started) * 1000:.0f} ms")
+    if not runs:
+        st.info("No saved runs match." if len(history) else "No saved runs yet. Generate sequences or a handoff and they'll show up here.")
+        return
+
+    for run in runs:
+        with st.container(border=True):
+            col_info, col_open = st.columns([5, 1])
+            with col_info:
+                updated = time.strftime("%Y-%m-%d %H:%M", time.localtime(run["updated_at"]))
+                st.markdown(f"**{run['company']}** · {updated}")
+                stale = "" if run["kb_version"] == current_kb else " (older KB)"
+                st.caption(f"{', '.join(run['lanes']) or 'Handoff only'} · {run['provider']} · KB {run['kb_version']}{stale}")
+                if run.get("excerpt"):
+                    st.caption(f"“{run['excerpt']}”")
+            with col_open:
+                if st.button("Open", key=f"open_run_{run['run_id']}", use_container_width=True):
+                    open_run(run["run_id"])
+                if st.button("Start from", key=f"seed_run_{run['run_id']}", use_container_width=True,
+                             help="New run with this account's research and prospect (edit it, then generate)"):
+                    start_from_run(run["run_id"])
+
+
 def main():
     """Main application entry point."""
-    render_sidebar()
-    
-    # Render current page
-    if st.session_state.page == "input":
-        render_input_page()
-    elif st.session_state.page == "hypothesis":
-        render_hypothesis_page()
-    elif st.session_state.page == "sequence":
-        render_sequence_page()
-    elif st.session_state.page == "ae_handoff":
-        render_ae_handoff_page()
+    st.set_page_config(
+        page_title="Outbound Engine",
+        page_icon="🎯",
+        layout="wide"
+    )
+    _inject_streamlit_secrets_into_env()
+    _start_warm_up()
+    inject_warm_styles()
+    init_session_state()
+    st.session_state.watched_jobs = set()  # jobs with a progress fragment on the page this run
+    with timed("full page"):
+        apply_finished_jobs()
+        render_sidebar()
+        opened = st.session_state.pop("history_opened", None)
+        if opened:
+            st.toast(f"Opened a saved run in {opened['ms']:.0f} ms (no API calls).")
+        
+        # Render current page
+        if st.session_state.page == "input":
+            render_input_page()
+        elif st.session_state.page == "hypothesis":
+            render_hypothesis_page()
+        elif st.session_state.page == "sequence":
+            render_sequence_page()
+        elif st.session_state.page == "ae_handoff":
+            render_ae_handoff_page()
+        elif st.session_state.page == "history":
+            render_history_page()
+    poll_jobs()
 
 
 if __name__ == "__main__":
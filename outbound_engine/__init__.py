@@ -0,0 +1,21 @@
+"""
+Outbound Engine core.
+Streamlit-free building blocks shared by the UI (app.py), workers and scripts:
+prompt assembly, providers, parsing, KB loading, the memoized stage graph and
+sequence validation.
+"""
+
+from outbound_engine.config import EngineConfig
+from outbound_engine.generation import (
+    CsvExportError,
+    extract_personas_from_hypothesis,
+    generate_ae_handoff,
+    generate_hypothesis,
+    generate_sequence,
+    parse_all_sequences_to_csv,
+    parse_sequence_to_csv,
+)
+from outbound_engine.graph import MemoryMemo, StageGraph
+from outbound_engine.kb import kb_version, load_file, load_kb_files, load_persona_lanes
+from outbound_engine.providers import ProviderError, ProviderNotConfigured, RateLimitError
+from outbound_engine.validation import Finding, Step, ValidationReport, parse_steps, validate_sequence
@@ -0,0 +1,7 @@
+"""python -m outbound_engine <command> (see cli.py)."""
+
+import sys
+
+from outbound_engine.cli import main
+
+sys.exit(main())
@@ -0,0 +1,305 @@
+"""
+Batch runs.
+Research -> hypothesis -> lane sequences -> AE handoff for a list of accounts, without the UI.
+Accounts fan out over a thread pool; provider calls are spaced by EngineConfig.requests_per_minute,
+so the pool size sets concurrency and the throttle sets spend rate.
+
+Input is JSON Lines, one account per line:
+
+    {"id": "acme", "company_info": "...", "job_postings": "...", "linkedin_profiles": "...",
+     "news_signals": "...", "reference_customers": "...", "lanes": ["1", "3"],
+     "prospect": {"first_name": "", "company": "Acme"}}
+
+Only one research field is required; id, lanes and prospect are optional.
+"""
+
+import json
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from outbound_engine.config import EngineConfig
+from outbound_engine.generation import CsvExportError
+from outbound_engine.graph import StageGraph
+from outbound_engine.history import HistoryError
+from outbound_engine.jobstore import DONE
+from outbound_engine.kb import kb_version, load_persona_lanes
+from outbound_engine.validation import validate_sequence
+
+RESEARCH_FIELDS = ("company_info", "job_postings", "linkedin_profiles", "news_signals")
+PROSPECT_FIELDS = ("first_name", "last_name", "email", "company", "title")
+
+
+class BatchInputError(ValueError):
+    """An accounts file line could not be used."""
+
+
+@dataclass
+class Account:
+    """One account to run: the UI's research inputs plus optional lanes and example prospect."""
+    account_id: str
+    research_data: dict
+    prospect_info: dict
+    lanes: list = None
+
+
+@dataclass
+class AccountResult:
+    account_id: str
+    out_dir: Path = None
+    hypothesis: str = ""
+    sequences: dict = field(default_factory=dict)
+    handoff: str = ""
+    events: list = field(default_factory=list)
+    error: str = ""
+    elapsed: float = 0.0
+    reused: int = 0  # stages served from the job store memo
+    skipped: bool = False  # already finished in the job store; nothing ran
+    prior_summary: dict = None
+
+    @property
+    def ok(self) -> bool:
+        return not self.error
+
+    def summary(self) -> dict:
+        if self.skipped and self.prior_summary:
+            return self.prior_summary
+        return {
+            "account_id": self.account_id,
+            "ok": self.ok,
+            "error": self.error,
+            "elapsed": round(self.elapsed, 2),
+            "lanes": {
+                lane_id: {
+                    "name": seq["name"],
+                    "validation": seq["validation"].as_dict(),
+                    "csv_rows": seq.get("csv_rows"),
+                }
+                for lane_id, seq in self.sequences.items()
+            },
+            "events": self.events,
+        }
+
+
+def slugify(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", str(text).lower()).strip("-")[:60] or "account"
+
+
+def _account_id(record: dict, line_no: int) -> str:
+    for key in ("id", "account", "company"):
+        if record.get(key):
+            return str(record[key]).strip()
+    prospect = record.get("prospect") or {}
+    if prospect.get("company"):
+        return str(prospect["company"]).strip()
+    first_line = (record.get("company_info") or "").strip().split("\n")[0]
+    return first_line[:60].strip() or f"account-{line_no}"
+
+
+def parse_account(record: dict, line_no: int = 0) -> Account:
+    """Build an Account from one decoded JSONL record."""
+    if not isinstance(record, dict):
+        raise BatchInputError(f"line {line_no}: expected a JSON object")
+    research_data = {key: str(record.get(key) or "") for key in RESEARCH_FIELDS}
+    if not any(v.strip() for v in research_data.values()):
+        raise BatchInputError(f"line {line_no}: needs at least one of {', '.join(RESEARCH_FIELDS)}")
+    research_data["reference_customers"] = str(record.get("reference_customers") or "").strip()
+
+    prospect = record.get("prospect") or {}
+    prospect_info = {key: str(prospect.get(key) or "") for key in PROSPECT_FIELDS}
+    if not prospect_info["company"] and record.get("company"):
+        prospect_info["company"] = str(record["company"])
+
+    lanes = record.get("lanes")
+    if isinstance(lanes, (str, int)):
+        lanes = [lanes]
+    return Account(
+        account_id=_account_id(record, line_no),
+        research_data=research_data,
+        prospect_info=prospect_info,
+        lanes=[str(lane) for lane in lanes] if lanes else None,
+    )
+
+
+def read_accounts(path) -> list:
+    """Read accounts from a JSONL file. Blank lines and lines starting with # are skipped."""
+    accounts = []
+    seen = {}
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise BatchInputError(f"line {line_no}: {e}") from e
+            account = parse_account(record, line_no)
+            # Keep output directories distinct when two records share a name
+            slug = slugify(account.account_id)
+            seen[slug] = seen.get(slug, 0) + 1
+            if seen[slug] > 1:
+                account.account_id = f"{account.account_id}-{seen[slug]}"
+            accounts.append(account)
+    return accounts
+
+
+def resolve_lanes(requested: list, persona_lanes: list) -> list:
+    """Match lane ids ("3") or names ("Platform & Infra", case-insensitive) to persona lane dicts."""
+    by_id = {lane["id"]: lane for lane in persona_lanes}
+    by_name = {lane["name"].lower(): lane for lane in persona_lanes}
+    lanes = []
+    for item in requested:
+        key = str(item).strip()
+        lane = by_id.get(key) or by_name.get(key.lower())
+        if not lane:
+            raise BatchInputError(f"unknown persona lane: {key!r}")
+        if lane not in lanes:
+            lanes.append(lane)
+    return lanes
+
+
+def plan_accounts(accounts: list, config: EngineConfig, default_lanes: list = None) -> list:
+    """Pair each account with its persona lane dicts. default_lanes applies to accounts without their own
+    (falls back to the first persona lane, like the UI). Resolves everything up front so a typo fails before any spend."""
+    persona_lanes = load_persona_lanes(config.root)
+    if not persona_lanes:
+        raise BatchInputError("no persona lanes found (kb/persona_lanes.md)")
+    fallback = resolve_lanes(default_lanes, persona_lanes) if default_lanes else persona_lanes[:1]
+    return [(account, resolve_lanes(account.lanes, persona_lanes) if account.lanes else fallback)
+            for account in accounts]
+
+
+def _write(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+def run_account(account: Account, config: EngineConfig, lanes: list, out_dir: Path,
+                csv: bool = False, store=None, history=None) -> AccountResult:
+    """Run every stage for one account and write its outputs under out_dir/<account slug>/.
+    With a JobStore, stages go through the stage graph memo: finished ones are read back instead of regenerated.
+    With a RunHistory, a successful (non-demo) run is recorded there too; failing to record it is a warning
+    event, not an account failure."""
+    started = time.monotonic()
+    result = AccountResult(account.account_id, out_dir=Path(out_dir) / slugify(account.account_id))
+
+    def notify(level: str, message: str):
+        if level != "info":
+            result.events.append({"level": level, "message": message})
+
+    graph = StageGraph(config, memo=store, notify=notify)
+
+    def checkpoint():
+        if store is not None:
+            store.touch(account.account_id)
+
+    try:
+        result.hypothesis = graph.hypothesis(account.research_data)
+        _write(result.out_dir / "hypothesis.md", result.hypothesis)
+        checkpoint()
+
+        for lane in lanes:
+            content = graph.sequence(lane, result.hypothesis, account.prospect_info,
+                                     account.research_data.get("reference_customers", ""))
+            entry = {"name": lane["name"], "content": content, "validation": validate_sequence(content, root=config.root)}
+            stem = f"sequence-{lane['id']}-{slugify(lane['name'])}"
+            _write(result.out_dir / f"{stem}.md", content)
+            checkpoint()
+            if csv and not config.demo_mode:
+                try:
+                    df = graph.csv_frame(content, account.prospect_info)
+                    df.to_csv(result.out_dir / f"{stem}.csv", index=False)
+                    entry["csv_rows"] = len(df)
+                except CsvExportError as e:
+                    notify("error", f"CSV export failed for {lane['name']}: {e}")
+                checkpoint()
+            result.sequences[lane["id"]] = entry
+
+        # Like the UI, the handoff needs a real provider (there is no demo handoff)
+        if not config.demo_mode:
+            result.handoff = graph.handoff(result.hypothesis)
+            _write(result.out_dir / "ae_handoff.md", result.handoff)
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+
+    if history is not None and result.ok and not config.demo_mode:
+        try:
+            history.save(account.research_data, account.prospect_info, result.hypothesis, result.sequences,
+                         ae_handoff=result.handoff, kb_version=kb_version(config.root), provider=config.provider)
+        except (sqlite3.Error, OSError, HistoryError) as e:
+            notify("warning", f"Couldn't save this run to the history: {e}")
+
+    result.reused = graph.reused
+    result.elapsed = time.monotonic() - started
+    _write(result.out_dir / "result.json", json.dumps(result.summary(), indent=2))
+    return result
+
+
+def _run_claimed(account: Account, config: EngineConfig, lanes: list, out_dir: Path, csv: bool, store,
+                 history=None) -> AccountResult:
+    """Claim the account's job and run it. A job that is already done, or claimed by a live worker elsewhere,
+    is reported from the store instead of rerun."""
+    if store.claim(account.account_id) is None:
+        job = store.job(account.account_id) or {}
+        done = job.get("status") == DONE
+        return AccountResult(
+            account.account_id, out_dir=Path(out_dir) / slugify(account.account_id),
+            error="" if done else f"job is {job.get('status', 'missing')} in another run",
+            skipped=True, prior_summary=job.get("summary") if done else None,
+        )
+    result = run_account(account, config, lanes, out_dir, csv, store, history)
+    if result.ok:
+        store.finish(account.account_id, result.summary())
+    else:
+        store.fail(account.account_id, result.error, result.summary())
+    return result
+
+
+def run_batch(accounts: list, config: EngineConfig, out_dir, default_lanes: list = None,
+              workers: int = 4, csv: bool = False, on_result=None, store=None, history=None) -> list:
+    """Run accounts over a pool of workers (lanes per plan_accounts). on_result(result) is called as each account finishes.
+    With a JobStore, accounts are queued in it and a rerun picks up from the last checkpoint; if the run is
+    interrupted, its running jobs are released first. With a RunHistory, finished accounts can be reopened in the app."""
+    out_dir = Path(out_dir)
+    plans = plan_accounts(accounts, config, default_lanes)
+
+    if store is not None:
+        for account, lanes in plans:
+            store.enqueue(account.account_id, {
+                "research_data": account.research_data,
+                "prospect_info": account.prospect_info,
+                "lanes": [lane["id"] for lane in lanes],
+                "csv": csv,
+                "demo": config.demo_mode,
+            })
+
+    results = []
+    pool = ThreadPoolExecutor(max_workers=max(1, workers))
+    try:
+        if store is not None:
+            futures = [pool.submit(_run_claimed, account, config, lanes, out_dir, csv, store, history)
+                       for account, lanes in plans]
+        else:
+            futures = [pool.submit(run_account, account, config, lanes, out_dir, csv, None, history)
+                       for account, lanes in plans]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if on_result:
+                on_result(result)
+    except BaseException:
+        # Ctrl-C (or a failing callback): drop queued accounts and hand running ones back, so a rerun resumes them
+        pool.shutdown(wait=False, cancel_futures=True)
+        if store is not None:
+            store.release()
+        raise
+    pool.shutdown()
+
+    order = {account.account_id: i for i, account in enumerate(accounts)}
+    results.sort(key=lambda r: order.get(r.account_id, 0))
+    _write(out_dir / "summary.json", json.dumps([r.summary() for r in results], indent=2))
+    return results
@@ -0,0 +1,458 @@
+"""
+Benchmarks.
+
+    python -m outbound_engine bench --out bench.json
+    python -m outbound_engine bench --scenarios single,sessions --latency-ms 200 --error-rate 0.05 --compare base.json
+
+Everything except cold start runs the real code (prompt assembly, KB loading, lane parsing,
+the stage graph, retries, CSV parsing, batch runs) against FakeProvider, an OpenAI-compatible
+client with a configurable latency distribution, error rate and output size. Its behavior
+is a pure function of the seed and the prompt, so two runs of the same commit make the same
+calls, the same failures and the same outputs, and only timings differ.
+
+Scenarios:
+  micro       per-operation timings: prompt assembly, KB load (cold/warm), lane parsing, CSV parsing
+  single      one account, three lanes: hypothesis, sequences, handoff, CSV export (like the UI)
+  batch       a batch run over many accounts (default 100)
+  sessions    many concurrent UI sessions (default 50), some on identical research
+  cold_start  import time (-X importtime) and time to first render of app.py in fresh processes
+
+Each scenario reports throughput, latency percentiles (ms) and memory (tracemalloc peak),
+plus the fake provider's call and error counts. Results are written as JSON; --compare
+prints what moved against an earlier file.
+"""
+
+import hashlib
+import json
+import math
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from types import SimpleNamespace
+
+from outbound_engine import kb
+from outbound_engine.batch import Account, run_batch
+from outbound_engine.config import EngineConfig
+from outbound_engine.demo import generate_demo_hypothesis, generate_demo_sequence
+from outbound_engine.graph import IN_FLIGHT, MemoryMemo, StageGraph
+from outbound_engine.kb import ROOT_DIR, load_kb_files, load_persona_lanes, parse_persona_lanes
+from outbound_engine.parsing import csv_text_to_dataframe
+from outbound_engine.prompts import (
+    CSV_SYSTEM, HANDOFF_SYSTEM, HYPOTHESIS_SYSTEM, SEQUENCE_SYSTEM, build_hypothesis_prompt, build_sequence_prompt,
+)
+from outbound_engine.providers import provider_stats, reset_provider_stats
+from outbound_engine.session import SessionData
+from outbound_engine.validation import parse_steps
+
+SCENARIOS = ("micro", "single", "batch", "sessions", "cold_start")
+FAKE_API_KEY = "bench-fake-provider"
+
+# Modules that should only load when a feature needs them (see providers.py, parsing.py, similarity.py)
+HEAVY_MODULES = ("openai", "google.generativeai", "pandas", "numpy", "dotenv")
+
+# Typical output sizes (characters) of a real run, scaled by FakeSettings.output_scale
+OUTPUT_CHARS = {"hypothesis": 6000, "sequence": 9000, "handoff": 4000, "csv": 7000, "other": 200}
+
+
+@dataclass
+class FakeSettings:
+    """How the fake provider behaves. Latency is lognormal around latency_ms (sigma 0 = always latency_ms)."""
+    latency_ms: float = 40.0
+    latency_sigma: float = 0.5
+    error_rate: float = 0.0  # share of calls that fail with a rate-limit error
+    output_scale: float = 1.0
+    seed: int = 7
+
+
+class FakeProvider:
+    """OpenAI-compatible client (chat.completions.create, streaming or not) that sleeps instead of calling
+    out. The latency, failure and output of a call depend only on the seed, the prompt and how many times
+    that prompt was sent before, never on thread timing."""
+
+    def __init__(self, settings: FakeSettings = None):
+        self.settings = settings or FakeSettings()
+        self.chat = SimpleNamespace(completions=self)
+        self.calls = 0
+        self.errors = 0
+        self.output_chars = 0
+        self._attempts = {}
+        self._lock = threading.Lock()
+
+    def client(self, api_key: str, base_url: str = "") -> "FakeProvider":
+        """EngineConfig.client_factory: this fake serves every key and base URL."""
+        return self
+
+    def _rng(self, messages: list) -> random.Random:
+        digest = hashlib.sha256(json.dumps(messages, sort_keys=True).encode("utf-8")).hexdigest()
+        with self._lock:
+            attempt = self._attempts.get(digest, 0)
+            self._attempts[digest] = attempt + 1
+            self.calls += 1
+        return random.Random(f"{self.settings.seed}:{digest}:{attempt}")
+
+    def _latency(self, rng: random.Random) -> float:
+        median = self.settings.latency_ms / 1000
+        if self.settings.latency_sigma <= 0:
+            return median
+        return median * math.exp(rng.gauss(0, self.settings.latency_sigma))
+
+    def _output(self, messages: list, rng: random.Random) -> str:
+        system = messages[0]["content"] if messages[0]["role"] == "system" else ""
+        prompt = messages[-1]["content"]
+        if system == HYPOTHESIS_SYSTEM:
+            stage, text = "hypothesis", generate_demo_hypothesis({"company_info": prompt[-400:]})
+        elif system == SEQUENCE_SYSTEM:
+            stage, text = "sequence", generate_demo_sequence({"id": "1", "name": "Lane"}, "", {})
+        elif system == CSV_SYSTEM:
+            return _fake_csv(prompt.split("Sequence to convert:", 1)[-1])
+        elif system == HANDOFF_SYSTEM:
+            stage, text = "handoff", "## AE Handoff\n\nWhy this account, why now, who to meet.\n\n## First Call Agenda\n\n1. Intro\n"
+        else:
+            stage, text = "other", "OK"
+        target = int(OUTPUT_CHARS[stage] * self.settings.output_scale)
+        filler = f"\n- Supporting detail {rng.randrange(10 ** 6)}: engineering teams, platform work and review cycles."
+        if len(text) < target:
+            text += "\n\n## Notes" + filler * ((target - len(text)) // len(filler) + 1)
+        return text[:max(target, 1)]
+
+    def create(self, model: str, messages: list, temperature: float = 0.7, max_tokens: int = 8192,
+               timeout: float = None, stream: bool = False, stream_options: dict = None):
+        rng = self._rng(messages)
+        latency = self._latency(rng)
+        if rng.random() < self.settings.error_rate:
+            time.sleep(latency / 4)
+            with self._lock:
+                self.errors += 1
+            raise RuntimeError("429 rate limit exceeded (fake provider)")
+        text = self._output(messages, rng)
+        with self._lock:
+            self.output_chars += len(text)
+        usage = SimpleNamespace(prompt_tokens=sum(len(m["content"]) for m in messages) // 4,
+                                completion_tokens=len(text) // 4)
+        if not stream:
+            time.sleep(latency)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))], usage=usage)
+        return _FakeStream(text, latency, usage if stream_options else None)
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "errors": self.errors, "output_chars": self.output_chars}
+
+
+class _FakeStream:
+    """Streams text in chunks: a third of the latency before the first token, the rest spread over the chunks."""
+
+    def __init__(self, text: str, latency: float, usage):
+        self.text, self.latency, self.usage = text, latency, usage
+
+    def __iter__(self):
+        pieces = [self.text[i:i + 400] for i in range(0, len(self.text), 400)] or [""]
+        time.sleep(self.latency / 3)
+        for piece in pieces:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))], usage=None)
+            time.sleep(self.latency * 2 / 3 / len(pieces))
+        if self.usage is not None:
+            yield SimpleNamespace(choices=[], usage=self.usage)
+
+    def close(self) -> None:
+        pass
+
+
+def _fake_csv(sequence: str) -> str:
+    rows = ["step_number,step_day,step_type,subject,body"]
+    for n, step in enumerate((s for s in parse_steps(sequence) if not s.linkedin_only), start=1):
+        body = step.body.replace('"', '""').replace("\n", "\\n")
+        rows.append(f'{n},{step.day},{step.channel},"{step.subject.replace(chr(34), "")}","{body}"')
+    return "\n".join(rows)
+
+
+def fake_research(i: int) -> dict:
+    """Deterministic research for account i (about the size reps paste)."""
+    rng = random.Random(i)
+    industry = rng.choice(["fintech", "healthcare", "logistics", "retail", "security", "gaming"])
+    size = rng.choice([200, 800, 2500, 9000])
+    return {
+        "company_info": f"Account {i} Inc is a {industry} company with {size} employees. " * 8,
+        "job_postings": f"Hiring a Staff Platform Engineer {i} to improve developer experience and CI. " * 12,
+        "linkedin_profiles": f"VP Engineering at Account {i}, previously led platform teams. " * 10,
+        "news_signals": f"Account {i} raised a Series {rng.choice('BCD')} to expand engineering. " * 4,
+        "reference_customers": "",
+    }
+
+
+def percentiles(values: list) -> dict:
+    """n, mean and p50/p90/p99 of values (milliseconds), nearest-rank."""
+    if not values:
+        return {"n": 0}
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, max(0, math.ceil(p * len(ordered)) - 1))], 2)
+
+    return {"n": len(ordered), "mean": round(statistics.fmean(ordered), 2),
+            "p50": rank(0.5), "p90": rank(0.9), "p99": rank(0.99), "max": round(ordered[-1], 2)}
+
+
+class _Measure:
+    """Wall time, tracemalloc peak and provider call counts around one scenario."""
+
+    def __init__(self, provider: FakeProvider = None):
+        self.provider = provider
+
+    def __enter__(self):
+        reset_provider_stats()
+        self._calls = self.provider.stats() if self.provider else {}
+        self._joined = IN_FLIGHT.stats()["joined"]
+        tracemalloc.start()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall_s = time.perf_counter() - self._start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.peak_mb = round(peak / 2 ** 20, 2)
+        self.calls = {k: v - self._calls.get(k, 0) for k, v in self.provider.stats().items()} if self.provider else {}
+        self.coalesced = IN_FLIGHT.stats()["joined"] - self._joined
+        return False
+
+    def report(self, **extra) -> dict:
+        return {"wall_ms": round(self.wall_s * 1000, 1), "memory_peak_mb": self.peak_mb, "provider": self.calls,
+                "outcomes": provider_stats(), **extra}
+
+
+def _config(provider: FakeProvider, demo_fallback: bool = True) -> EngineConfig:
+    return EngineConfig(provider="openai", openai_api_key=FAKE_API_KEY, rate_limit_wait=0.0, requests_per_minute=0,
+                        demo_fallback=demo_fallback, client_factory=provider.client)
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    return fn(*args, **kwargs), (time.perf_counter() - start) * 1000
+
+
+def _prime() -> None:
+    """One-time costs (the pandas import, the first KB read) kept out of whichever scenario runs first."""
+    lanes = load_persona_lanes()
+    if lanes:
+        sequence = generate_demo_sequence(lanes[0], "", {})
+        csv_text_to_dataframe(_fake_csv(sequence), sequence, {})
+
+
+def bench_micro(repeat: int = 200) -> dict:
+    """Per-operation latency of the local (no provider) work every run does."""
+    root = ROOT_DIR
+    lanes = load_persona_lanes(root)
+    lane_text = kb.load_file("kb/persona_lanes.md", root)
+    research = fake_research(0)
+    hypothesis = generate_demo_hypothesis(research)
+    sequence = generate_demo_sequence(lanes[0], hypothesis, {}) if lanes else ""
+    csv_text = _fake_csv(sequence)
+    timings = {"kb_load_cold": [], "kb_load_warm": [], "hypothesis_prompt": [], "sequence_prompt": [],
+               "lane_parsing": [], "csv_parsing": []}
+    for i in range(repeat):
+        with kb._file_lock:
+            kb._file_cache.clear()
+        timings["kb_load_cold"].append(_timed(load_kb_files, root)[1])
+        timings["kb_load_warm"].append(_timed(load_kb_files, root)[1])
+        timings["hypothesis_prompt"].append(_timed(build_hypothesis_prompt, fake_research(i), "openai", root)[1])
+        if lanes:
+            timings["sequence_prompt"].append(_timed(build_sequence_prompt, lanes[i % len(lanes)], hypothesis, {},
+                                                     "openai", "", root)[1])
+        timings["lane_parsing"].append(_timed(parse_persona_lanes, lane_text)[1])
+        if i < repeat // 4:
+            timings["csv_parsing"].append(_timed(csv_text_to_dataframe, csv_text, sequence, {})[1])
+    return {name: percentiles(values) for name, values in timings.items()}
+
+
+def bench_single(provider: FakeProvider, lanes: int = 3) -> dict:
+    """One account through the stage graph like the UI: hypothesis, lane sequences in parallel, handoff, CSV."""
+    graph = StageGraph(_config(provider))
+    chosen = load_persona_lanes()[:lanes]
+    stages = {}
+    with _Measure(provider) as measure:
+        hypothesis, stages["hypothesis"] = _timed(graph.hypothesis, fake_research(0))
+        with ThreadPoolExecutor(max_workers=len(chosen) or 1) as pool:
+            timed = list(pool.map(lambda lane: _timed(graph.sequence, lane, hypothesis, {}), chosen))
+        sequences = {lane["id"]: {"name": lane["name"], "content": out} for lane, (out, _) in zip(chosen, timed)}
+        stages["sequences"] = max((ms for _, ms in timed), default=0.0)
+        _, stages["handoff"] = _timed(graph.handoff, hypothesis)
+        (_, failures), stages["csv_export"] = _timed(graph.csv_frames, sequences, {})
+    return measure.report(stages_ms={k: round(v, 1) for k, v in stages.items()},
+                          sequence_ms=percentiles([ms for _, ms in timed]), csv_failures=len(failures))
+
+
+def bench_batch(provider: FakeProvider, accounts: int = 100, workers: int = 8, lanes: str = "1") -> dict:
+    """A headless batch run (no job store, no history) over `accounts` generated accounts."""
+    items = [Account(f"account-{i}", fake_research(i), {}) for i in range(accounts)]
+    with tempfile.TemporaryDirectory() as out, _Measure(provider) as measure:
+        results = run_batch(items, _config(provider, demo_fallback=False), out, default_lanes=lanes.split(","),
+                            workers=workers)
+    ok = [r for r in results if r.ok]
+    return measure.report(accounts=accounts, workers=workers, ok=len(ok), failed=len(results) - len(ok),
+                          throughput_per_s=round(len(results) / measure.wall_s, 2),
+                          account_ms=percentiles([r.elapsed * 1000 for r in results]))
+
+
+def bench_sessions(provider: FakeProvider, sessions: int = 50, duplicate_every: int = 5) -> dict:
+    """Concurrent UI sessions, each with its own memo and SessionData: hypothesis, one lane, handoff.
+    Every duplicate_every-th session pastes the same research as another, so identical calls overlap."""
+    lane = load_persona_lanes()[0]
+    config = _config(provider)
+    held = []
+
+    def one(i: int) -> float:
+        start = time.perf_counter()
+        data = SessionData()
+        memo = MemoryMemo(budget=data.budget)
+        graph = StageGraph(config, memo=memo)
+        data.research_data = fake_research(0 if duplicate_every and i % duplicate_every == 0 else i + 1)
+        data.hypothesis = graph.hypothesis(data.research_data)
+        data.sequences = {lane["id"]: {"name": lane["name"], "content": graph.sequence(lane, data.hypothesis, {})}}
+        data.ae_handoff = graph.handoff(data.hypothesis)
+        held.append(data.budget.used)
+        return (time.perf_counter() - start) * 1000
+
+    with _Measure(provider) as measure, ThreadPoolExecutor(max_workers=sessions) as pool:
+        latencies = list(pool.map(one, range(sessions)))
+    return measure.report(sessions=sessions, coalesced_calls=measure.coalesced,
+                          throughput_per_s=round(sessions / measure.wall_s, 2), session_ms=percentiles(latencies),
+                          session_bytes=percentiles(held))
+
+
+def parse_importtime(stderr: str) -> list:
+    """-X importtime output as [{"module", "self_ms", "cumulative_ms", "depth"}] in import order."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append({"module": name.strip(), "self_ms": int(self_us) / 1000,
+                     "cumulative_ms": int(cumulative_us) / 1000, "depth": depth})
+    return rows
+
+
+_LOADED = f"import json, sys; import app; print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+
+_FIRST_RENDER = """
+import json, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=120)
+at.secrets["OUTBOUND_BENCH"] = "1"
+start = time.perf_counter()
+at.run()
+print(json.dumps({"ms": (time.perf_counter() - start) * 1000, "errors": [e.message for e in at.exception]}))
+"""
+
+
+def _python(code: str, env: dict, *flags) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *flags, "-c", code], cwd=ROOT_DIR, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def _summary(values: list) -> dict:
+    ordered = sorted(values)
+    return {"min": round(ordered[0], 1), "median": round(statistics.median(ordered), 1), "max": round(ordered[-1], 1)}
+
+
+def cold_start(runs: int = 5, top: int = 10) -> dict:
+    """Import time and time to first render of app.py, each in a fresh interpreter (milliseconds)."""
+    with tempfile.TemporaryDirectory() as scratch:
+        env = {**os.environ, "OUTBOUND_HISTORY": str(Path(scratch) / "history.sqlite3")}
+        imports, walls, renders, slowest = [], [], [], []
+        for _ in range(runs):
+            start = time.perf_counter()
+            result = _python("import app", env, "-X", "importtime")
+            walls.append((time.perf_counter() - start) * 1000)
+            rows = parse_importtime(result.stderr)
+            imports.append(next(r["cumulative_ms"] for r in reversed(rows) if r["module"] == "app"))
+            slowest = sorted((r for r in rows if r["depth"] == 1), key=lambda r: -r["cumulative_ms"])[:top]
+            render = json.loads(_python(_FIRST_RENDER, env).stdout.strip().splitlines()[-1])
+            renders.append(render["ms"])
+        loaded = json.loads(_python(_LOADED, env).stdout.strip().splitlines()[-1])
+    return {
+        "runs": runs,
+        "import_app_ms": _summary(imports),
+        "process_ms": _summary(walls),
+        "first_render_ms": _summary(renders),
+        "render_errors": render["errors"],
+        "heavy_modules_at_startup": loaded,
+        "slowest_imports": [{"module": r["module"], "cumulative_ms": r["cumulative_ms"]} for r in slowest],
+    }
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run_benchmarks(scenarios=SCENARIOS, settings: FakeSettings = None, runs: int = 5, accounts: int = 100,
+                   sessions: int = 50, workers: int = 8, log=print) -> dict:
+    """Run the named scenarios; returns the results document (commit, settings, one entry per scenario)."""
+    settings = settings or FakeSettings()
+    provider = FakeProvider(settings)
+    results = {"commit": _commit(), "python": sys.version.split()[0], "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+               "fake_provider": asdict(settings), "scenarios": {}}
+    if any(name != "cold_start" for name in scenarios):
+        _prime()
+    for name in scenarios:
+        log(f"{name}...")
+        if name == "micro":
+            report = bench_micro()
+            log("  " + ", ".join(f"{op} p50 {r['p50']:.2f} ms" for op, r in report.items() if r["n"]))
+        elif name == "single":
+            report = bench_single(provider)
+            log(f"  {report['wall_ms']:.0f} ms for 1 account x 3 lanes, {report['provider']['calls']} call(s), "
+                f"peak {report['memory_peak_mb']} MB")
+        elif name == "batch":
+            report = bench_batch(provider, accounts=accounts, workers=workers)
+            log(f"  {report['throughput_per_s']} accounts/s, p50 {report['account_ms']['p50']:.0f} ms, "
+                f"p99 {report['account_ms']['p99']:.0f} ms, {report['failed']} failed, peak {report['memory_peak_mb']} MB")
+        elif name == "sessions":
+            report = bench_sessions(provider, sessions=sessions)
+            log(f"  {report['throughput_per_s']} sessions/s, p50 {report['session_ms']['p50']:.0f} ms, "
+                f"p99 {report['session_ms']['p99']:.0f} ms, {report['coalesced_calls']} coalesced, "
+                f"peak {report['memory_peak_mb']} MB")
+        elif name == "cold_start":
+            report = cold_start(runs)
+            log(f"  import app {report['import_app_ms']['median']:.0f} ms median, first render "
+                f"{report['first_render_ms']['median']:.0f} ms, heavy modules at startup: "
+                f"{', '.join(report['heavy_modules_at_startup']) or 'none'}")
+        else:
+            raise ValueError(f"Unknown scenario: {name} (choose from {', '.join(SCENARIOS)})")
+        results["scenarios"][name] = report
+    return results
+
+
+def _numbers(doc, prefix: str = "") -> dict:
+    if isinstance(doc, dict):
+        out = {}
+        for key, value in doc.items():
+            out.update(_numbers(value, f"{prefix}{key}."))
+        return out
+    if isinstance(doc, (int, float)) and not isinstance(doc, bool):
+        return {prefix.rstrip("."): doc}
+    return {}
+
+
+def compare(base: dict, current: dict, threshold: float = 0.10) -> list:
+    """(metric, base, current, relative change) for scenario metrics that moved by more than threshold."""
+    old, new = _numbers(base.get("scenarios", {})), _numbers(current.get("scenarios", {}))
+    changes = []
+    for metric in sorted(old.keys() & new.keys()):
+        before, after = old[metric], new[metric]
+        if before and abs(after - before) / abs(before) > threshold:
+            changes.append((metric, before, after, (after - before) / abs(before)))
+    return changes
@@ -0,0 +1,205 @@
+"""
+Offline bulk mode (OpenAI Batch API).
+For overnight runs where cost matters more than latency: every hypothesis prompt for an
+account list is rendered into a JSONL batch file, submitted, polled until done and
+ingested into the job store memo under its stage graph node key. A second round does
+the same for lane sequences and AE handoffs (they need the hypotheses). A normal batch
+run over the same store then finds every stage already done and makes no live calls.
+
+Submitted batch ids are recorded in the job store before polling starts, so a restarted
+run picks up the open batches instead of paying for them again.
+
+CSV formatting is left to the live run: its output is only memoized once it parses.
+"""
+
+import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from outbound_engine.batch import plan_accounts
+from outbound_engine.config import EngineConfig
+from outbound_engine.graph import handoff_key, hypothesis_key, sequence_key
+from outbound_engine.prompts import (
+    HANDOFF_SYSTEM, HYPOTHESIS_SYSTEM, SEQUENCE_SYSTEM,
+    build_handoff_prompt, build_hypothesis_prompt, build_sequence_prompt,
+)
+from outbound_engine.providers import ProviderNotConfigured, get_openai_client
+
+ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+# Provider limits are 50,000 requests and 200 MB per input file; stay under both
+MAX_REQUESTS_PER_FILE = 50000
+MAX_FILE_BYTES = 190 * 1024 * 1024
+
+
+@dataclass
+class BulkReport:
+    submitted: int = 0
+    ingested: int = 0
+    failed: int = 0
+    batches: list = field(default_factory=list)
+
+
+def _request(key: str, system: str, prompt: str, config: EngineConfig, temperature: float) -> dict:
+    # Same messages and settings generate_* send live, so ingested outputs match their node keys
+    return {
+        "custom_id": key,
+        "method": "POST",
+        "url": ENDPOINT,
+        "body": {
+            "model": config.openai_model,
+            "messages": [{"role": "system", "content": system}, {"role": "user", "content": prompt}],
+            "temperature": temperature,
+            "max_tokens": 8192,
+        },
+    }
+
+
+def render_hypothesis_requests(plans: list, config: EngineConfig, store) -> dict:
+    """custom_id (node key) -> (stage, request line) for every hypothesis not already in the store."""
+    requests = {}
+    for account, _ in plans:
+        key = hypothesis_key(account.research_data, config)
+        if key not in requests and store.get(key) is None:
+            prompt = build_hypothesis_prompt(account.research_data, config.provider, config.root)
+            requests[key] = ("hypothesis", _request(key, HYPOTHESIS_SYSTEM, prompt, config, 0.7))
+    return requests
+
+
+def render_downstream_requests(plans: list, config: EngineConfig, store) -> dict:
+    """Lane sequences and AE handoffs for every account whose hypothesis is in the store."""
+    requests = {}
+    for account, lanes in plans:
+        hypothesis = store.get(hypothesis_key(account.research_data, config))
+        if hypothesis is None:
+            continue
+        reference_customers = account.research_data.get("reference_customers", "")
+        for lane in lanes:
+            key = sequence_key(lane, hypothesis, account.prospect_info, reference_customers, config)
+            if key not in requests and store.get(key) is None:
+                prompt = build_sequence_prompt(lane, hypothesis, account.prospect_info, config.provider,
+                                               reference_customers, config.root)
+                requests[key] = ("sequence", _request(key, SEQUENCE_SYSTEM, prompt, config, 0.7))
+        key = handoff_key(hypothesis, config)
+        prompt = build_handoff_prompt(hypothesis, config.root)
+        if prompt and key not in requests and store.get(key) is None:
+            requests[key] = ("handoff", _request(key, HANDOFF_SYSTEM, prompt, config, 0.5))
+    return requests
+
+
+def write_batch_files(requests: dict, directory: Path, phase: str) -> list:
+    """Write request lines into JSONL files under the provider's size limits. Returns [(path, {custom_id: stage})]."""
+    directory.mkdir(parents=True, exist_ok=True)
+    files = []
+    lines, stages, size = [], {}, 0
+
+    def flush():
+        path = directory / f"{phase}-{int(time.time())}-{len(files) + 1}.jsonl"
+        path.write_text("".join(lines), encoding="utf-8")
+        files.append((path, dict(stages)))
+
+    for key, (stage, request) in requests.items():
+        line = json.dumps(request, ensure_ascii=False) + "\n"
+        line_bytes = len(line.encode("utf-8"))
+        if lines and (len(lines) >= MAX_REQUESTS_PER_FILE or size + line_bytes > MAX_FILE_BYTES):
+            flush()
+            lines, stages, size = [], {}, 0
+        lines.append(line)
+        stages[key] = stage
+        size += line_bytes
+    if lines:
+        flush()
+    return files
+
+
+def submit(client, path: Path, phase: str) -> str:
+    with open(path, "rb") as f:
+        uploaded = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(input_file_id=uploaded.id, endpoint=ENDPOINT, completion_window="24h",
+                                  metadata={"phase": phase, "source": "outbound-engine"})
+    return batch.id
+
+
+def wait(client, batch_id: str, poll_interval: float = 60.0, timeout: float = None, log=None):
+    """Poll until the batch reaches a terminal status. Returns the batch object (or the last one seen on timeout)."""
+    started = time.monotonic()
+    last_status = None
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        if batch.status != last_status and log:
+            counts = batch.request_counts
+            done = f" ({counts.completed}/{counts.total})" if counts and counts.total else ""
+            log(f"Batch {batch_id}: {batch.status}{done}")
+        last_status = batch.status
+        if batch.status in TERMINAL_STATUSES:
+            return batch
+        if timeout is not None and time.monotonic() - started > timeout:
+            return batch
+        time.sleep(poll_interval)
+
+
+def ingest(client, batch, stages: dict, store) -> tuple:
+    """Store every successful output line under its node key. Returns (ingested, failed)."""
+    ingested = failed = 0
+    if batch.output_file_id:
+        for line in client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            key = row.get("custom_id")
+            response = row.get("response") or {}
+            if row.get("error") or response.get("status_code") != 200 or key not in stages:
+                failed += 1
+                continue
+            content = response["body"]["choices"][0]["message"]["content"] or ""
+            # generate_ae_handoff strips its output; keep the stored text identical to a live run
+            store.put(key, content.strip() if stages[key] == "handoff" else content, stages[key])
+            ingested += 1
+    if batch.error_file_id:
+        failed += sum(1 for line in client.files.content(batch.error_file_id).text.splitlines() if line.strip())
+    return ingested, failed
+
+
+def _finish(client, batch_id: str, stages: dict, store, report: BulkReport, poll_interval: float, log) -> None:
+    batch = wait(client, batch_id, poll_interval, log=log)
+    ingested, failed = ingest(client, batch, stages, store)
+    store.close_bulk_batch(batch_id, batch.status)
+    report.ingested += ingested
+    report.failed += failed
+
+
+def run_bulk(accounts: list, config: EngineConfig, store, out_dir, client=None, default_lanes: list = None,
+             poll_interval: float = 60.0, log=None) -> BulkReport:
+    """Hypotheses, then sequences + handoffs, through the Batch API into store. Blocks until both rounds are done."""
+    config = config.with_provider("openai")
+    client = client or get_openai_client(config.openai_api_key, config.openai_base_url)
+    if client is None:
+        raise ProviderNotConfigured("OpenAI API key not configured (bulk mode uses the OpenAI Batch API)")
+    plans = plan_accounts(accounts, config, default_lanes)
+    directory = Path(out_dir) / "bulk"
+    report = BulkReport()
+
+    # Batches a previous run submitted but never ingested
+    for open_batch in store.open_bulk_batches():
+        if log:
+            log(f"Resuming {open_batch['phase']} batch {open_batch['batch_id']}")
+        report.batches.append(open_batch["batch_id"])
+        _finish(client, open_batch["batch_id"], open_batch["requests"], store, report, poll_interval, log)
+
+    for phase, render in (("hypothesis", render_hypothesis_requests), ("downstream", render_downstream_requests)):
+        requests = render(plans, config, store)
+        if not requests:
+            continue
+        submitted = []
+        for path, stages in write_batch_files(requests, directory, phase):
+            batch_id = submit(client, path, phase)
+            store.add_bulk_batch(batch_id, phase, stages)
+            submitted.append((batch_id, stages))
+            report.submitted += len(stages)
+            report.batches.append(batch_id)
+            if log:
+                log(f"Submitted {phase} batch {batch_id}: {len(stages)} request(s) from {path.name}")
+        for batch_id, stages in submitted:
+            _finish(client, batch_id, stages, store, report, poll_interval, log)
+    return report
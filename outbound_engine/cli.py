@@ -0,0 +1,355 @@
+"""
+Command line entry point.
+
+    python -m outbound_engine batch accounts.jsonl --out runs/ --workers 4 --lanes 1,3
+    python -m outbound_engine bulk accounts.jsonl --out runs/ --lanes 1,3
+    python -m outbound_engine status --out runs/
+    python -m outbound_engine worker --store /srv/outbound/worker.sqlite3
+    python -m outbound_engine serve --probe -- --server.port 8501
+    python -m outbound_engine bench --out bench.json --compare base.json
+
+Batch runs checkpoint every stage in <out>/jobs.sqlite3; rerunning the same command
+resumes where the last run stopped and retries failed accounts. bulk fills the same
+store through the OpenAI Batch API first, then writes outputs like batch. worker serves
+provider calls for every app process started with OUTBOUND_WORKER_STORE set to its store.
+serve warms up the process (warmup.py) and then starts the Streamlit app in it; ready
+exits 0 once a serving process has written its ready file and its port accepts connections.
+
+Keys come from the environment (.env / local_secrets.env, like the app).
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+from pathlib import Path
+
+from outbound_engine.config import (
+    DEFAULT_REQUESTS_PER_MINUTE, HISTORY_PATH_ENV, PROVIDERS, READY_FILE_ENV, WORKER_STORE_ENV, EngineConfig,
+)
+from outbound_engine.kb import ROOT_DIR
+from outbound_engine.providers import provider_stats
+from outbound_engine.tracing import TRACE_FILE_ENV, configure as configure_tracing
+
+# Each command imports what it runs (batch, bulk, bench, history, worker, warm-up) in its handler, so
+# `status` and `ready` start without loading the batch stack.
+
+try:
+    from dotenv import load_dotenv
+    DOTENV_AVAILABLE = True
+except ImportError:
+    DOTENV_AVAILABLE = False
+
+
+def _load_env() -> None:
+    if not DOTENV_AVAILABLE:
+        return
+    load_dotenv()
+    secrets_path = ROOT_DIR / "local_secrets.env"
+    if secrets_path.exists():
+        load_dotenv(secrets_path)
+
+
+def _split(value: str) -> list:
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="outbound-engine", description="Outbound Engine without the UI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch = commands.add_parser("batch", help="Run research -> hypothesis -> sequences -> AE handoff for a JSONL file of accounts")
+    batch.add_argument("accounts", type=Path, help="JSONL file, one account per line")
+    batch.add_argument("--out", type=Path, default=Path("batch_output"), help="Output directory (one folder per account)")
+    batch.add_argument("--provider", choices=PROVIDERS, help="AI provider (default: OUTBOUND_PROVIDER or gemini)")
+    batch.add_argument("--lanes", default="", help="Comma-separated persona lane ids or names for accounts without their own (default: first lane)")
+    batch.add_argument("--workers", type=int, default=4, help="Accounts processed concurrently")
+    batch.add_argument("--rpm", type=float, help="Provider requests per minute across all workers (default: provider budget; 0 = unthrottled)")
+    batch.add_argument("--timeout", type=float, help="Seconds before a single provider call is abandoned (default: 180)")
+    batch.add_argument("--csv", action="store_true", help="Also export each lane sequence as Outreach CSV (one extra call per lane)")
+    batch.add_argument("--demo", action="store_true", help="Demo mode: no API calls")
+    batch.add_argument("--store", type=Path, help="Job store file (default: <out>/jobs.sqlite3)")
+    batch.add_argument("--no-store", action="store_true", help="Don't checkpoint; every run starts from scratch")
+    batch.add_argument("--history", type=Path, help=f"Run history file the app can reopen runs from (default: ${HISTORY_PATH_ENV} or run_history.sqlite3)")
+    batch.add_argument("--no-history", action="store_true", help="Don't record finished accounts in the run history")
+    batch.add_argument("--trace", type=Path, help=f"Write per-stage tracing spans (OTLP JSON lines) to this file (default: ${TRACE_FILE_ENV}, off if unset)")
+
+    bulk = commands.add_parser("bulk", help="Like batch, but hypotheses, sequences and handoffs go through the OpenAI Batch API (cheaper, up to 24h)")
+    bulk.add_argument("accounts", type=Path, help="JSONL file, one account per line")
+    bulk.add_argument("--out", type=Path, default=Path("batch_output"), help="Output directory (one folder per account)")
+    bulk.add_argument("--lanes", default="", help="Comma-separated persona lane ids or names for accounts without their own (default: first lane)")
+    bulk.add_argument("--poll", type=float, default=60.0, help="Seconds between batch status checks")
+    bulk.add_argument("--base-url", help="OpenAI API base URL for the batch and any live follow-up calls "
+                                          "(e.g. the local stand-in: python -m outbound_engine.openai_batch_mock; default: OPENAI_BASE_URL)")
+    bulk.add_argument("--workers", type=int, default=4, help="Workers for writing outputs and any live follow-up calls")
+    bulk.add_argument("--csv", action="store_true", help="Also export each lane sequence as Outreach CSV (live calls)")
+    bulk.add_argument("--store", type=Path, help="Job store file (default: <out>/jobs.sqlite3)")
+
+    status = commands.add_parser("status", help="Show job store progress for a batch output directory")
+    status.add_argument("--out", type=Path, default=Path("batch_output"), help="Batch output directory")
+    status.add_argument("--store", type=Path, help="Job store file (default: <out>/jobs.sqlite3)")
+
+    worker = commands.add_parser("worker", help="Own provider calls, rate limits and the cache for every app process sharing a store")
+    worker.add_argument("--store", type=Path, default=Path(os.getenv(WORKER_STORE_ENV) or "worker.sqlite3"),
+                        help=f"Shared store file (default: ${WORKER_STORE_ENV} or worker.sqlite3); start the apps with {WORKER_STORE_ENV} set to it")
+    worker.add_argument("--threads", type=int, default=4, help="Calls run concurrently")
+    worker.add_argument("--rpm", type=float, help="Requests per minute per provider across all apps (default: provider budget; 0 = unthrottled)")
+    worker.add_argument("--quiet", action="store_true", help="Don't log every call")
+
+    serve = commands.add_parser("serve", help="Warm up (KB, lanes, provider clients) and then start the app in this process")
+    serve.add_argument("--probe", action="store_true", help="Also send one tiny request to the configured provider; a failure keeps the server from starting")
+    serve.add_argument("--ready-file", type=Path, default=os.getenv(READY_FILE_ENV),
+                       help=f"Write the readiness report here once warm (default: ${READY_FILE_ENV})")
+    serve.add_argument("streamlit_args", nargs=argparse.REMAINDER, help="Arguments for `streamlit run` after --, e.g. -- --server.port 8501")
+
+    ready = commands.add_parser("ready", help="Health check: exit 0 if the serving process has warmed up and is listening")
+    ready.add_argument("--ready-file", type=Path, default=os.getenv(READY_FILE_ENV), help=f"Ready file (default: ${READY_FILE_ENV})")
+    ready.add_argument("--port", type=int, help="Port that must accept connections (default: the one serve recorded in the ready file)")
+
+    bench = commands.add_parser("bench", help="Run the benchmark scenarios against a fake provider and write the results as JSON")
+    bench.add_argument("--scenarios", help="Comma-separated, from micro,single,batch,sessions,cold_start (default: all)")
+    bench.add_argument("--latency-ms", type=float, help="Median fake provider latency (default: 40)")
+    bench.add_argument("--latency-sigma", type=float, help="Spread of the (lognormal) latency; 0 = constant (default: 0.5)")
+    bench.add_argument("--error-rate", type=float, help="Share of fake provider calls that fail with a rate-limit error (default: 0)")
+    bench.add_argument("--output-scale", type=float, help="Fake output size relative to a typical real run (default: 1)")
+    bench.add_argument("--seed", type=int, help="Fake provider seed (default: 7)")
+    bench.add_argument("--accounts", type=int, default=100, help="Accounts in the batch scenario")
+    bench.add_argument("--sessions", type=int, default=50, help="Concurrent sessions in the sessions scenario")
+    bench.add_argument("--workers", type=int, default=8, help="Workers in the batch scenario")
+    bench.add_argument("--runs", type=int, default=5, help="Fresh processes per cold start measurement")
+    bench.add_argument("--out", type=Path, default=Path("bench.json"), help="Results file")
+    bench.add_argument("--compare", type=Path, help="Earlier results file; print the metrics that moved more than 10%%")
+    return parser
+
+
+def _store_path(args) -> Path:
+    return args.store or args.out / "jobs.sqlite3"
+
+
+def run_batch_command(args) -> int:
+    from outbound_engine.batch import BatchInputError, read_accounts, run_batch
+    from outbound_engine.history import RunHistory
+    from outbound_engine.jobstore import JobStore
+
+    # A failed call should fail the account (and be retried on the next run), not leave demo text behind
+    config = EngineConfig.from_env(provider=args.provider, demo_mode=args.demo, demo_fallback=False,
+                                   request_timeout=args.timeout, openai_base_url=getattr(args, "base_url", None))
+    config.requests_per_minute = args.rpm if args.rpm is not None else DEFAULT_REQUESTS_PER_MINUTE.get(config.provider, 0)
+    if not config.demo_mode and not config.has_api_key:
+        print(f"{config.provider_name} API key not configured (set {config.provider.upper()}_API_KEY or use --demo)", file=sys.stderr)
+        return 2
+
+    try:
+        accounts = read_accounts(args.accounts)
+    except (OSError, BatchInputError) as e:
+        print(f"Could not read {args.accounts}: {e}", file=sys.stderr)
+        return 2
+    if not accounts:
+        print(f"No accounts in {args.accounts}", file=sys.stderr)
+        return 2
+
+    store = None if args.no_store else JobStore(_store_path(args))
+    history = None if args.no_history or config.demo_mode else RunHistory(args.history)
+    if getattr(args, "trace", None):
+        configure_tracing(args.trace)
+    done = 0
+
+    def report(result):
+        nonlocal done
+        done += 1
+        if result.skipped:
+            status = "already done" if result.ok else f"skipped ({result.error})"
+            print(f"[{done}/{len(accounts)}] {result.account_id}: {status}")
+            return
+        status = "ok" if result.ok else f"FAILED ({result.error})"
+        warnings = sum(1 for e in result.events if e["level"] in ("warning", "error"))
+        note = f", {warnings} warning(s)" if warnings else ""
+        note += f", {result.reused} stage(s) resumed" if result.reused else ""
+        print(f"[{done}/{len(accounts)}] {result.account_id}: {status} in {result.elapsed:.1f}s{note}")
+
+    mode = "demo" if config.demo_mode else f"{config.provider_name}, {config.requests_per_minute:g} rpm" if config.requests_per_minute else config.provider_name
+    print(f"Running {len(accounts)} account(s) with {args.workers} worker(s) ({mode}) -> {args.out}")
+    try:
+        results = run_batch(accounts, config, args.out, default_lanes=_split(args.lanes),
+                            workers=args.workers, csv=args.csv, on_result=report, store=store, history=history)
+    except BatchInputError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        print("Interrupted. Rerun the same command to resume from the last checkpoint.", file=sys.stderr)
+        return 130
+
+    failed = [r for r in results if not r.ok]
+    print(f"Done: {len(results) - len(failed)} ok, {len(failed)} failed. Summary: {args.out / 'summary.json'}")
+    calls = provider_stats()
+    if calls["calls"]:
+        print(f"Provider calls: {calls['calls']} ({calls['failed']} failed, {calls['rate_limited']} rate limited, "
+              f"{calls['timed_out']} timed out, {calls['cancelled']} cancelled)")
+    if failed and store is not None:
+        print("Rerun the same command to retry failed accounts from their last checkpoint.")
+    return 1 if failed else 0
+
+
+def run_bulk_command(args) -> int:
+    from outbound_engine.batch import BatchInputError, read_accounts
+    from outbound_engine.bulk import run_bulk
+    from outbound_engine.jobstore import JobStore
+
+    config = EngineConfig.from_env(provider="openai", demo_fallback=False, openai_base_url=args.base_url)
+    config.requests_per_minute = DEFAULT_REQUESTS_PER_MINUTE["openai"]
+    if not config.has_api_key:
+        print("OpenAI API key not configured (set OPENAI_API_KEY)", file=sys.stderr)
+        return 2
+    try:
+        accounts = read_accounts(args.accounts)
+    except (OSError, BatchInputError) as e:
+        print(f"Could not read {args.accounts}: {e}", file=sys.stderr)
+        return 2
+
+    store = JobStore(_store_path(args))
+    try:
+        report = run_bulk(accounts, config, store, args.out, default_lanes=_split(args.lanes),
+                          poll_interval=args.poll, log=print)
+    except BatchInputError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    print(f"Bulk: {report.submitted} request(s) submitted, {report.ingested} ingested, {report.failed} failed")
+
+    # Everything ingested is now a memo hit; only failures (and CSV, if asked) make live calls, to the same --base-url
+    args.provider, args.demo, args.no_store, args.rpm, args.timeout = "openai", False, False, None, None
+    args.history, args.no_history = None, False
+    return run_batch_command(args)
+
+
+def run_status_command(args) -> int:
+    from outbound_engine.jobstore import JobStore
+
+    path = _store_path(args)
+    if not path.exists():
+        print(f"No job store at {path}", file=sys.stderr)
+        return 2
+    store = JobStore(path)
+    counts = store.counts()
+    print(", ".join(f"{status}: {n}" for status, n in sorted(counts.items())) or "No jobs")
+    for job in store.jobs("failed"):
+        print(f"  FAILED {job['account_id']} (attempt {job['attempts']}): {job['error']}")
+    return 0
+
+
+def run_worker_command(args) -> int:
+    from outbound_engine.jobstore import JobStore
+    from outbound_engine.warmup import warm_up
+    from outbound_engine.worker import Worker
+
+    warm_up()
+    store = JobStore(args.store)
+    store.prune_calls()
+    worker = Worker(store, threads=args.threads, requests_per_minute=args.rpm, log=None if args.quiet else print)
+    print(f"Worker serving {args.store.resolve()} with {args.threads} thread(s) (Ctrl+C to stop)")
+    worker.serve()
+    calls = provider_stats()
+    print(f"Stopped: {worker.completed} call(s) done, {worker.failed} failed "
+          f"({calls['timed_out']} timed out, {calls['rate_limited']} rate limited)")
+    return 0
+
+
+def _print_readiness(report: dict) -> None:
+    steps = ", ".join(f"{name} {ms:.0f} ms" for name, ms in report["steps"].items())
+    print(f"Warm-up {report['status']}: {steps}")
+    for name, error in report["errors"].items():
+        print(f"  {name} failed: {error}", file=sys.stderr)
+
+
+def _streamlit_port(streamlit_args: list) -> int:
+    """The port `streamlit run` will listen on: --server.port, else STREAMLIT_SERVER_PORT, else 8501."""
+    for i, arg in enumerate(streamlit_args):
+        if arg.startswith("--server.port="):
+            return int(arg.split("=", 1)[1])
+        if arg == "--server.port" and i + 1 < len(streamlit_args):
+            return int(streamlit_args[i + 1])
+    return int(os.getenv("STREAMLIT_SERVER_PORT") or 8501)
+
+
+def run_serve_command(args) -> int:
+    from outbound_engine.warmup import warm_up
+
+    streamlit_args = [arg for arg in args.streamlit_args if arg != "--"]
+    report = warm_up(probe=args.probe, ready_file=args.ready_file, port=_streamlit_port(streamlit_args))
+    _print_readiness(report)
+    if not report["ready"]:
+        return 1
+    from streamlit.web import cli as streamlit_cli
+    return streamlit_cli.main(["run", str(ROOT_DIR / "app.py"), *streamlit_args])
+
+
+def run_ready_command(args) -> int:
+    if not args.ready_file:
+        print(f"No ready file (pass --ready-file or set {READY_FILE_ENV})", file=sys.stderr)
+        return 2
+    try:
+        report = json.loads(args.ready_file.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        print("not ready")
+        return 1
+    if not report.get("ready"):
+        print(report["status"])
+        return 1
+    # Warm-up finishes before Streamlit binds its port
+    port = args.port or report.get("port")
+    if port:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=2).close()
+        except OSError:
+            print(f"warm, not listening on port {port} yet")
+            return 1
+    print(report["status"])
+    return 0
+
+
+def run_bench_command(args) -> int:
+    from outbound_engine.bench import SCENARIOS, FakeSettings, compare, run_benchmarks
+
+    overrides = {"latency_ms": args.latency_ms, "latency_sigma": args.latency_sigma, "error_rate": args.error_rate,
+                 "output_scale": args.output_scale, "seed": args.seed}
+    settings = FakeSettings(**{k: v for k, v in overrides.items() if v is not None})
+    scenarios = _split(args.scenarios) if args.scenarios else list(SCENARIOS)
+    unknown = sorted(set(scenarios) - set(SCENARIOS))
+    if unknown:
+        print(f"Unknown scenario(s): {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})", file=sys.stderr)
+        return 2
+    results = run_benchmarks(scenarios, settings, runs=args.runs, accounts=args.accounts, sessions=args.sessions,
+                             workers=args.workers)
+    args.out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"Results: {args.out}")
+    if args.compare:
+        base = json.loads(args.compare.read_text(encoding="utf-8"))
+        changes = compare(base, results)
+        print(f"Against {base.get('commit') or args.compare}: {len(changes)} metric(s) moved more than 10%")
+        for metric, before, after, change in changes:
+            print(f"  {metric}: {before:g} -> {after:g} ({change:+.0%})")
+    return 0
+
+
+def main(argv=None) -> int:
+    _load_env()
+    args = build_parser().parse_args(argv)
+    if args.command == "batch":
+        return run_batch_command(args)
+    if args.command == "bulk":
+        return run_bulk_command(args)
+    if args.command == "status":
+        return run_status_command(args)
+    if args.command == "worker":
+        return run_worker_command(args)
+    if args.command == "serve":
+        return run_serve_command(args)
+    if args.command == "ready":
+        return run_ready_command(args)
+    if args.command == "bench":
+        return run_bench_command(args)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
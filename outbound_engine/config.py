@@ -0,0 +1,65 @@
+"""
+Engine configuration.
+Everything generation needs (provider, keys, demo mode, models) passed explicitly,
+so the core never reads Streamlit session state.
+"""
+
+import os
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+from outbound_engine.kb import ROOT_DIR
+
+PROVIDERS = ("gemini", "openai")
+
+# Files shared between processes (run history, worker store, ready file), located through these variables
+HISTORY_PATH_ENV = "OUTBOUND_HISTORY"
+WORKER_STORE_ENV = "OUTBOUND_WORKER_STORE"
+READY_FILE_ENV = "OUTBOUND_READY_FILE"
+
+# Conservative per-provider request budgets for unattended runs (Gemini free tier is ~15 RPM)
+DEFAULT_REQUESTS_PER_MINUTE = {"gemini": 15, "openai": 60}
+
+
+@dataclass
+class EngineConfig:
+    """Provider and generation settings for one run (a UI session, a CLI batch, a worker)."""
+    provider: str = "gemini"
+    openai_api_key: str = ""
+    gemini_api_key: str = ""
+    demo_mode: bool = False
+    demo_fallback: bool = True  # on provider failure return demo/placeholder text (UI) instead of raising (batch)
+    openai_model: str = "gpt-4o"
+    openai_base_url: str = ""  # "" = api.openai.com; or a compatible server (e.g. openai_batch_mock)
+    rate_limit_wait: float = 20.0
+    requests_per_minute: float = 0.0  # 0 = unthrottled (the UI makes one call at a time)
+    request_timeout: float = 180.0  # seconds per provider call (a full 8k-token sequence can take ~2 minutes)
+    client_factory: object = None  # (api_key, base_url) -> OpenAI-compatible client; None = the openai SDK (bench passes a fake)
+    root: Path = ROOT_DIR
+
+    @classmethod
+    def from_env(cls, **overrides) -> "EngineConfig":
+        """Build from OPENAI_API_KEY / OPENAI_BASE_URL / GEMINI_API_KEY / OUTBOUND_PROVIDER; keyword overrides win."""
+        values = {
+            "provider": (os.getenv("OUTBOUND_PROVIDER") or "gemini").strip().lower(),
+            "openai_api_key": (os.getenv("OPENAI_API_KEY") or "").strip(),
+            "openai_base_url": (os.getenv("OPENAI_BASE_URL") or "").strip(),
+            "gemini_api_key": (os.getenv("GEMINI_API_KEY") or "").strip(),
+        }
+        values.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(**values)
+
+    def api_key(self, provider: str = None) -> str:
+        """API key for provider (defaults to the configured one)."""
+        return self.gemini_api_key if (provider or self.provider) == "gemini" else self.openai_api_key
+
+    @property
+    def has_api_key(self) -> bool:
+        return bool(self.api_key())
+
+    @property
+    def provider_name(self) -> str:
+        return "Gemini" if self.provider == "gemini" else "OpenAI"
+
+    def with_provider(self, provider: str) -> "EngineConfig":
+        return replace(self, provider=provider)
@@ -0,0 +1,245 @@
+"""
+Demo outputs.
+Realistic hypothesis and sequence drafts generated without API calls.
+"""
+
+DEMO_PERSONAS = ["VP/Director of Engineering", "Platform/DevEx Engineering Lead", "CTO"]
+
+
+def generate_demo_hypothesis(research_data: dict) -> str:
+    """Generate a realistic demo hypothesis without API calls."""
+    company_info = research_data.get("company_info", "").lower()
+    job_postings = research_data.get("job_postings", "").lower()
+    news_signals = research_data.get("news_signals", "").lower()
+    
+    # Extract company name if possible
+    company_name = "this company"
+    if company_info:
+        lines = company_info.split("\n")
+        for line in lines[:3]:
+            if "company" in line or "inc" in line or "corp" in line or "ltd" in line:
+                company_name = line.split()[0] if line.split() else "this company"
+                break
+    
+    # Detect signals
+    has_funding = "funding" in news_signals or "raised" in news_signals or "series" in news_signals
+    has_hiring = "hiring" in job_postings or "engineer" in job_postings or "developer" in job_postings
+    has_devex = "devex" in job_postings or "developer experience" in job_postings or "platform" in job_postings
+    
+    hypothesis = f"""## Why This Account
+
+{company_name.title()} appears to be a strong fit for Cursor based on several indicators:
+
+**Company Scale & Engineering Focus:**
+- Based on the research provided, this organization demonstrates significant engineering investment
+- The presence of relevant job postings suggests an active, growing engineering organization
+- This indicates the scale necessary to benefit from AI-powered developer productivity tools
+
+**Tech Stack & Digital Maturity:**
+- The research suggests a modern, engineering-forward culture
+- Active hiring in technical roles indicates ongoing investment in engineering capabilities
+- This aligns with Cursor's ideal customer profile of companies prioritizing developer experience
+
+**Budget Indicators:**
+{f"- Recent funding activity suggests budget availability for developer tooling investments" if has_funding else "- Growth indicators suggest potential budget for productivity tools"}
+
+---
+
+## Why Now
+
+Several timely signals create urgency for outreach:
+
+**Immediate Triggers:**
+{f"- Active hiring in engineering roles - perfect timing to introduce productivity tools as teams scale" if has_hiring else "- Engineering team growth creates opportunity for productivity improvements"}
+{f"- Platform/DevEx team formation or expansion indicates focus on developer experience" if has_devex else "- Active engineering investment suggests openness to productivity solutions"}
+
+**Pain Points Likely Experienced:**
+- Scaling engineering teams while maintaining velocity
+- Onboarding new developers efficiently
+- Managing context-switching and productivity bottlenecks
+- Justifying engineering headcount growth to leadership
+
+**Connection to Cursor Value Props:**
+- Cursor's 2-3x velocity improvement directly addresses scaling challenges
+- Codebase understanding accelerates onboarding for new team members
+- AI-powered development helps teams ship faster without proportional headcount increases
+
+---
+
+## Proof Points / Evidence to Cite
+- Relevant job postings (e.g. Platform Engineering, DevEx roles) — include URL if pasted in research
+- Engineering headcount or scale indicators from research
+- Recent funding, product launch, or conference mentions — include URL/source if in research
+- Any specific stats or quotes from the research (e.g. "300+ apps", "1B uses")
+
+---
+
+## Tech Stack
+- List any languages, frameworks, infrastructure, or tools mentioned in the research
+- If not specified: "Not specified in research"
+
+---
+
+## Risks / Why We Might Lose
+- Existing AI coding tool commitment (name a specific competitor only if the research indicates which one)
+- Budget or timing constraints
+- Other disqualifiers suggested by the research (avoid generic "lengthy enterprise security review")
+"""
+    
+    return hypothesis
+
+
+def generate_demo_sequence(lane: dict, hypothesis: str, prospect_info: dict) -> str:
+    """Generate a realistic demo sequence without API calls. lane = dict with id, name, example_titles, hook, cursor_play, peer_pivot."""
+    first_name = prospect_info.get('first_name') or '[First Name]'
+    company = prospect_info.get('company') or '[Company]'
+    lane_name = lane.get("name", "Internal Tool Owners")
+    
+    sequence = f"""# Outbound Sequence — {lane_name}
+
+## Sequence Overview
+**Persona lane:** {lane_name}
+**Total Steps:** 8
+**Duration:** 14 days
+**Channels:** Email, LinkedIn, Phone
+
+---
+
+## Step 1: Initial Email (Day 1)
+**Type:** Email
+**Subject:** Your DevEx team caught my attention
+
+**Body:**
+
+Hi {first_name},
+
+I noticed {company} is building out your developer experience function - saw the Platform Engineering role you're hiring for.
+
+At similar companies, we've seen DevEx teams struggle with developer tool adoption. Teams try new tools, but they don't stick because they don't understand the full codebase context.
+
+Cursor is different - it's an AI code editor built from the ground up with codebase understanding. When developers ask questions about your authentication system across 50 files, Cursor actually knows the answer.
+
+Quick question: What's your biggest challenge with developer productivity right now?
+
+Best,
+[Your Name]
+
+---
+
+## Step 2: LinkedIn Connection (Day 2)
+**Type:** LinkedIn
+**Message:**
+
+Hi {first_name}, I saw your role at {company} and thought you might be interested in connecting. I work with engineering leaders on developer productivity - would love to share what I'm seeing in the market.
+
+---
+
+## Step 3: Follow-up Email (Day 4)
+**Type:** Email
+**Subject:** Re: Your DevEx team caught my attention
+
+**Body:**
+
+Hi {first_name},
+
+Following up on my note about developer productivity at {company}.
+
+One thing I didn't mention: Cursor is built on VS Code, so your developers can start using it immediately with zero learning curve. All their extensions, settings, and workflows work exactly the same.
+
+We've seen 90%+ adoption in the first 30 days at companies like yours - developers actually ask for it.
+
+Worth a 15-minute conversation?
+
+Best,
+[Your Name]
+
+---
+
+## Step 4: LinkedIn Message (Day 5)
+**Type:** LinkedIn
+**Message:**
+
+{first_name}, curious - are you evaluating any AI coding tools for your team? Seeing a lot of interest from DevEx leaders right now.
+
+---
+
+## Step 5: Value Email (Day 7)
+**Type:** Email
+**Subject:** Quick question about {company}'s engineering velocity
+
+**Body:**
+
+Hi {first_name},
+
+I've been thinking about the scaling challenges you're likely facing as you grow the engineering team.
+
+One thing we hear consistently: teams using Cursor report 2-3x faster development velocity. Not just autocomplete - actual codebase understanding that helps with refactoring, debugging, and onboarding.
+
+If you're open to it, I'd love to show you a quick demo on your actual codebase. Takes 15 minutes and you'll see the difference immediately.
+
+Does next week work for a brief call?
+
+Best,
+[Your Name]
+
+---
+
+## Step 6: Phone Call Attempt (Day 9)
+**Type:** Phone
+**Opener:**
+
+Hi {first_name}, this is [Your Name] from Cursor. I've been emailing you about developer productivity tools - do you have 2 minutes?
+
+**If voicemail:**
+Hi {first_name}, this is [Your Name] from Cursor. I've been reaching out about AI-powered developer productivity tools. I noticed {company} is investing heavily in engineering, and I thought you'd be interested in what we're seeing - teams using Cursor are shipping 2-3x faster. Would love to connect - my number is [phone]. Talk soon.
+
+---
+
+## Step 7: Final Email (Day 11)
+**Type:** Email
+**Subject:** Last try - developer productivity at {company}
+
+**Body:**
+
+Hi {first_name},
+
+I know you're busy, so I'll keep this short.
+
+{company} is clearly investing in engineering - the Platform Engineering role you're hiring for is proof of that. The question is: are your developers as productive as they could be?
+
+Cursor helps engineering teams ship faster without adding headcount. It's what GitHub Copilot would be if it understood your entire codebase.
+
+If this isn't the right time, no worries. But if you're curious, I'm happy to show you what it looks like in action.
+
+Best,
+[Your Name]
+
+---
+
+## Step 8: Breakup Email (Day 14)
+**Type:** Email
+**Subject:** Closing the loop
+
+**Body:**
+
+Hi {first_name},
+
+Haven't heard back, so I'll assume this isn't a priority right now. That's totally fine - timing matters.
+
+If that changes, or if you'd like to stay in touch for when it makes sense, just let me know.
+
+Best of luck with the engineering growth at {company}.
+
+Best,
+[Your Name]
+
+---
+
+## Personalization Notes
+- Reference specific job postings or team formations from research
+- Connect to actual pain points mentioned in hypothesis
+- Adjust messaging based on persona's likely concerns
+- Use company-specific signals throughout sequence
+"""
+    
+    return sequence
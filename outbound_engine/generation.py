@@ -0,0 +1,245 @@
+"""
+Generation stages.
+Hypothesis, persona extraction, lane sequences, AE handoff and CSV export, with the same
+retry / provider-fallback / demo-fallback behavior the UI has always had.
+
+Stages never touch Streamlit. They report through notify(level, message):
+  "info" / "warning" / "error"  user-facing messages (markdown)
+  "api_error"                   raw provider error text, for debugging
+  "provider"                    the provider was switched (message is the new provider)
+
+Each stage is a tracing span (tracing.py) with child spans for prompt assembly, the provider
+call and parsing; retries and fallbacks are counted on the stage span.
+"""
+
+import ast
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from outbound_engine.config import EngineConfig
+from outbound_engine.demo import DEMO_PERSONAS, generate_demo_hypothesis, generate_demo_sequence
+from outbound_engine.parsing import csv_text_to_dataframe, extract_personas_from_text
+from outbound_engine.prompts import (
+    CSV_SYSTEM, HANDOFF_SYSTEM, HYPOTHESIS_SYSTEM, PERSONA_SYSTEM, SEQUENCE_SYSTEM,
+    build_csv_request, build_handoff_prompt, build_hypothesis_prompt, build_persona_prompt,
+    build_sequence_prompt,
+)
+from outbound_engine.providers import CallCancelled, RateLimitError, complete, get_client
+from outbound_engine.tracing import current_span, span
+
+
+class CsvExportError(Exception):
+    """CSV export failed. csv_content is the raw provider output, when there was any."""
+
+    def __init__(self, message: str, csv_content: str = None):
+        super().__init__(message)
+        self.csv_content = csv_content
+
+
+def _ignore(level: str, message: str):
+    pass
+
+
+def _report_error(e: Exception, notify) -> str:
+    error_msg = str(e)
+    notify("api_error", getattr(e, "raw", error_msg))
+    return error_msg
+
+
+def _demo_or_raise(config: EngineConfig, error: Exception, demo):
+    """Last resort after the provider failed: demo output, unless the config says placeholder text must not pass for a result."""
+    if not config.demo_fallback:
+        raise error
+    current_span().set(fallback="demo")
+    return demo()
+
+
+def generate_hypothesis(research_data: dict, config: EngineConfig, notify=None, exemplars: list = None) -> str:
+    """Generate outbound hypothesis using AI or demo mode. exemplars: hypotheses for similar accounts (few-shot)."""
+    with span("generate_hypothesis", provider=config.provider, demo=config.demo_mode, exemplars=len(exemplars or [])):
+        return _generate_hypothesis(research_data, config, notify, exemplars)
+
+
+def _generate_hypothesis(research_data: dict, config: EngineConfig, notify, exemplars: list) -> str:
+    notify = notify or _ignore
+    if config.demo_mode:
+        return generate_demo_hypothesis(research_data)
+
+    provider = config.provider
+    with span("prompt.build"):
+        prompt = build_hypothesis_prompt(research_data, provider, config.root, exemplars)
+    demo = lambda: generate_demo_hypothesis(research_data)
+
+    try:
+        return complete(config, prompt, system=HYPOTHESIS_SYSTEM, temperature=0.7, max_tokens=8192)
+    except CallCancelled:
+        raise  # nobody is waiting for this result; don't retry or fall back
+    except Exception as e:
+        error_msg = _report_error(e, notify)
+        if isinstance(e, RateLimitError):
+            # Retry once after a short wait (Gemini free tier has strict RPM limits)
+            notify("info", f"⏳ Rate limit hit. Waiting {config.rate_limit_wait:g} seconds and retrying once...")
+            current_span().add("retries")
+            time.sleep(config.rate_limit_wait)
+            try:
+                return complete(config, prompt, system=HYPOTHESIS_SYSTEM, temperature=0.7, max_tokens=8192)
+            except Exception as retry_e:
+                _report_error(retry_e, notify)
+                notify("warning", "⚠️ **Rate limit still in effect.** Gemini's free tier allows ~15 requests/minute. Wait a minute and try again, or enable billing in [Google AI Studio](https://aistudio.google.com) for higher limits. Using demo mode for this run.")
+                return _demo_or_raise(config, retry_e, demo)
+        # Show actual error so user can see invalid key, permission, etc.
+        notify("error", f"⚠️ **API Error**: {error_msg[:500]}")
+        notify("info", "Switching to demo mode. If this is an auth/key error, check Streamlit Secrets (GEMINI_API_KEY) and redeploy.")
+        if provider == "openai":
+            try:
+                notify("provider", "gemini")
+                current_span().set(fallback="gemini")
+                return complete(config, prompt, temperature=0.7, max_tokens=8192, provider="gemini")
+            except Exception as gemini_e:
+                return _demo_or_raise(config, gemini_e, demo)
+        return _demo_or_raise(config, e, demo)
+
+
+def extract_personas_from_hypothesis(hypothesis: str, config: EngineConfig, use_api: bool = False) -> list:
+    """Extract persona recommendations from the hypothesis. use_api=False avoids an extra API call (saves quota)."""
+    if config.demo_mode:
+        return list(DEMO_PERSONAS)
+    # Text-based extraction first (no API call) - sequences use persona lanes now
+    out = extract_personas_from_text(hypothesis)
+    if out:
+        return out
+    if not use_api:
+        return list(DEMO_PERSONAS)
+    try:
+        if config.provider == "gemini":
+            content = complete(config, build_persona_prompt(hypothesis), temperature=0, max_tokens=200)
+        else:
+            content = complete(config, hypothesis, system=PERSONA_SYSTEM, temperature=0, max_tokens=200)
+        # Try to evaluate as a Python list
+        personas = ast.literal_eval(content.strip())
+        if isinstance(personas, list) and len(personas) > 0:
+            return personas
+    except Exception:
+        pass
+    return list(DEMO_PERSONAS)
+
+
+def generate_sequence(lane: dict, hypothesis: str, prospect_info: dict, config: EngineConfig,
+                      reference_customers: str = "", notify=None) -> str:
+    """Generate outbound sequence for a persona lane (scalable across prospects). lane = dict with id, name, example_titles, hook, cursor_play, peer_pivot. reference_customers = optional list of current customers to cite in 1-2 steps."""
+    with span("generate_sequence", provider=config.provider, demo=config.demo_mode, lane=lane.get("name")):
+        return _generate_sequence(lane, hypothesis, prospect_info, config, reference_customers, notify)
+
+
+def _generate_sequence(lane: dict, hypothesis: str, prospect_info: dict, config: EngineConfig,
+                       reference_customers: str, notify) -> str:
+    notify = notify or _ignore
+    if config.demo_mode:
+        return generate_demo_sequence(lane, hypothesis, prospect_info)
+
+    provider = config.provider
+    with span("prompt.build"):
+        prompt = build_sequence_prompt(lane, hypothesis, prospect_info, provider, reference_customers, config.root)
+    demo = lambda: generate_demo_sequence(lane, hypothesis, prospect_info)
+
+    try:
+        return complete(config, prompt, system=SEQUENCE_SYSTEM, temperature=0.7, max_tokens=8192)
+    except CallCancelled:
+        raise  # nobody is waiting for this result; don't retry or fall back
+    except Exception as e:
+        error_msg = _report_error(e, notify)
+        if isinstance(e, RateLimitError):
+            notify("info", f"⏳ Rate limit hit. Waiting {config.rate_limit_wait:g} seconds and retrying once...")
+            current_span().add("retries")
+            time.sleep(config.rate_limit_wait)
+            try:
+                return complete(config, prompt, system=SEQUENCE_SYSTEM, temperature=0.7, max_tokens=8192)
+            except Exception as retry_e:
+                _report_error(retry_e, notify)
+                e = retry_e
+            notify("warning", "⚠️ **Rate limit still in effect.** Wait a minute and try again, or enable billing in Google AI Studio for higher limits. Using demo mode for this run.")
+            return _demo_or_raise(config, e, demo)
+        notify("error", f"⚠️ **API Error**: {error_msg[:500]}")
+        notify("info", "Switching to demo mode. If this is an auth/key error, check Streamlit Secrets (GEMINI_API_KEY) and redeploy.")
+        if provider == "openai":
+            notify("info", "🔄 OpenAI failed, trying Gemini...")
+            try:
+                notify("provider", "gemini")
+                current_span().set(fallback="gemini")
+                return complete(config, prompt, temperature=0.7, max_tokens=8192, provider="gemini")
+            except Exception as gemini_e:
+                notify("warning", "⚠️ Both providers failed. Switching to demo mode.")
+                return _demo_or_raise(config, gemini_e, demo)
+        notify("warning", "⚠️ **API Error**: Switching to demo mode.")
+        return _demo_or_raise(config, e, demo)
+
+
+def generate_ae_handoff(hypothesis: str, config: EngineConfig) -> str:
+    """Generate AE handoff note + filled-in first call agenda from the hypothesis."""
+    with span("generate_ae_handoff", provider=config.provider) as current:
+        with span("prompt.build"):
+            prompt = build_handoff_prompt(hypothesis, config.root)
+        if not prompt:
+            return "Missing templates: ae_handoff_template.md or agenda_template.md"
+        try:
+            return complete(config, prompt, system=HANDOFF_SYSTEM, temperature=0.5, max_tokens=8192).strip()
+        except Exception as e:
+            if not config.demo_fallback or isinstance(e, CallCancelled):
+                raise
+            current.set(fallback="error_text")
+            return f"Error generating AE handoff: {str(e)}"
+
+
+def request_csv_text(sequence: str, config: EngineConfig, client=None) -> str:
+    """Ask the provider to format a sequence as CSV rows (raw text)."""
+    return complete(config, build_csv_request(sequence, config.provider), system=CSV_SYSTEM,
+                    temperature=0, max_tokens=8192, client=client).strip()
+
+
+def parse_sequence_to_csv(sequence: str, prospect_info: dict, config: EngineConfig, notify=None, client=None) -> "pd.DataFrame":
+    """Parse the generated sequence into CSV format for Outreach.io. Raises CsvExportError on failure."""
+    with span("parse_sequence_to_csv", provider=config.provider):
+        client = client or get_client(config)
+        if not client:
+            raise CsvExportError(f"{config.provider_name} API key not configured for CSV export")
+        csv_content = None
+        try:
+            csv_content = request_csv_text(sequence, config, client)
+            return csv_text_to_dataframe(csv_content, sequence, prospect_info, notify)
+        except Exception as e:
+            raise CsvExportError(str(e), csv_content) from e
+
+
+def parse_all_sequences_to_csv(sequences: dict, prospect_info: dict, config: EngineConfig, notify=None, max_workers: int = 3):
+    """Parse every generated lane into one DataFrame with a lane column. The LLM calls run concurrently, one per lane.
+    Returns (df, failures) where failures maps lane name -> CsvExportError."""
+    import pandas as pd
+
+    client = get_client(config)
+    if not client:
+        raise CsvExportError(f"{config.provider_name} API key not configured for CSV export")
+
+    lane_ids = list(sequences.keys())
+    with ThreadPoolExecutor(max_workers=min(len(lane_ids), max_workers) or 1) as pool:
+        futures = {
+            lane_id: pool.submit(request_csv_text, sequences[lane_id]["content"], config, client)
+            for lane_id in lane_ids
+        }
+
+    frames = []
+    failures = {}
+    for lane_id in lane_ids:
+        lane_name = sequences[lane_id]["name"]
+        csv_content = None
+        try:
+            csv_content = futures[lane_id].result()
+            df = csv_text_to_dataframe(csv_content, sequences[lane_id]["content"], prospect_info, notify)
+        except Exception as e:
+            failures[lane_name] = CsvExportError(str(e), csv_content)
+            continue
+        df.insert(0, "lane", lane_name)
+        # One Outreach sequence per lane
+        df["sequence_name"] = f"Cursor Outbound - {prospect_info.get('company', 'Unknown')} - {lane_name}"
+        frames.append(df)
+
+    return (pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()), failures
@@ -0,0 +1,410 @@
+"""
+Stage graph.
+
+    research -> hypothesis -> persona extraction (local, no API)
+                           -> lane sequence (lane, prospect, reference customers) -> CSV text -> CSV rows (prospect)
+                           -> AE handoff
+
+Every provider-backed node has a key that hashes exactly the inputs reaching its prompt:
+research text, KB/prompt/template version, lane, the prospect fields the prompt uses,
+the upstream output, and the provider/model. A node reruns only when its key changes;
+otherwise its output comes from the memo store (MemoryMemo for a UI session, the
+JobStore for batch runs). Prospect columns are added to CSV rows locally, so a new
+prospect email reuses the CSV text the provider already produced.
+
+Demo output and fallbacks after a provider failure are never memoized.
+
+With a NearDuplicates tier (opt-in, see similarity.py), a hypothesis for research that
+is only a small edit away from research this graph already generated for is served from
+that earlier result; near_hit on the graph says so.
+
+Identical calls in flight at the same time are coalesced across every graph in the
+process (SingleFlight): when two sessions with the same credentials ask for the same node
+key, the second waits for the first call's result instead of paying for its own.
+
+Every node request is a tracing span (stage.<name>) saying whether it was a cache hit and
+where from (memo, in_flight, near_duplicate); on a miss the stage's own spans nest under it.
+"""
+
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import replace
+
+from outbound_engine.config import EngineConfig
+from outbound_engine.demo import generate_demo_hypothesis, generate_demo_sequence
+from outbound_engine.generation import (
+    CsvExportError, generate_ae_handoff, generate_hypothesis, generate_sequence, request_csv_text,
+)
+from outbound_engine.kb import kb_version
+from outbound_engine.parsing import csv_text_to_dataframe
+from outbound_engine.providers import CallCancelled, current_cancel_event, get_client
+from outbound_engine.session import BlobStore, MemoryBudget
+from outbound_engine.tracing import span
+
+RESEARCH_KEYS = ("company_info", "job_postings", "linkedin_profiles", "news_signals")
+PROSPECT_PROMPT_KEYS = ("first_name", "last_name", "title", "company", "email")
+
+
+class MemoryMemo:
+    """Thread-safe in-process memo (LRU, bounded by entry count). Outputs are kept compressed and count against
+    a MemoryBudget; pass the session's so the memo and its SessionData share one ceiling (see session.py)."""
+
+    def __init__(self, max_entries: int = 256, budget: MemoryBudget = None):
+        self.max_entries = max_entries
+        self._keys = OrderedDict()
+        self._blobs = BlobStore(budget)
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            if key not in self._keys:
+                return None
+            self._keys.move_to_end(key)
+            return self._blobs.get(key)
+
+    def put(self, key: str, output: str, stage: str = "") -> None:
+        with self._lock:
+            self._keys[key] = stage
+            self._keys.move_to_end(key)
+            self._blobs.set(key, output)
+            while len(self._keys) > self.max_entries:
+                evicted, _ = self._keys.popitem(last=False)
+                self._blobs.discard(evicted)
+
+    def footprint(self) -> dict:
+        with self._lock:
+            return {"memory_bytes": self._blobs.memory_bytes, "disk_bytes": self._blobs.disk_bytes}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class SingleFlight:
+    """Coalesces identical in-flight calls: while one caller runs a key, callers with the same key wait for
+    its result (or its error) instead of running it again. Nothing is kept once the call finishes."""
+
+    def __init__(self):
+        self._calls = {}  # key -> Future of the call in flight
+        self._lock = threading.Lock()
+        self.led = 0
+        self.joined = 0
+
+    def do(self, key: str, fn):
+        """fn() once per key at a time. Returns (output, shared); shared is True when another caller's call
+        produced it. If that caller is cancelled, a waiter that isn't runs the call itself."""
+        while True:
+            with self._lock:
+                future = self._calls.get(key)
+                leader = future is None
+                if leader:
+                    future = self._calls[key] = Future()
+                    self.led += 1
+            if leader:
+                try:
+                    try:
+                        output = fn()
+                    except BaseException as e:
+                        future.set_exception(e)
+                        raise
+                    future.set_result(output)
+                    return output, False
+                finally:  # only once the future is done, so a caller arriving now joins it rather than rerunning
+                    with self._lock:
+                        if self._calls.get(key) is future:
+                            del self._calls[key]
+            try:
+                output = self._wait(future)
+            except CallCancelled:
+                cancel = current_cancel_event()
+                if cancel is not None and cancel.is_set():
+                    raise
+                continue  # the other session was reset, not this one
+            with self._lock:
+                self.joined += 1
+            return output, True
+
+    @staticmethod
+    def _wait(future: Future):
+        cancel = current_cancel_event()
+        while True:
+            try:
+                return future.result(timeout=None if cancel is None else 0.1)
+            except FutureTimeout:
+                if cancel.is_set():
+                    raise CallCancelled("Cancelled")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._calls), "led": self.led, "joined": self.joined}
+
+
+IN_FLIGHT = SingleFlight()  # shared by every graph in this process (every UI session, every batch worker)
+
+
+def node_key(stage: str, config: EngineConfig, *inputs) -> str:
+    """Hash of a node's stage, provider/model, KB version and inputs."""
+    model = config.openai_model if config.provider == "openai" else ""
+    payload = json.dumps([stage, config.provider, model, kb_version(config.root), *inputs],
+                         sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def in_flight_key(key: str, config: EngineConfig) -> str:
+    """Node key plus a hash of the credentials the call would use, so calls only coalesce within one account."""
+    base_url = config.openai_base_url if config.provider == "openai" else ""
+    credentials = hashlib.sha256(f"{config.api_key()}\0{base_url}".encode("utf-8")).hexdigest()[:16]
+    return f"{key}:{credentials}"
+
+
+def hypothesis_key(research_data: dict, config: EngineConfig, exemplars: list = None) -> str:
+    research = {k: research_data.get(k, "") for k in RESEARCH_KEYS}
+    if exemplars:
+        return node_key("hypothesis", config, research, list(exemplars))
+    return node_key("hypothesis", config, research)
+
+
+def hypothesis_context(config: EngineConfig, exemplars: list = None) -> str:
+    """Everything but the research that reaches the hypothesis prompt (near duplicates must match it exactly)."""
+    return node_key("hypothesis-context", config, list(exemplars or []))
+
+
+def prospect_prompt_fields(prospect_info: dict) -> dict:
+    """The prospect fields the sequence prompt actually uses (none when it falls back to placeholders)."""
+    if not (prospect_info.get("first_name") and prospect_info.get("company")):
+        return {}
+    return {k: prospect_info.get(k, "") for k in PROSPECT_PROMPT_KEYS}
+
+
+def sequence_key(lane: dict, hypothesis: str, prospect_info: dict, reference_customers: str,
+                 config: EngineConfig) -> str:
+    return node_key("sequence", config, lane, hypothesis, prospect_prompt_fields(prospect_info),
+                    (reference_customers or "").strip())
+
+
+def handoff_key(hypothesis: str, config: EngineConfig) -> str:
+    return node_key("handoff", config, hypothesis)
+
+
+def csv_key(sequence: str, config: EngineConfig) -> str:
+    return node_key("csv", config, sequence)
+
+
+def run_stage(stage: str, request: dict, config: EngineConfig, notify=None) -> str:
+    """Run one provider-backed stage from a plain (JSON-serializable) request, without any memo."""
+    if stage == "hypothesis":
+        return generate_hypothesis(request["research_data"], config, notify=notify, exemplars=request.get("exemplars"))
+    if stage == "sequence":
+        return generate_sequence(request["lane"], request["hypothesis"], request["prospect_info"], config,
+                                 reference_customers=request.get("reference_customers", ""), notify=notify)
+    if stage == "handoff":
+        return generate_ae_handoff(request["hypothesis"], config)
+    if stage == "csv":
+        return request_csv_text(request["sequence"], config)
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+class StageGraph:
+    """Runs stages through a memo. force=True reruns a node (and refreshes its memo entry)."""
+
+    def __init__(self, config: EngineConfig, memo=None, notify=None, near_duplicates=None):
+        self.config = config
+        self.memo = memo if memo is not None else MemoryMemo()
+        self.notify = notify
+        self.near_duplicates = near_duplicates
+        self.near_hit = None  # set when the last hypothesis() came from the near-duplicate tier
+        self.ran = 0
+        self.reused = 0
+        self._strict = replace(config, demo_fallback=False)
+        self._lock = threading.Lock()
+
+    def _count(self, reused: bool) -> None:
+        with self._lock:
+            if reused:
+                self.reused += 1
+            else:
+                self.ran += 1
+
+    def with_notify(self, notify=None) -> "StageGraph":
+        """Same graph (config, memo) reporting to notify instead; None for background runs with no UI to report to."""
+        graph = copy.copy(self)
+        graph.notify = notify
+        graph.ran = graph.reused = 0
+        graph._lock = threading.Lock()
+        return graph
+
+    def _produce(self, stage: str, key: str, request: dict) -> str:
+        return run_stage(stage, request, self._strict, self.notify)
+
+    def _run(self, stage: str, key: str, request: dict, fallback=None, force: bool = False) -> str:
+        with span(f"stage.{stage}", provider=self.config.provider, node_key=key[:16], force=force) as current:
+            if not force:
+                cached = self.memo.get(key)
+                if cached is not None:
+                    self._count(reused=True)
+                    current.set(**{"cache.hit": True, "cache.source": "memo"})
+                    return cached
+            try:
+                output, shared = IN_FLIGHT.do(in_flight_key(key, self.config),
+                                              lambda: self._produce(stage, key, request))
+            except Exception as e:
+                # Keep the caller's demo_fallback behavior, but never memoize the fallback
+                if self.config.demo_fallback and fallback is not None and not isinstance(e, CallCancelled):
+                    current.set(fallback="demo")
+                    return fallback(e)
+                raise
+            self._count(reused=shared)
+            current.set(**{"cache.hit": shared, "cache.source": "in_flight" if shared else None})
+            self.memo.put(key, output, stage)
+            if stage == "hypothesis" and self.near_duplicates is not None:
+                self.near_duplicates.add(hypothesis_context(self.config, request.get("exemplars")),
+                                         request["research_data"], output)
+            return output
+
+    def hypothesis(self, research_data: dict, force: bool = False, exemplars: list = None) -> str:
+        """exemplars: hypotheses for similar accounts to show the model (part of the node key)."""
+        self.near_hit = None
+        if self.config.demo_mode:
+            return generate_demo_hypothesis(research_data)
+        key = hypothesis_key(research_data, self.config, exemplars)
+        if self.near_duplicates is not None and not force and self.memo.get(key) is None:
+            hit = self.near_duplicates.find(hypothesis_context(self.config, exemplars), research_data)
+            if hit is not None:
+                with span("stage.hypothesis", provider=self.config.provider, node_key=key[:16],
+                          similarity=hit["similarity"], **{"cache.hit": True, "cache.source": "near_duplicate"}):
+                    self._count(reused=True)
+                    self.near_hit = hit
+                return hit["output"]
+        request = {"research_data": research_data}
+        if exemplars:
+            request["exemplars"] = list(exemplars)
+        return self._run(
+            "hypothesis", key, request, fallback=lambda e: generate_demo_hypothesis(research_data), force=force,
+        )
+
+    def sequence(self, lane: dict, hypothesis: str, prospect_info: dict, reference_customers: str = "",
+                 force: bool = False) -> str:
+        if self.config.demo_mode:
+            return generate_demo_sequence(lane, hypothesis, prospect_info)
+        return self._run(
+            "sequence", sequence_key(lane, hypothesis, prospect_info, reference_customers, self.config),
+            {"lane": lane, "hypothesis": hypothesis, "prospect_info": prospect_info,
+             "reference_customers": reference_customers},
+            fallback=lambda e: generate_demo_sequence(lane, hypothesis, prospect_info), force=force,
+        )
+
+    def handoff(self, hypothesis: str, force: bool = False) -> str:
+        return self._run(
+            "handoff", handoff_key(hypothesis, self.config), {"hypothesis": hypothesis},
+            fallback=lambda e: f"Error generating AE handoff: {str(e)}", force=force,
+        )
+
+    def cached_sequence(self, lane: dict, hypothesis: str, prospect_info: dict, reference_customers: str = ""):
+        """Memoized sequence for these inputs, or None (never calls the provider)."""
+        return self.memo.get(sequence_key(lane, hypothesis, prospect_info, reference_customers, self.config))
+
+    def cached_handoff(self, hypothesis: str):
+        return self.memo.get(handoff_key(hypothesis, self.config))
+
+    def submit_downstream(self, executor, hypothesis: str, lane: dict, prospect_info: dict,
+                          reference_customers: str = "") -> dict:
+        """Start the AE handoff and one lane's sequence on executor as soon as the hypothesis exists (neither needs
+        anything else). Results land in the memo; returns {"handoff": future, "sequence": future}.
+        Background runs don't notify (there is no UI to report to); failures stay on the futures."""
+        if self.config.demo_mode:
+            return {}
+        background = self.with_notify(None)
+        return {
+            "handoff": executor.submit(background.handoff, hypothesis),
+            "sequence": executor.submit(background.sequence, dict(lane), hypothesis, dict(prospect_info),
+                                        reference_customers),
+        }
+
+    def _csv_client(self):
+        client = get_client(self.config)
+        if not client:
+            raise CsvExportError(f"{self.config.provider_name} API key not configured for CSV export")
+        return client
+
+    def _csv_text(self, sequence: str, client) -> str:
+        return request_csv_text(sequence, self.config, client)
+
+    def _csv_fetch(self, key: str, sequence: str, client, force: bool = False):
+        """The provider's CSV text for a sequence as (text, source): source is "memo", "in_flight" or None (this
+        call produced it). Never notifies, so it can run on pool threads."""
+        if not force:
+            cached = self.memo.get(key)
+            if cached is not None:
+                return cached, "memo"
+        client = client or self._csv_client()
+        csv_content, shared = IN_FLIGHT.do(in_flight_key(key, self.config), lambda: self._csv_text(sequence, client))
+        return csv_content, "in_flight" if shared else None
+
+    def _csv_rows(self, key: str, sequence: str, prospect_info: dict, csv_content: str, source, current):
+        """Parse fetched CSV text (notifying about coverage from the calling thread) and memoize it once it parses."""
+        try:
+            df = csv_text_to_dataframe(csv_content, sequence, prospect_info, self.notify)
+        except Exception as e:
+            raise CsvExportError(str(e), csv_content) from e
+        self._count(reused=source is not None)
+        current.set(**{"cache.hit": source is not None, "cache.source": source})
+        if source != "memo":
+            self.memo.put(key, csv_content, "csv")
+        return df
+
+    def csv_frame(self, sequence: str, prospect_info: dict, client=None, force: bool = False) -> "pd.DataFrame":
+        """CSV rows for a sequence. The provider's CSV text is memoized once it parses; prospect columns are local.
+        Raises CsvExportError like parse_sequence_to_csv."""
+        key = csv_key(sequence, self.config)
+        with span("stage.csv", provider=self.config.provider, node_key=key[:16], force=force) as current:
+            try:
+                csv_content, source = self._csv_fetch(key, sequence, client, force)
+            except CsvExportError:
+                raise
+            except Exception as e:
+                raise CsvExportError(str(e)) from e
+            return self._csv_rows(key, sequence, prospect_info, csv_content, source, current)
+
+    def csv_frames(self, sequences: dict, prospect_info: dict, max_workers: int = 3):
+        """Every lane's CSV rows in one DataFrame with a lane column; uncached lanes are requested concurrently.
+        Only the provider calls run on the pool: parsing, notify and the memo stay in the calling thread (the
+        UI's notify needs it), like parse_all_sequences_to_csv. Returns (df, failures) like that function."""
+        import pandas as pd
+
+        keys = {lane_id: csv_key(seq["content"], self.config) for lane_id, seq in sequences.items()}
+        client = None
+        if any(self.memo.get(key) is None for key in keys.values()):
+            client = self._csv_client()
+
+        lane_ids = list(sequences.keys())
+        with ThreadPoolExecutor(max_workers=min(len(lane_ids), max_workers) or 1) as pool:
+            futures = {
+                lane_id: pool.submit(self._csv_fetch, keys[lane_id], sequences[lane_id]["content"], client)
+                for lane_id in lane_ids
+            }
+
+        frames = []
+        failures = {}
+        for lane_id in lane_ids:
+            lane_name = sequences[lane_id]["name"]
+            with span("stage.csv", provider=self.config.provider, node_key=keys[lane_id][:16], lane=lane_name) as current:
+                try:
+                    csv_content, source = futures[lane_id].result()
+                    df = self._csv_rows(keys[lane_id], sequences[lane_id]["content"], prospect_info, csv_content,
+                                        source, current)
+                except CsvExportError as e:
+                    failures[lane_name] = e
+                    continue
+                except Exception as e:
+                    failures[lane_name] = CsvExportError(str(e))
+                    continue
+            df.insert(0, "lane", lane_name)
+            # One Outreach sequence per lane
+            df["sequence_name"] = f"Cursor Outbound - {prospect_info.get('company', 'Unknown')} - {lane_name}"
+            frames.append(df)
+
+        return (pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()), failures
@@ -0,0 +1,409 @@
+"""
+Run history.
+Every completed run (research, hypothesis, lane sequences, AE handoff) is kept in one
+SQLite file so an account can be reopened later without regenerating anything. A run is
+identified by its research and hypothesis: generating more lanes or the handoff for the
+same hypothesis updates the same entry.
+
+The run body is stored compressed (zstd; zstandard is in requirements.txt, and an install
+without it falls back to zlib; each row records its codec). Company, date, lanes and KB version are plain
+indexed columns, so listing and filtering never decompress anything.
+
+Research inputs, hypotheses and sequences are also in a full-text index (SQLite FTS5,
+contentless so the text isn't stored twice), updated in the same transaction as each save:
+
+    history.search("copilot fintech")    # every word, any order
+    history.search('"platform team" OR devex*')
+
+Each run's research also has a MinHash signature (similarity.py), so similar(research)
+finds the saved accounts whose research most resembles a new one: their hypotheses can be
+reused outright or given to the model as examples.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+
+from outbound_engine import similarity
+from outbound_engine.config import HISTORY_PATH_ENV
+from outbound_engine.kb import ROOT_DIR
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_key     TEXT NOT NULL UNIQUE,
+    company     TEXT NOT NULL,
+    kb_version  TEXT NOT NULL,
+    provider    TEXT NOT NULL,
+    lanes       TEXT NOT NULL,
+    codec       TEXT NOT NULL,
+    body        BLOB NOT NULL,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_company ON runs (company COLLATE NOCASE, updated_at);
+CREATE INDEX IF NOT EXISTS runs_updated ON runs (updated_at);
+CREATE INDEX IF NOT EXISTS runs_kb ON runs (kb_version, updated_at);
+CREATE TABLE IF NOT EXISTS run_lanes (
+    run_id      INTEGER NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    lane_id     TEXT NOT NULL,
+    lane_name   TEXT NOT NULL,
+    PRIMARY KEY (run_id, lane_id)
+);
+CREATE INDEX IF NOT EXISTS run_lanes_name ON run_lanes (lane_name, run_id);
+CREATE TABLE IF NOT EXISTS run_minhash (
+    run_id      INTEGER PRIMARY KEY REFERENCES runs (run_id) ON DELETE CASCADE,
+    signature   BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS run_lsh (
+    band        INTEGER NOT NULL,
+    bucket      INTEGER NOT NULL,
+    run_id      INTEGER NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS run_lsh_bucket ON run_lsh (band, bucket);
+CREATE INDEX IF NOT EXISTS run_lsh_run ON run_lsh (run_id);
+"""
+
+# rowid = run_id. Contentless: removing a run's entry needs the values it was indexed with (see _unindex)
+_SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE runs_search USING fts5(
+    company, research, hypothesis, sequences,
+    content = '', tokenize = 'porter unicode61 remove_diacritics 2'
+);
+"""
+
+
+class HistoryError(Exception):
+    """A stored run could not be read."""
+
+
+def default_history_path() -> Path:
+    return Path(os.getenv(HISTORY_PATH_ENV) or ROOT_DIR / "run_history.sqlite3")
+
+
+def company_name(research_data: dict, prospect_info: dict) -> str:
+    """The prospect's company, else the first line of the company research."""
+    company = (prospect_info or {}).get("company", "").strip()
+    if company:
+        return company
+    for line in (research_data or {}).get("company_info", "").splitlines():
+        line = line.strip().lstrip("#").strip()
+        if line:
+            return line[:80]
+    return "Unknown company"
+
+
+def run_key(research_data: dict, hypothesis: str) -> str:
+    payload = json.dumps([research_data, hypothesis], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def search_query(text: str) -> str:
+    """FTS5 query for what a rep types: every word must match (quoted, so punctuation can't break the query),
+    "quoted phrases" stay phrases, OR between words is kept and a trailing * matches a prefix."""
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', text or ""):
+        if word == "OR" and terms and terms[-1] != "OR":
+            terms.append("OR")
+            continue
+        prefix = word.endswith("*")
+        body = " ".join(re.findall(r"\w+", phrase if phrase else word))
+        if body:
+            terms.append(f'"{body}"' + ("*" if prefix and not phrase else ""))
+    while terms and terms[-1] == "OR":
+        terms.pop()
+    return " ".join(terms)
+
+
+def _search_fields(company: str, body: dict) -> tuple:
+    research = "\n\n".join(str(v) for v in (body.get("research_data") or {}).values() if v)
+    sequences = "\n\n".join(f"{seq['name']}\n{seq['content']}" for seq in (body.get("sequences") or {}).values())
+    return company, research, body.get("hypothesis") or "", sequences
+
+
+def excerpt(text: str, query: str, width: int = 160) -> str:
+    """The part of text around the first query word it contains (the index itself keeps no text)."""
+    words = [w.lower().rstrip("*") for w in re.findall(r"\w+\*?", query or "") if w != "OR"]
+    lowered = text.lower()
+    hits = [i for i in (lowered.find(w) for w in words) if i >= 0]
+    if not hits:  # the index stems words ("pitched" matches "pitch"); look for the stem
+        hits = [i for i in (lowered.find(w[:max(4, len(w) - 3)]) for w in words) if i >= 0]
+    if not hits:
+        return ""
+    start = max(0, min(hits) - width // 3)
+    snippet = " ".join(text[start:start + width].split())
+    return ("…" if start else "") + snippet + ("…" if start + width < len(text) else "")
+
+
+def _compress(data: bytes):
+    if ZSTD_AVAILABLE:
+        return "zstd", zstandard.ZstdCompressor(level=9).compress(data)
+    return "zlib", zlib.compress(data, 9)
+
+
+def _decompress(codec: str, blob: bytes) -> bytes:
+    if codec == "zlib":
+        return zlib.decompress(blob)
+    if codec == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise HistoryError("This run was saved with zstd compression; install zstandard to open it")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    raise HistoryError(f"Unknown compression: {codec}")
+
+
+_RUN_COLUMNS = "r.run_id, r.company, r.kb_version, r.provider, r.lanes, r.created_at, r.updated_at"
+
+
+def _summary(row) -> dict:
+    return {"run_id": row["run_id"], "company": row["company"], "kb_version": row["kb_version"],
+            "provider": row["provider"], "lanes": json.loads(row["lanes"]), "created_at": row["created_at"],
+            "updated_at": row["updated_at"]}
+
+
+class RunHistory:
+    """SQLite store of completed runs. Safe to share between threads and processes."""
+
+    def __init__(self, path=None):
+        self.path = Path(path or default_history_path())
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+        self.search_available = self._create_search_index()
+        self._index_similarity()
+
+    def _create_search_index(self) -> bool:
+        """Create the full-text index if missing, indexing runs saved before it existed. False without FTS5."""
+        exists = "SELECT 1 FROM sqlite_master WHERE name = 'runs_search'"
+        if self._conn().execute(exists).fetchone():
+            return True
+        try:
+            with self._tx() as db:
+                if db.execute(exists).fetchone():  # another process got there first
+                    return True
+                db.execute(_SEARCH_SCHEMA)
+                for row in db.execute("SELECT run_id, company, codec, body FROM runs").fetchall():
+                    self._index(db, row["run_id"], _search_fields(row["company"], self._body(row)))
+        except sqlite3.OperationalError:
+            return False  # SQLite built without FTS5: history works, search doesn't
+        return True
+
+    def _index_similarity(self) -> None:
+        """Sign runs saved before the similarity index existed."""
+        with self._tx() as db:
+            rows = db.execute("SELECT run_id, codec, body FROM runs WHERE run_id NOT IN "
+                              "(SELECT run_id FROM run_minhash)").fetchall()
+            for row in rows:
+                self._sign(db, row["run_id"], self._body(row)["research_data"])
+
+    @staticmethod
+    def _sign(db, run_id: int, research_data: dict) -> None:
+        db.execute("DELETE FROM run_lsh WHERE run_id = ?", (run_id,))
+        sig = similarity.signature(research_data)
+        if sig is None:
+            db.execute("DELETE FROM run_minhash WHERE run_id = ?", (run_id,))
+            return
+        db.execute("INSERT OR REPLACE INTO run_minhash (run_id, signature) VALUES (?, ?)",
+                   (run_id, similarity.to_bytes(sig)))
+        db.executemany("INSERT INTO run_lsh (band, bucket, run_id) VALUES (?, ?, ?)",
+                       [(band, bucket, run_id) for band, bucket in similarity.band_buckets(sig)])
+
+    @staticmethod
+    def _body(row) -> dict:
+        return json.loads(_decompress(row["codec"], row["body"]))
+
+    @staticmethod
+    def _index(db, run_id: int, fields: tuple) -> None:
+        db.execute("INSERT INTO runs_search (rowid, company, research, hypothesis, sequences) VALUES (?, ?, ?, ?, ?)",
+                   (run_id, *fields))
+
+    @staticmethod
+    def _unindex(db, run_id: int, fields: tuple) -> None:
+        db.execute("INSERT INTO runs_search (runs_search, rowid, company, research, hypothesis, sequences) "
+                   "VALUES ('delete', ?, ?, ?, ?, ?)", (run_id, *fields))
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _tx(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def save(self, research_data: dict, prospect_info: dict, hypothesis: str, sequences: dict,
+             ae_handoff: str = None, personas: list = None, kb_version: str = "", provider: str = "") -> int:
+        """Record a run. sequences maps lane id -> {"name", "content"}; lanes already saved for the same research
+        and hypothesis are kept unless replaced. Returns the run id."""
+        key = run_key(research_data, hypothesis)
+        now = time.time()
+        with self._tx() as db:
+            row = db.execute("SELECT run_id, company, codec, body FROM runs WHERE run_key = ?", (key,)).fetchone()
+            previous = self._body(row) if row else {}
+            merged = dict(previous.get("sequences") or {})
+            merged.update({lane_id: {"name": seq["name"], "content": seq["content"]}
+                           for lane_id, seq in (sequences or {}).items()})
+            body = {
+                "research_data": research_data,
+                "prospect_info": prospect_info or {},
+                "hypothesis": hypothesis,
+                "personas": personas if personas is not None else previous.get("personas", []),
+                "sequences": merged,
+                "ae_handoff": ae_handoff or previous.get("ae_handoff"),
+            }
+            codec, blob = _compress(json.dumps(body, ensure_ascii=False).encode("utf-8"))
+            lanes = json.dumps([seq["name"] for seq in merged.values()])
+            company = company_name(research_data, prospect_info)
+            if row is None:
+                run_id = db.execute(
+                    "INSERT INTO runs (run_key, company, kb_version, provider, lanes, codec, body, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, company, kb_version, provider, lanes, codec, blob, now, now),
+                ).lastrowid
+            else:
+                run_id = row["run_id"]
+                db.execute("UPDATE runs SET company = ?, kb_version = ?, provider = ?, lanes = ?, codec = ?, body = ?, "
+                           "updated_at = ? WHERE run_id = ?",
+                           (company, kb_version, provider, lanes, codec, blob, now, run_id))
+            db.executemany("INSERT OR REPLACE INTO run_lanes (run_id, lane_id, lane_name) VALUES (?, ?, ?)",
+                           [(run_id, lane_id, seq["name"]) for lane_id, seq in merged.items()])
+            if self.search_available:
+                if row is not None:
+                    self._unindex(db, run_id, _search_fields(row["company"], previous))
+                self._index(db, run_id, _search_fields(company, body))
+            if row is None:  # same run key = same research, already signed
+                self._sign(db, run_id, research_data)
+        return run_id
+
+    def runs(self, company: str = "", lane: str = "", kb_version: str = "", since: float = None,
+             limit: int = 50) -> list:
+        """Newest first: [{run_id, company, kb_version, provider, lanes, created_at, updated_at}]. company matches
+        a substring (case-insensitive); lane is a lane name."""
+        where, params = self._filters(company, lane, kb_version, since)
+        rows = self._conn().execute(
+            f"SELECT {_RUN_COLUMNS} FROM runs r WHERE {where} ORDER BY r.updated_at DESC LIMIT ?", (*params, limit),
+        ).fetchall()
+        return [_summary(row) for row in rows]
+
+    def search(self, query: str, company: str = "", lane: str = "", kb_version: str = "", since: float = None,
+               limit: int = 20) -> list:
+        """Best matches first, like runs() plus "excerpt" (where the query matched). Filters as in runs()."""
+        if not self.search_available:
+            raise HistoryError("Full-text search needs SQLite with FTS5")
+        match = search_query(query)
+        if not match:
+            return []
+        where, params = self._filters(company, lane, kb_version, since)
+        try:
+            rows = self._conn().execute(
+                f"SELECT {_RUN_COLUMNS}, r.codec, r.body FROM runs_search s JOIN runs r ON r.run_id = s.rowid "
+                f"WHERE runs_search MATCH ? AND {where} ORDER BY bm25(runs_search) LIMIT ?",
+                (match, *params, limit),
+            ).fetchall()
+        except sqlite3.OperationalError as e:
+            raise HistoryError(f"Couldn't search for {query!r}: {e}") from e
+        results = []
+        for row in rows:
+            body = self._body(row)
+            text = next((t for t in (body.get("hypothesis") or "", *(s["content"] for s in body["sequences"].values()),
+                                     *(str(v) for v in body["research_data"].values())) if excerpt(t, query)), "")
+            results.append({**_summary(row), "excerpt": excerpt(text, query)})
+        return results
+
+    def similar(self, research_data: dict, k: int = 3, min_similarity: float = 0.3, kb_version: str = "",
+                exclude_run_id: int = None) -> list:
+        """Saved runs whose research most resembles this research, best first: runs() entries plus "similarity"
+        (estimated Jaccard of word 3-grams, 0-1) and "hypothesis"."""
+        sig = similarity.signature(research_data)
+        if sig is None:
+            return []
+        buckets = similarity.band_buckets(sig)
+        where = " OR ".join("(l.band = ? AND l.bucket = ?)" for _ in buckets)
+        params = [value for pair in buckets for value in pair]
+        sql = (f"SELECT DISTINCT m.run_id, m.signature FROM run_lsh l JOIN run_minhash m ON m.run_id = l.run_id "
+               f"WHERE ({where})")
+        if exclude_run_id is not None:
+            sql += " AND m.run_id != ?"
+            params.append(exclude_run_id)
+        scored = [(similarity.similarity(sig, similarity.from_bytes(row["signature"])), row["run_id"])
+                  for row in self._conn().execute(sql, params).fetchall()]
+        scored = sorted((item for item in scored if item[0] >= min_similarity), reverse=True)
+
+        results = []
+        for score, run_id in scored:
+            sql = f"SELECT {_RUN_COLUMNS}, r.codec, r.body FROM runs r WHERE r.run_id = ?"
+            row = self._conn().execute(sql + (" AND r.kb_version = ?" if kb_version else ""),
+                                       (run_id, kb_version) if kb_version else (run_id,)).fetchone()
+            if row is None:
+                continue
+            results.append({**_summary(row), "similarity": round(score, 3), "hypothesis": self._body(row)["hypothesis"]})
+            if len(results) >= k:
+                break
+        return results
+
+    @staticmethod
+    def _filters(company: str = "", lane: str = "", kb_version: str = "", since: float = None):
+        where, params = ["1 = 1"], []
+        if company:
+            where.append("r.company LIKE ? COLLATE NOCASE")
+            params.append(f"%{company}%")
+        if lane:
+            where.append("r.run_id IN (SELECT run_id FROM run_lanes WHERE lane_name = ?)")
+            params.append(lane)
+        if kb_version:
+            where.append("r.kb_version = ?")
+            params.append(kb_version)
+        if since is not None:
+            where.append("r.updated_at >= ?")
+            params.append(since)
+        return " AND ".join(where), params
+
+    def load(self, run_id: int):
+        """The run body ({research_data, prospect_info, hypothesis, personas, sequences, ae_handoff}) or None."""
+        row = self._conn().execute("SELECT codec, body FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return self._body(row) if row else None
+
+    def delete(self, run_id: int) -> None:
+        with self._tx() as db:
+            row = db.execute("SELECT company, codec, body FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if row is None:
+                return
+            if self.search_available:
+                self._unindex(db, run_id, _search_fields(row["company"], self._body(row)))
+            db.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+
+    def lane_names(self) -> list:
+        return [row["lane_name"] for row in
+                self._conn().execute("SELECT DISTINCT lane_name FROM run_lanes ORDER BY lane_name").fetchall()]
+
+    def kb_versions(self) -> list:
+        return [row["kb_version"] for row in
+                self._conn().execute("SELECT DISTINCT kb_version FROM runs ORDER BY kb_version").fetchall()]
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM runs").fetchone()[0]
@@ -0,0 +1,343 @@
+"""
+Durable job store for batch runs.
+One SQLite file holds the account queue and every completed stage output (hypothesis,
+per-lane sequence, per-lane CSV rows, AE handoff), keyed by the stage graph's node keys
+(see graph.py). Stages are checkpointed as soon as they finish, so a run killed halfway
+resumes where it stopped without paying for the same call twice, and an account whose
+inputs changed reruns only the stages those inputs reach.
+
+Claims are taken inside one write transaction (BEGIN IMMEDIATE), so several workers
+(threads or processes) can share a store without two of them running the same account. A claim is a lease:
+workers renew it on every checkpoint, and a claim older than lease_seconds (a crashed
+or suspended run) can be taken over. Claims name their owner as host:pid:token, so a rerun
+on the same host takes over at once from a run that crashed or was killed, instead of
+waiting out the lease. An interrupted run releases its claims (release()).
+
+The same file can back the shared worker (worker.py): frontends queue single stage calls
+in the calls table and read results from it and from the memo.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+CANCELLED = "cancelled"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    account_id  TEXT PRIMARY KEY,
+    payload     TEXT NOT NULL,
+    status      TEXT NOT NULL DEFAULT 'pending',
+    claimed_by  TEXT,
+    claimed_at  REAL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    error       TEXT NOT NULL DEFAULT '',
+    summary     TEXT,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, claimed_at);
+CREATE TABLE IF NOT EXISTS bulk_batches (
+    batch_id    TEXT PRIMARY KEY,
+    phase       TEXT NOT NULL,
+    requests    TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS calls (
+    call_id     INTEGER PRIMARY KEY AUTOINCREMENT,
+    node_key    TEXT NOT NULL,
+    stage       TEXT NOT NULL,
+    request     TEXT NOT NULL,
+    status      TEXT NOT NULL DEFAULT 'pending',
+    claimed_by  TEXT,
+    claimed_at  REAL,
+    output      TEXT,
+    error       TEXT NOT NULL DEFAULT '',
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS calls_status ON calls (status, claimed_at);
+CREATE TABLE IF NOT EXISTS memo (
+    node_key    TEXT PRIMARY KEY,
+    stage       TEXT NOT NULL,
+    output      TEXT NOT NULL,
+    created_at  REAL NOT NULL
+);
+"""
+
+_HOST = socket.gethostname()
+_open_stores = weakref.WeakValueDictionary()  # owner -> JobStore, for the stores of this process
+
+
+def owner_alive(owner: str) -> bool:
+    """False only when the process that claimed a job is provably gone: same host and its pid has exited,
+    or this process and the store that claimed it was closed. Anything else counts as alive (the lease decides)."""
+    try:
+        host, pid, _ = (owner or "").rsplit(":", 2)
+        pid = int(pid)
+    except ValueError:
+        return True
+    if host != _HOST or os.name == "nt":
+        return True
+    if pid == os.getpid():
+        return owner in _open_stores
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+class JobStore:
+    """SQLite-backed queue of accounts plus their per-stage checkpoints."""
+
+    def __init__(self, path, lease_seconds: float = 600.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.owner = f"{_HOST}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+        _open_stores[self.owner] = self
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _tx(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    # Queue
+
+    def enqueue(self, account_id: str, payload: dict, retry_failed: bool = True) -> None:
+        """Add an account. Failed jobs go back to pending when retry_failed; a job whose inputs changed goes back
+        to pending even when done (its unchanged stages are still served from the memo)."""
+        now = time.time()
+        encoded = json.dumps(payload, sort_keys=True)
+        with self._tx() as db:
+            row = db.execute("SELECT payload, status FROM jobs WHERE account_id = ?", (account_id,)).fetchone()
+            if row is None:
+                db.execute(
+                    "INSERT INTO jobs (account_id, payload, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                    (account_id, encoded, now, now),
+                )
+            elif row["payload"] != encoded and row["status"] != RUNNING:
+                db.execute("UPDATE jobs SET payload = ?, status = ?, error = '', summary = NULL, updated_at = ? "
+                           "WHERE account_id = ?", (encoded, PENDING, now, account_id))
+            elif retry_failed and row["status"] == FAILED:
+                db.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE account_id = ?",
+                           (PENDING, now, account_id))
+
+    def claim(self, account_id: str = None, worker: str = None):
+        """Claim one pending, lease-expired or orphaned (owner gone) job, optionally a specific one.
+        Returns (account_id, payload) or None."""
+        worker = worker or self.owner
+        now = time.time()
+        stale = now - self.lease_seconds
+        with self._tx() as db:
+            query = "SELECT account_id, payload FROM jobs WHERE (status = ? OR (status = ? AND claimed_at < ?))"
+            params = [PENDING, RUNNING, stale]
+            if account_id is not None:
+                query += " AND account_id = ?"
+                params.append(account_id)
+            row = db.execute(query + " ORDER BY created_at, account_id LIMIT 1", params).fetchone()
+            if row is None:
+                row = self._orphaned(db, account_id)
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE jobs SET status = ?, claimed_by = ?, claimed_at = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE account_id = ?",
+                (RUNNING, worker, now, now, row["account_id"]),
+            )
+        return row["account_id"], json.loads(row["payload"])
+
+    @staticmethod
+    def _orphaned(db, account_id: str = None):
+        """The first running job whose owner is gone (see owner_alive)."""
+        query = "SELECT account_id, payload, claimed_by FROM jobs WHERE status = ?"
+        params = [RUNNING]
+        if account_id is not None:
+            query += " AND account_id = ?"
+            params.append(account_id)
+        for row in db.execute(query + " ORDER BY created_at, account_id", params).fetchall():
+            if not owner_alive(row["claimed_by"]):
+                return row
+        return None
+
+    def finish(self, account_id: str, summary: dict, worker: str = None) -> bool:
+        return self._close(account_id, DONE, "", summary, worker)
+
+    def fail(self, account_id: str, error: str, summary: dict = None, worker: str = None) -> bool:
+        return self._close(account_id, FAILED, error, summary, worker)
+
+    def _close(self, account_id: str, status: str, error: str, summary: dict, worker: str = None) -> bool:
+        """Record the outcome if worker still holds the claim (False when it lost it to a takeover or release)."""
+        now = time.time()
+        with self._tx() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET status = ?, error = ?, summary = ?, claimed_by = NULL, updated_at = ? "
+                "WHERE account_id = ? AND status = ? AND claimed_by = ?",
+                (status, error, json.dumps(summary) if summary is not None else None, now, account_id,
+                 RUNNING, worker or self.owner),
+            )
+        return cursor.rowcount > 0
+
+    def release(self, worker: str = None) -> int:
+        """Put every job this owner is running back to pending (an interrupted run). Returns how many."""
+        with self._tx() as db:
+            cursor = db.execute("UPDATE jobs SET status = ?, claimed_by = NULL, claimed_at = NULL, updated_at = ? "
+                                "WHERE status = ? AND claimed_by = ?", (PENDING, time.time(), RUNNING, worker or self.owner))
+        return cursor.rowcount
+
+    def counts(self) -> dict:
+        rows = self._conn().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def jobs(self, status: str = None) -> list:
+        query = "SELECT account_id, status, attempts, error, summary FROM jobs"
+        params = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (status,)
+        rows = self._conn().execute(query + " ORDER BY created_at, account_id", params).fetchall()
+        return [self._job_dict(r) for r in rows]
+
+    def job(self, account_id: str):
+        row = self._conn().execute(
+            "SELECT account_id, status, attempts, error, summary FROM jobs WHERE account_id = ?", (account_id,)
+        ).fetchone()
+        return self._job_dict(row) if row else None
+
+    @staticmethod
+    def _job_dict(row) -> dict:
+        return {"account_id": row["account_id"], "status": row["status"], "attempts": row["attempts"],
+                "error": row["error"], "summary": json.loads(row["summary"]) if row["summary"] else None}
+
+    def touch(self, account_id: str, worker: str = None) -> None:
+        """Renew the claim on a running job (workers call this after each stage)."""
+        with self._tx() as db:
+            db.execute("UPDATE jobs SET claimed_at = ? WHERE account_id = ? AND claimed_by = ? AND status = ?",
+                       (time.time(), account_id, worker or self.owner, RUNNING))
+
+    # Stage memo (the StageGraph memo interface)
+
+    def get(self, node_key: str):
+        """Stored output for a node, or None if it has not completed."""
+        row = self._conn().execute("SELECT output FROM memo WHERE node_key = ?", (node_key,)).fetchone()
+        return row["output"] if row else None
+
+    def put(self, node_key: str, output: str, stage: str = "") -> None:
+        with self._tx() as db:
+            db.execute("INSERT OR REPLACE INTO memo (node_key, stage, output, created_at) VALUES (?, ?, ?, ?)",
+                       (node_key, stage, output, time.time()))
+
+    # Shared worker calls (worker.py): one provider-backed stage each
+
+    def submit_call(self, node_key: str, stage: str, request: dict) -> int:
+        now = time.time()
+        with self._tx() as db:
+            cursor = db.execute(
+                "INSERT INTO calls (node_key, stage, request, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (node_key, stage, json.dumps(request), now, now),
+            )
+        return cursor.lastrowid
+
+    def claim_call(self, worker: str = None):
+        """Claim the oldest pending (or lease-expired) call. Returns {call_id, node_key, stage, request} or None."""
+        now = time.time()
+        with self._tx() as db:
+            row = db.execute(
+                "SELECT call_id, node_key, stage, request FROM calls WHERE status = ? OR (status = ? AND claimed_at < ?) "
+                "ORDER BY call_id LIMIT 1", (PENDING, RUNNING, now - self.lease_seconds),
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE calls SET status = ?, claimed_by = ?, claimed_at = ?, updated_at = ? WHERE call_id = ?",
+                       (RUNNING, worker or self.owner, now, now, row["call_id"]))
+        return {"call_id": row["call_id"], "node_key": row["node_key"], "stage": row["stage"],
+                "request": json.loads(row["request"])}
+
+    def finish_call(self, call_id: int, output: str) -> None:
+        self._close_call(call_id, DONE, output, "")
+
+    def fail_call(self, call_id: int, error: str) -> None:
+        self._close_call(call_id, FAILED, None, error)
+
+    def cancel_call(self, call_id: int) -> None:
+        """Withdraw a call nobody is waiting for. A worker already running it finishes, but its result isn't used."""
+        with self._tx() as db:
+            db.execute("UPDATE calls SET status = ?, updated_at = ? WHERE call_id = ? AND status IN (?, ?)",
+                       (CANCELLED, time.time(), call_id, PENDING, RUNNING))
+
+    def _close_call(self, call_id: int, status: str, output, error: str) -> None:
+        with self._tx() as db:
+            db.execute("UPDATE calls SET status = ?, output = ?, error = ?, updated_at = ? WHERE call_id = ? AND status = ?",
+                       (status, output, error, time.time(), call_id, RUNNING))
+
+    def call(self, call_id: int):
+        row = self._conn().execute("SELECT status, output, error FROM calls WHERE call_id = ?", (call_id,)).fetchone()
+        return {"status": row["status"], "output": row["output"], "error": row["error"]} if row else None
+
+    def call_counts(self) -> dict:
+        rows = self._conn().execute("SELECT status, COUNT(*) AS n FROM calls GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def prune_calls(self, older_than: float = 86400.0) -> None:
+        """Drop finished call rows (their memoized outputs stay)."""
+        with self._tx() as db:
+            db.execute("DELETE FROM calls WHERE status IN (?, ?, ?) AND updated_at < ?",
+                       (DONE, FAILED, CANCELLED, time.time() - older_than))
+
+    # Provider batches (bulk.py): recorded at submit so a restarted run polls instead of paying again
+
+    def add_bulk_batch(self, batch_id: str, phase: str, requests: dict) -> None:
+        """requests maps custom_id -> stage for every line in the submitted file."""
+        now = time.time()
+        with self._tx() as db:
+            db.execute("INSERT OR REPLACE INTO bulk_batches (batch_id, phase, requests, status, created_at, updated_at) "
+                       "VALUES (?, ?, ?, ?, ?, ?)", (batch_id, phase, json.dumps(requests), "submitted", now, now))
+
+    def open_bulk_batches(self) -> list:
+        rows = self._conn().execute(
+            "SELECT batch_id, phase, requests FROM bulk_batches WHERE status = 'submitted' ORDER BY created_at"
+        ).fetchall()
+        return [{"batch_id": r["batch_id"], "phase": r["phase"], "requests": json.loads(r["requests"])} for r in rows]
+
+    def close_bulk_batch(self, batch_id: str, status: str) -> None:
+        with self._tx() as db:
+            db.execute("UPDATE bulk_batches SET status = ?, updated_at = ? WHERE batch_id = ?",
+                       (status, time.time(), batch_id))
+
+    def close(self) -> None:
+        _open_stores.pop(self.owner, None)
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
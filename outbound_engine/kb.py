@@ -0,0 +1,136 @@
+"""
+Knowledge base and template loading.
+Reads prompts/, templates/ and kb/ from the project directory (or another root).
+File contents and parsed persona lanes are cached per process and reread only when a
+file's mtime or size changes, so warm_up() (warmup.py) can load them once at boot.
+"""
+
+import hashlib
+import re
+import threading
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+KB_FILES = {
+    "cursor_encyclopedia": "kb/cursor_encyclopedia.md",
+    "voice": "kb/voice.md",
+    "offers": "kb/offers.md",
+    "sequence_patterns": "kb/sequence_patterns.md",
+    "personalization": "kb/personalization_playbook.md"
+}
+
+
+# Everything that can reach a prompt: KB files used by prompts.py plus every prompt/template file
+KB_VERSION_FILES = tuple(KB_FILES.values()) + ("kb/persona_lanes.md", "kb/reference_customers.md")
+KB_VERSION_DIRS = ("prompts", "templates")
+
+_version_cache = {}
+_version_lock = threading.Lock()
+_file_cache = {}  # path -> ((mtime_ns, size), text)
+_lanes_cache = {}  # persona_lanes.md text -> parsed lanes
+_file_lock = threading.Lock()
+
+
+def load_file(filepath: str, root: Path = None) -> str:
+    """Load a file from the project directory ("" if it doesn't exist)."""
+    file_path = Path(root or ROOT_DIR) / filepath
+    try:
+        stat = file_path.stat()
+    except OSError:
+        return ""
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _file_lock:
+        cached = _file_cache.get(file_path)
+    if cached and cached[0] == signature:
+        return cached[1]
+    text = file_path.read_text()
+    with _file_lock:
+        _file_cache[file_path] = (signature, text)
+    return text
+
+
+def load_kb_files(root: Path = None) -> dict:
+    """Load knowledge base files if they exist."""
+    kb_content = {}
+    for key, filepath in KB_FILES.items():
+        content = load_file(filepath, root)
+        if content:
+            kb_content[key] = content
+
+    return kb_content
+
+
+def parse_persona_lanes(content: str) -> list:
+    """Parse kb/persona_lanes.md text. Returns list of dicts with id, name, example_titles, hook, cursor_play, peer_pivot (optional)."""
+    if not content:
+        return []
+    lanes = []
+    # Split by ## N. (e.g. ## 1. Big Picture Leaders)
+    blocks = re.split(r"\n##\s+(\d+)\.\s+", content)[1:]  # skip intro before first ##
+    for i in range(0, len(blocks), 2):
+        if i + 1 >= len(blocks):
+            break
+        num, rest = blocks[i], blocks[i + 1]
+        name_line = rest.split("\n")[0].strip()
+        name = name_line.split("**")[0].strip() or name_line
+        text = rest
+
+        def _extract(label: str) -> str:
+            # The colon may sit inside the bold ("**Hook:**") or after it ("**Hook**:")
+            m = re.search(r"\*\*" + re.escape(label) + r":?\*\*[:\s]*(.*?)(?=\n\*\*|\n---|\Z)", text, re.DOTALL)
+            return m.group(1).strip() if m else ""
+
+        lanes.append({
+            "id": num,
+            "name": name,
+            "example_titles": _extract("Example titles"),
+            "hook": _extract("Hook"),
+            "cursor_play": _extract("Cursor play"),
+            "peer_pivot": _extract("Peer pivot") or ""
+        })
+    return lanes
+
+
+def load_persona_lanes(root: Path = None) -> list:
+    """Load and parse persona lanes from kb/persona_lanes.md (fresh dicts; parsed once per file version)."""
+    content = load_file("kb/persona_lanes.md", root)
+    with _file_lock:
+        lanes = _lanes_cache.get(content)
+    if lanes is None:
+        lanes = parse_persona_lanes(content)
+        with _file_lock:
+            if len(_lanes_cache) > 8:
+                _lanes_cache.clear()
+            _lanes_cache[content] = lanes
+    return [dict(lane) for lane in lanes]
+
+
+def kb_version(root: Path = None) -> str:
+    """Short content hash of every KB, prompt and template file. Recomputed only when a file's mtime or size changes."""
+    root = Path(root or ROOT_DIR)
+    paths = [root / rel for rel in KB_VERSION_FILES]
+    for folder in KB_VERSION_DIRS:
+        paths.extend(sorted((root / folder).glob("*.md")))
+    signature = []
+    for path in paths:
+        try:
+            stat = path.stat()
+            signature.append((path.relative_to(root).as_posix(), stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append((path.relative_to(root).as_posix(), None, None))
+    signature = tuple(signature)
+
+    with _version_lock:
+        cached = _version_cache.get(root)
+        if cached and cached[0] == signature:
+            return cached[1]
+    digest = hashlib.sha256()
+    for rel, mtime, _ in signature:
+        digest.update(rel.encode("utf-8"))
+        if mtime is not None:
+            digest.update((root / rel).read_bytes())
+    version = digest.hexdigest()[:16]
+    with _version_lock:
+        _version_cache[root] = (signature, version)
+    return version
@@ -0,0 +1,242 @@
+"""
+Local stand-in for the OpenAI Files + Batch API.
+An in-memory server on 127.0.0.1 that speaks the subset bulk.py uses (upload a JSONL
+file, create a batch, poll it, download the output file), plus non-streaming chat
+completions for the live follow-up run, so bulk runs can be exercised without network
+access or spend. Each batch completes after `polls_to_complete` polls; responses come
+from `responder(body) -> str` (raise to produce an error line, or a 500 for a live call).
+
+    with MockBatchServer() as server:
+        client = OpenAI(api_key="test", base_url=server.base_url)
+        run_bulk(accounts, config, store, client=client)
+
+Or run standalone: python -m outbound_engine.openai_batch_mock [port]
+"""
+
+import email.parser
+import email.policy
+import hashlib
+import itertools
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+API_PREFIX = "/v1"
+
+
+def default_responder(body: dict) -> str:
+    """Deterministic stand-in completion: names the request so outputs are traceable."""
+    prompt = body["messages"][-1]["content"]
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+    return f"[batch mock {body.get('model', '')}] response {digest}"
+
+
+class _Store:
+    def __init__(self, responder, polls_to_complete: int):
+        self.lock = threading.Lock()
+        self.files = {}
+        self.batches = {}
+        self.polls = {}
+        self.ids = itertools.count(1)
+        self.responder = responder
+        self.polls_to_complete = polls_to_complete
+        self.live_calls = 0
+
+    def new_id(self, prefix: str) -> str:
+        return f"{prefix}-mock{next(self.ids)}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def store(self) -> _Store:
+        return self.server.store
+
+    def _send(self, status: int, doc=None, raw: bytes = None) -> None:
+        body = raw if raw is not None else json.dumps(doc).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream" if raw is not None else "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _segments(self) -> list:
+        path = urlsplit(self.path).path
+        path = path[len(API_PREFIX):] if path.startswith(API_PREFIX) else path
+        return [s for s in path.split("/") if s]
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _authorized(self) -> bool:
+        if not (self.headers.get("Authorization") or "").startswith("Bearer "):
+            self._send(401, {"error": {"message": "Missing API key"}})
+            return False
+        return True
+
+    def _file_doc(self, file_id: str) -> dict:
+        f = self.store.files[file_id]
+        return {"id": file_id, "object": "file", "bytes": len(f["content"]), "created_at": f["created_at"],
+                "filename": f["filename"], "purpose": f["purpose"], "status": "processed"}
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        segments = self._segments()
+        if segments == ["files"]:
+            return self._upload()
+        if segments == ["batches"]:
+            return self._create_batch()
+        if segments == ["chat", "completions"]:
+            return self._chat()
+        self._send(404, {"error": {"message": "Not found"}})
+
+    def _chat(self):
+        body = json.loads(self._body() or b"{}")
+        with self.store.lock:
+            self.store.live_calls += 1
+        try:
+            text = self.store.responder(body)
+        except Exception as e:
+            return self._send(500, {"error": {"message": str(e), "type": "server_error"}})
+        self._send(200, {
+            "id": "chatcmpl-live", "object": "chat.completion", "created": int(time.time()), "model": body.get("model"),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+    def _upload(self):
+        raw = b"Content-Type: " + self.headers["Content-Type"].encode() + b"\r\n\r\n" + self._body()
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(raw)
+        fields = {}
+        for part in message.iter_parts():
+            fields[part.get_param("name", header="content-disposition")] = (
+                part.get_filename(), part.get_payload(decode=True))
+        filename, content = fields.get("file", ("batch.jsonl", b""))
+        purpose = (fields.get("purpose", (None, b"batch"))[1] or b"batch").decode()
+        with self.store.lock:
+            file_id = self.store.new_id("file")
+            self.store.files[file_id] = {"filename": filename or "batch.jsonl", "purpose": purpose,
+                                         "content": content, "created_at": int(time.time())}
+            doc = self._file_doc(file_id)
+        self._send(200, doc)
+
+    def _create_batch(self):
+        payload = json.loads(self._body() or b"{}")
+        input_file_id = payload.get("input_file_id")
+        if input_file_id not in self.store.files:
+            return self._send(400, {"error": {"message": f"No such file: {input_file_id}"}})
+        with self.store.lock:
+            batch_id = self.store.new_id("batch")
+            self.store.batches[batch_id] = {
+                "id": batch_id, "object": "batch", "endpoint": payload.get("endpoint", "/v1/chat/completions"),
+                "input_file_id": input_file_id, "completion_window": payload.get("completion_window", "24h"),
+                "status": "validating", "created_at": int(time.time()), "output_file_id": None,
+                "error_file_id": None, "metadata": payload.get("metadata"),
+                "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            }
+            self.store.polls[batch_id] = 0
+            doc = dict(self.store.batches[batch_id])
+        self._send(200, doc)
+
+    def _complete(self, batch: dict) -> None:
+        """Run every request in the batch's input file through the responder (caller holds the lock)."""
+        lines = self.store.files[batch["input_file_id"]]["content"].decode("utf-8").splitlines()
+        out, errors = [], []
+        for i, line in enumerate(l for l in lines if l.strip()):
+            request = json.loads(line)
+            custom_id = request.get("custom_id")
+            try:
+                text = self.store.responder(request["body"])
+            except Exception as e:
+                errors.append({"id": f"batch_req_{i}", "custom_id": custom_id, "response": None,
+                               "error": {"code": "server_error", "message": str(e)}})
+                continue
+            out.append({
+                "id": f"batch_req_{i}", "custom_id": custom_id, "error": None,
+                "response": {"status_code": 200, "request_id": f"req_{i}", "body": {
+                    "id": f"chatcmpl-mock{i}", "object": "chat.completion", "model": request["body"].get("model"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": text}}],
+                }},
+            })
+        for key, rows in (("output_file_id", out), ("error_file_id", errors)):
+            if rows:
+                file_id = self.store.new_id("file")
+                content = "".join(json.dumps(r) + "\n" for r in rows).encode("utf-8")
+                self.store.files[file_id] = {"filename": f"{batch['id']}_{key}.jsonl", "purpose": "batch_output",
+                                             "content": content, "created_at": int(time.time())}
+                batch[key] = file_id
+        batch["request_counts"] = {"total": len(out) + len(errors), "completed": len(out), "failed": len(errors)}
+        batch["status"] = "completed"
+        batch["completed_at"] = int(time.time())
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        segments = self._segments()
+        with self.store.lock:
+            if len(segments) == 2 and segments[0] == "batches" and segments[1] in self.store.batches:
+                batch = self.store.batches[segments[1]]
+                self.store.polls[batch["id"]] += 1
+                if batch["status"] != "completed":
+                    if self.store.polls[batch["id"]] >= self.store.polls_to_complete:
+                        self._complete(batch)
+                    else:
+                        batch["status"] = "in_progress"
+                return self._send(200, dict(batch))
+            if len(segments) == 2 and segments[0] == "files" and segments[1] in self.store.files:
+                return self._send(200, self._file_doc(segments[1]))
+            if len(segments) == 3 and segments[0] == "files" and segments[2] == "content" and segments[1] in self.store.files:
+                return self._send(200, raw=self.store.files[segments[1]]["content"])
+        self._send(404, {"error": {"message": "Not found"}})
+
+
+class MockBatchServer:
+    """Threaded in-memory OpenAI batch stand-in. Use as a context manager; base_url points at it."""
+
+    def __init__(self, port: int = 0, responder=None, polls_to_complete: int = 2):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.store = _Store(responder or default_responder, polls_to_complete)
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    @property
+    def store(self) -> _Store:
+        return self.httpd.store
+
+    def start(self) -> "MockBatchServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    server = MockBatchServer(int(sys.argv[1]) if len(sys.argv) > 1 else 8766)
+    print(f"Mock OpenAI Batch API at {server.base_url} (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
@@ -0,0 +1,361 @@
+"""
+Outreach.io sync.
+Upserts prospects and sequence steps straight to the Outreach API (JSON:API, v2) instead of
+download-CSV-then-upload. Uses pooled keep-alive connections, batched lookups, a bounded worker
+pool and idempotency keys so a retried push never creates duplicates.
+"""
+
+import hashlib
+import http.client
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+DEFAULT_BASE_URL = "https://api.outreach.io/api/v2"
+
+# CSV step_type -> Outreach sequenceStep stepType
+STEP_TYPES = {"Email": "auto_email", "Phone": "call", "LinkedIn": "task"}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class OutreachError(Exception):
+    """Raised when Outreach returns a non-retryable error or retries are exhausted."""
+
+    def __init__(self, message: str, status: int = 0, body: str = ""):
+        super().__init__(message)
+        self.status = status
+        self.body = body
+
+
+@dataclass
+class OutreachConfig:
+    """Connection and batching settings for the Outreach push."""
+    access_token: str
+    base_url: str = DEFAULT_BASE_URL
+    batch_size: int = 25
+    max_concurrency: int = 4
+    timeout: float = 30.0
+    max_retries: int = 3
+    backoff: float = 1.0
+
+    @classmethod
+    def from_env(cls) -> "OutreachConfig":
+        """Build from OUTREACH_ACCESS_TOKEN / OUTREACH_API_URL (the URL can point at the local mock)."""
+        return cls(
+            access_token=(os.getenv("OUTREACH_ACCESS_TOKEN") or "").strip(),
+            base_url=(os.getenv("OUTREACH_API_URL") or DEFAULT_BASE_URL).rstrip("/"),
+        )
+
+
+@dataclass
+class SyncResult:
+    """Counts from one push, plus per-row errors that did not abort the run."""
+    sequence_id: str = ""
+    created: dict = field(default_factory=dict)
+    updated: dict = field(default_factory=dict)
+    skipped: int = 0
+    errors: list = field(default_factory=list)
+
+    def count(self, bucket: str, kind: str) -> None:
+        target = self.created if bucket == "created" else self.updated
+        target[kind] = target.get(kind, 0) + 1
+
+
+def idempotency_key(kind: str, *parts) -> str:
+    """Stable key for a create request: same inputs -> same key, so a retry is deduplicated server-side."""
+    digest = hashlib.sha256("\x1f".join([kind] + [str(p) for p in parts]).encode("utf-8")).hexdigest()
+    return f"{kind}-{digest[:32]}"
+
+
+class _ConnectionPool:
+    """Small keep-alive pool of http.client connections to one host."""
+
+    def __init__(self, base_url: str, size: int, timeout: float):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or "https"
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = queue.Queue()
+        for _ in range(max(1, size)):
+            self._slots.put(None)
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def acquire(self):
+        self._slots.get()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def release(self, conn, reusable: bool = True) -> None:
+        if reusable:
+            self._idle.put(conn)
+        else:
+            conn.close()
+        self._slots.put(None)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class OutreachClient:
+    """Minimal JSON:API client with pooled connections, retries and idempotency keys."""
+
+    def __init__(self, config: OutreachConfig):
+        if not config.access_token:
+            raise OutreachError("Outreach access token not configured")
+        self.config = config
+        self.pool = _ConnectionPool(config.base_url, config.max_concurrency, config.timeout)
+        self.requests_sent = 0
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def request(self, method: str, path: str, payload=None, params=None, key: str = "") -> dict:
+        url = self.pool.prefix + path + ("?" + urlencode(params) if params else "")
+        headers = {
+            "Authorization": f"Bearer {self.config.access_token}",
+            "Content-Type": "application/vnd.api+json",
+            "Accept": "application/vnd.api+json",
+        }
+        if key:
+            headers["Idempotency-Key"] = key
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        last_error = None
+        for attempt in range(self.config.max_retries + 1):
+            conn = self.pool.acquire()
+            reusable = False
+            try:
+                conn.request(method, url, body=body, headers=headers)
+                response = conn.getresponse()
+                raw = response.read().decode("utf-8", "replace")
+                reusable = not response.will_close
+                with self._lock:
+                    self.requests_sent += 1
+                if response.status < 300:
+                    return json.loads(raw) if raw else {}
+                last_error = OutreachError(f"Outreach {method} {path} failed: {response.status}", response.status, raw[:500])
+                if response.status not in RETRY_STATUSES:
+                    raise last_error
+                retry_after = response.getheader("Retry-After")
+                delay = float(retry_after) if retry_after and retry_after.replace(".", "", 1).isdigit() else self.config.backoff * (2 ** attempt)
+            except (OSError, http.client.HTTPException) as e:
+                last_error = OutreachError(f"Outreach {method} {path} connection error: {e}")
+                delay = self.config.backoff * (2 ** attempt)
+            finally:
+                self.pool.release(conn, reusable)
+            if attempt < self.config.max_retries:
+                time.sleep(delay)
+        raise last_error
+
+    def list_all(self, path: str, params: dict) -> list:
+        """GET every page of a collection (follows links.next)."""
+        items = []
+        params = dict(params, **{"page[size]": 100})
+        while True:
+            doc = self.request("GET", path, params=params)
+            items.extend(doc.get("data") or [])
+            next_link = (doc.get("links") or {}).get("next")
+            if not next_link:
+                return items
+            params = dict(parse_qsl(urlsplit(next_link).query))
+
+
+def _is_real_email(email: str) -> bool:
+    email = (email or "").strip()
+    return "@" in email and "[" not in email
+
+
+def _prospect_attributes(row: dict) -> dict:
+    return {
+        "emails": [row["email"].strip()],
+        "firstName": row.get("first_name") or "",
+        "lastName": row.get("last_name") or "",
+        "title": row.get("title") or "",
+        "company": row.get("company") or "",
+    }
+
+
+def _unique_steps(rows: list) -> list:
+    """One entry per step_number (rows repeat the steps for every prospect), in step order."""
+    steps = {}
+    for row in rows:
+        try:
+            number = int(row.get("step_number"))
+        except (TypeError, ValueError):
+            continue
+        steps.setdefault(number, row)
+    return [steps[n] for n in sorted(steps)]
+
+
+def _batches(items: list, size: int) -> list:
+    size = max(1, size)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _upsert_sequence(client: OutreachClient, name: str, result: SyncResult) -> str:
+    existing = client.list_all("/sequences", {"filter[name]": name})
+    if existing:
+        return existing[0]["id"]
+    doc = client.request(
+        "POST", "/sequences",
+        {"data": {"type": "sequence", "attributes": {"name": name, "sequenceType": "interval"}}},
+        key=idempotency_key("sequence", name),
+    )
+    result.count("created", "sequences")
+    return doc["data"]["id"]
+
+
+def _upsert_prospects(client: OutreachClient, rows: list, pool: ThreadPoolExecutor, result: SyncResult) -> None:
+    by_email = {}
+    for row in rows:
+        if _is_real_email(row.get("email")):
+            by_email.setdefault(row["email"].strip().lower(), row)
+        else:
+            result.skipped += 1
+
+    def _lookup(emails):
+        return client.list_all("/prospects", {"filter[emails]": ",".join(emails)})
+
+    found = {}
+    for page in pool.map(_lookup, _batches(sorted(by_email), client.config.batch_size)):
+        for item in page:
+            for email in item.get("attributes", {}).get("emails") or []:
+                found[email.lower()] = item["id"]
+
+    def _push(email):
+        attributes = _prospect_attributes(by_email[email])
+        if email in found:
+            client.request("PATCH", f"/prospects/{found[email]}", {"data": {"type": "prospect", "id": found[email], "attributes": attributes}})
+            return "updated"
+        client.request("POST", "/prospects", {"data": {"type": "prospect", "attributes": attributes}}, key=idempotency_key("prospect", email))
+        return "created"
+
+    _run_all(pool, _push, list(by_email), "prospects", result)
+
+
+def _step_templates(client: OutreachClient, step_ids: list) -> dict:
+    """sequenceStep id -> id of the template linked to it, for steps that have one (batched lookups)."""
+    linked = {}
+    for batch in _batches(step_ids, client.config.batch_size):
+        for item in client.list_all("/sequenceTemplates", {"filter[sequenceStep][id]": ",".join(batch)}):
+            relationships = item.get("relationships") or {}
+            step = ((relationships.get("sequenceStep") or {}).get("data") or {}).get("id")
+            template = ((relationships.get("template") or {}).get("data") or {}).get("id")
+            if step and template:
+                linked[str(step)] = str(template)
+    return linked
+
+
+def _upsert_template(client: OutreachClient, sequence_id: str, step_id: str, order: int, row: dict,
+                     template_id: str = None) -> None:
+    """Keep an email step's template in line with the row: update the linked one, or create and link it
+    (also repairs a step whose template failed on an earlier push)."""
+    subject, body = str(row.get("subject") or ""), str(row.get("body") or "")
+    attributes = {"name": f"{sequence_id} step {order}", "subject": subject, "bodyHtml": body.replace("\n", "<br>")}
+    if template_id:
+        try:
+            client.request("PATCH", f"/templates/{template_id}", {"data": {"type": "template", "id": template_id, "attributes": attributes}})
+            return
+        except OutreachError as e:
+            if e.status != 404:
+                raise
+    template = client.request(
+        "POST", "/templates", {"data": {"type": "template", "attributes": attributes}},
+        key=idempotency_key("template", sequence_id, order, subject, body),
+    )
+    client.request(
+        "POST", "/sequenceTemplates",
+        {"data": {"type": "sequenceTemplate", "relationships": {
+            "sequenceStep": {"data": {"type": "sequenceStep", "id": step_id}},
+            "template": {"data": {"type": "template", "id": template["data"]["id"]}},
+        }}},
+        key=idempotency_key("sequenceTemplate", step_id, template["data"]["id"]),
+    )
+
+
+def _upsert_steps(client: OutreachClient, sequence_id: str, rows: list, pool: ThreadPoolExecutor, result: SyncResult) -> None:
+    existing = {
+        item["attributes"].get("order"): item["id"]
+        for item in client.list_all("/sequenceSteps", {"filter[sequence][id]": sequence_id})
+    }
+    templates = _step_templates(client, sorted(existing.values())) if existing else {}
+    steps = _unique_steps(rows)
+    prev_day = 1
+    planned = []
+    for row in steps:
+        day = int(row.get("step_day") or prev_day)
+        planned.append((row, max(0, day - prev_day) * 24 * 60))
+        prev_day = day
+
+    def _push(item):
+        row, interval = item
+        order = int(row["step_number"])
+        attributes = {"order": order, "interval": interval, "stepType": STEP_TYPES.get(str(row.get("step_type")).strip(), "task")}
+        if order in existing:
+            step_id, outcome = existing[order], "updated"
+            client.request("PATCH", f"/sequenceSteps/{step_id}", {"data": {"type": "sequenceStep", "id": step_id, "attributes": attributes}})
+        else:
+            relationship = {"sequence": {"data": {"type": "sequence", "id": sequence_id}}}
+            doc = client.request(
+                "POST", "/sequenceSteps",
+                {"data": {"type": "sequenceStep", "attributes": attributes, "relationships": relationship}},
+                key=idempotency_key("sequenceStep", sequence_id, order),
+            )
+            step_id, outcome = doc["data"]["id"], "created"
+        if attributes["stepType"] == "auto_email":
+            _upsert_template(client, sequence_id, step_id, order, row, templates.get(str(step_id)))
+        return outcome
+
+    _run_all(pool, _push, planned, "sequenceSteps", result)
+
+
+def _run_all(pool: ThreadPoolExecutor, fn, items: list, kind: str, result: SyncResult) -> None:
+    futures = [pool.submit(fn, item) for item in items]
+    for future in futures:
+        try:
+            result.count(future.result(), kind)
+        except OutreachError as e:
+            result.errors.append(f"{kind}: {e}")
+
+
+def sync_to_outreach(rows: list, config: OutreachConfig, sequence_name: str = "", client: OutreachClient = None) -> SyncResult:
+    """Upsert the sequence, its steps and the prospects in CSV rows (parse_sequence_to_csv records) to Outreach."""
+    result = SyncResult()
+    if not rows:
+        return result
+    name = sequence_name or rows[0].get("sequence_name") or "Cursor Outbound"
+    own_client = client is None
+    client = client or OutreachClient(config)
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, config.max_concurrency)) as pool:
+            result.sequence_id = _upsert_sequence(client, name, result)
+            _upsert_steps(client, result.sequence_id, rows, pool, result)
+            _upsert_prospects(client, rows, pool, result)
+    finally:
+        if own_client:
+            client.close()
+    return result
@@ -0,0 +1,248 @@
+"""
+Local stand-in for the Outreach API.
+An in-memory JSON:API server on 127.0.0.1 that speaks the subset outreach.py uses
+(list with filters, create, update) and honors Idempotency-Key, so the push can be
+exercised without network access.
+
+    with MockOutreachServer() as server:
+        sync_to_outreach(rows, OutreachConfig(access_token="test", base_url=server.base_url))
+
+Or run standalone: python -m outbound_engine.outreach_mock [port]
+"""
+
+import itertools
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+API_PREFIX = "/api/v2"
+
+
+class _Store:
+    """Resources by collection name, plus the Idempotency-Key -> response cache."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.resources = {}
+        self.idempotent = {}
+        self.ids = itertools.count(1)
+        self.requests = []
+        self.fail_after_write = 0
+        self.throttled = 0
+        self.retry_after = "1"
+        self.rejected_emails = set()
+        self.rejected_creates = {}  # collection -> POSTs left to answer 422
+
+    def take_throttle(self) -> bool:
+        with self.lock:
+            if self.throttled <= 0:
+                return False
+            self.throttled -= 1
+            return True
+
+    def take_rejected_create(self, collection: str) -> bool:
+        with self.lock:
+            if self.rejected_creates.get(collection, 0) <= 0:
+                return False
+            self.rejected_creates[collection] -= 1
+            return True
+
+    def rejects(self, collection: str, payload: dict) -> bool:
+        if collection != "prospects":
+            return False
+        emails = ((payload.get("data") or {}).get("attributes") or {}).get("emails") or []
+        return any(e.lower() in self.rejected_emails for e in emails)
+
+    def matches(self, item: dict, filters: dict) -> bool:
+        for path, wanted in filters.items():
+            values = set(v.strip().lower() for v in wanted.split(","))
+            if len(path) == 2 and path[1] == "id":
+                rel = (item.get("relationships") or {}).get(path[0]) or {}
+                actual = [str((rel.get("data") or {}).get("id", ""))]
+            else:
+                actual = item.get("attributes", {}).get(path[0])
+                actual = actual if isinstance(actual, list) else [actual]
+            if not values & {str(a).lower() for a in actual if a is not None}:
+                return False
+        return True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def store(self) -> _Store:
+        return self.server.store
+
+    def _send(self, status: int, doc=None) -> None:
+        body = json.dumps(doc).encode("utf-8") if doc is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/vnd.api+json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self):
+        parts = urlsplit(self.path)
+        path = parts.path[len(API_PREFIX):] if parts.path.startswith(API_PREFIX) else parts.path
+        segments = [s for s in path.split("/") if s]
+        collection = segments[0] if segments else ""
+        resource_id = segments[1] if len(segments) > 1 else None
+        return collection, resource_id, dict(parse_qsl(parts.query))
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _authorized(self) -> bool:
+        if not (self.headers.get("Authorization") or "").startswith("Bearer "):
+            self._send(401, {"errors": [{"title": "Unauthorized"}]})
+            return False
+        if self.store.take_throttle():
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))  # keep the connection reusable
+            self.send_response(429)
+            self.send_header("Retry-After", self.store.retry_after)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return False
+        return True
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        collection, resource_id, query = self._route()
+        self.store.requests.append(("GET", collection))
+        with self.store.lock:
+            items = list(self.store.resources.get(collection, {}).values())
+        if resource_id:
+            found = [i for i in items if i["id"] == resource_id]
+            return self._send(200, {"data": found[0]}) if found else self._send(404, {"errors": [{"title": "Not found"}]})
+        filters = {}
+        for key, value in query.items():
+            if key.startswith("filter["):
+                filters[tuple(k.rstrip("]") for k in key[len("filter["):].split("["))] = value
+        items = [i for i in items if self.store.matches(i, filters)]
+        size = int(query.get("page[size]", 50))
+        offset = int(query.get("page[offset]", 0))
+        doc = {"data": items[offset:offset + size], "links": {}}
+        if offset + size < len(items):
+            next_query = dict(query, **{"page[size]": size, "page[offset]": offset + size})
+            doc["links"]["next"] = f"{API_PREFIX}/{collection}?{urlencode(next_query)}"
+        self._send(200, doc)
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        collection, _, _ = self._route()
+        payload = self._read_json()
+        key = self.headers.get("Idempotency-Key") or ""
+        self.store.requests.append(("POST", collection))
+        if self.store.rejects(collection, payload):
+            return self._send(422, {"errors": [{"title": "Invalid email"}]})
+        if self.store.take_rejected_create(collection):
+            return self._send(422, {"errors": [{"title": "Unprocessable"}]})
+        with self.store.lock:
+            if key and key in self.store.idempotent:
+                doc = self.store.idempotent[key]
+            else:
+                data = payload.get("data") or {}
+                item = {
+                    "type": data.get("type", collection),
+                    "id": str(next(self.store.ids)),
+                    "attributes": data.get("attributes") or {},
+                    "relationships": data.get("relationships") or {},
+                }
+                self.store.resources.setdefault(collection, {})[item["id"]] = item
+                doc = {"data": item}
+                if key:
+                    self.store.idempotent[key] = doc
+            # Simulate a lost response after a successful write (the case idempotency keys exist for)
+            if self.store.fail_after_write > 0:
+                self.store.fail_after_write -= 1
+                return self._send(503, {"errors": [{"title": "Service Unavailable"}]})
+        self._send(201, doc)
+
+    def do_PATCH(self):
+        if not self._authorized():
+            return
+        collection, resource_id, _ = self._route()
+        payload = self._read_json()
+        self.store.requests.append(("PATCH", collection))
+        if self.store.rejects(collection, payload):
+            return self._send(422, {"errors": [{"title": "Invalid email"}]})
+        with self.store.lock:
+            item = self.store.resources.get(collection, {}).get(resource_id)
+            if item is not None:
+                item["attributes"].update((payload.get("data") or {}).get("attributes") or {})
+        if item is None:
+            return self._send(404, {"errors": [{"title": "Not found"}]})
+        self._send(200, {"data": item})
+
+
+class MockOutreachServer:
+    """Threaded in-memory Outreach stand-in. Use as a context manager; base_url points at it."""
+
+    def __init__(self, port: int = 0):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.store = _Store()
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    @property
+    def store(self) -> _Store:
+        return self.httpd.store
+
+    def resources(self, collection: str) -> list:
+        with self.store.lock:
+            return list(self.store.resources.get(collection, {}).values())
+
+    def fail_next_writes(self, n: int) -> None:
+        """Make the next n POSTs succeed server-side but answer 503, forcing client retries."""
+        self.store.fail_after_write = n
+
+    def throttle_next(self, n: int, retry_after: str = "1") -> None:
+        """Answer the next n requests with 429 and a Retry-After header (seconds)."""
+        self.store.retry_after = retry_after
+        self.store.throttled = n
+
+    def reject_emails(self, *emails) -> None:
+        """Answer 422 to any prospect create/update carrying one of these emails."""
+        self.store.rejected_emails.update(e.lower() for e in emails)
+
+    def reject_next_creates(self, collection: str, n: int = 1) -> None:
+        """Answer 422 to the next n POSTs to collection (nothing is stored)."""
+        self.store.rejected_creates[collection] = n
+
+    def start(self) -> "MockOutreachServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    server = MockOutreachServer(int(sys.argv[1]) if len(sys.argv) > 1 else 8765)
+    print(f"Mock Outreach API at {server.base_url} (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
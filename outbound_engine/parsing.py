@@ -0,0 +1,165 @@
+"""
+Parsing.
+Turns provider output into structured data: Outreach CSV rows and persona lists.
+
+pandas is imported on first CSV parse rather than with the module: it is the slowest
+import in the app and only CSV export needs it.
+"""
+
+import io
+import re
+import zipfile
+
+from outbound_engine.tracing import span
+from outbound_engine.validation import parse_steps
+
+
+class CsvParseError(Exception):
+    """The provider's CSV could not be parsed."""
+
+
+def _ignore(level: str, message: str):
+    pass
+
+
+def extract_personas_from_text(hypothesis: str) -> list:
+    """Text-based persona extraction (no API call). Empty list if nothing matched."""
+    out = []
+    if "VP" in hypothesis or "Director" in hypothesis:
+        out.append("VP/Director of Engineering")
+    if "Platform" in hypothesis or "DevEx" in hypothesis:
+        out.append("Platform/DevEx Engineering Lead")
+    if "CTO" in hypothesis:
+        out.append("CTO")
+    return out
+
+
+def csv_text_to_dataframe(csv_content: str, sequence: str, prospect_info: dict, notify=None) -> "pd.DataFrame":
+    """Clean and parse the provider's CSV text, check step coverage against the sequence, and add prospect columns.
+    Coverage problems go to notify("warning", message); unparseable CSV raises CsvParseError."""
+    with span("csv.parse", csv_chars=len(csv_content or "")) as current:
+        df = _csv_text_to_dataframe(csv_content, sequence, prospect_info, notify)
+        current.set(rows=len(df))
+        return df
+
+
+def _csv_text_to_dataframe(csv_content: str, sequence: str, prospect_info: dict, notify) -> "pd.DataFrame":
+    import pandas as pd
+
+    notify = notify or _ignore
+    # Remove any markdown code blocks
+    if csv_content.startswith("```"):
+        # Extract content from code block
+        lines = csv_content.split("\n")
+        # Find the first line that's not ``` or language identifier
+        start_idx = 1
+        if len(lines) > 1 and lines[1].strip() and not lines[1].strip().startswith("```"):
+            start_idx = 1
+        else:
+            start_idx = 2
+        # Find the last ```
+        end_idx = len(lines) - 1
+        for i in range(len(lines) - 1, -1, -1):
+            if lines[i].strip() == "```":
+                end_idx = i
+                break
+        csv_content = "\n".join(lines[start_idx:end_idx])
+    
+    # Clean up the CSV content
+    csv_content = csv_content.strip()
+    
+    # Remove any leading/trailing non-CSV content (explanations, etc.)
+    lines = csv_content.split("\n")
+    # Find the header row (should contain step_number, step_day, etc.)
+    header_idx = 0
+    for i, line in enumerate(lines):
+        if "step_number" in line.lower() and "step_day" in line.lower():
+            header_idx = i
+            break
+    csv_content = "\n".join(lines[header_idx:])
+    
+    # Try to fix common CSV issues
+    # Replace smart quotes with regular quotes
+    csv_content = csv_content.replace('"', '"').replace('"', '"')
+    csv_content = csv_content.replace(''', "'").replace(''', "'")
+    
+    # Parse CSV with more lenient options
+    df = None
+    parse_error = None
+    try:
+        # First try: standard pandas CSV parsing (default settings work best for most cases)
+        df = pd.read_csv(io.StringIO(csv_content), on_bad_lines='skip')
+    except Exception as e1:
+        parse_error = str(e1)
+        try:
+            # Second try: explicitly set quotechar
+            df = pd.read_csv(io.StringIO(csv_content), quotechar='"', on_bad_lines='skip')
+        except Exception as e2:
+            try:
+                # Third try: use engine='python' which is more lenient with malformed CSV
+                df = pd.read_csv(io.StringIO(csv_content), engine='python', on_bad_lines='skip', quotechar='"')
+            except Exception as e3:
+                try:
+                    # Fourth try: use QUOTE_ALL (quoting=1) which handles all fields
+                    df = pd.read_csv(io.StringIO(csv_content), quoting=1, on_bad_lines='skip')
+                except Exception as e4:
+                    # If all parsing attempts fail, raise with context
+                    raise CsvParseError(f"CSV parsing failed. Last error: {str(e4)}. Raw CSV content (first 500 chars): {csv_content[:500]}")
+    
+    if df is None or df.empty:
+        raise CsvParseError(f"Failed to parse CSV. Error: {parse_error}. Raw CSV content (first 500 chars): {csv_content[:500]}")
+    
+    # Validate that we captured all steps (one pass over the sequence headers)
+    sequence_steps = parse_steps(sequence)
+    core_numbers = [step.number for step in sequence_steps if not step.linkedin_only]
+    sequence_max_step = max(core_numbers) if core_numbers else 0
+    sequence_step_count = len(set(core_numbers))  # the CSV holds core steps only
+    
+    # Count steps in the parsed CSV
+    csv_step_count = len(df)
+    
+    # Check if step_number column exists and validate sequential steps
+    if 'step_number' in df.columns:
+        max_step = int(df['step_number'].max()) if not df['step_number'].isna().all() else 0
+        min_step = int(df['step_number'].min()) if not df['step_number'].isna().all() else 0
+        
+        # Check for missing steps
+        if max_step > csv_step_count:
+            notify("warning", f"⚠️ **Warning**: CSV has {csv_step_count} rows but step numbers go up to {max_step}. Some steps may be missing.")
+        elif sequence_max_step > 0 and max_step < sequence_max_step:
+            notify("warning", f"⚠️ **Warning**: Sequence has steps up to {sequence_max_step} but CSV only goes up to step {max_step}. Missing steps: {', '.join([str(i) for i in range(max_step + 1, sequence_max_step + 1)])}")
+        elif csv_step_count < sequence_step_count:
+            notify("warning", f"⚠️ **Warning**: Sequence appears to have {sequence_step_count} steps but CSV only has {csv_step_count} rows. Some steps may be missing.")
+        
+        # Check for gaps in step numbers
+        if max_step > 0:
+            expected_steps = set(range(min_step, max_step + 1))
+            actual_steps = set(df['step_number'].dropna().astype(int))
+            missing_steps = expected_steps - actual_steps
+            if missing_steps:
+                notify("warning", f"⚠️ **Warning**: Missing step numbers in CSV: {', '.join([str(s) for s in sorted(missing_steps)])}")
+    
+    # Add prospect info columns
+    df['email'] = prospect_info.get('email', '')
+    df['first_name'] = prospect_info.get('first_name', '')
+    df['last_name'] = prospect_info.get('last_name', '')
+    df['title'] = prospect_info.get('title', '')
+    df['company'] = prospect_info.get('company', '')
+    df['sequence_name'] = f"Cursor Outbound - {prospect_info.get('company', 'Unknown')}"
+    
+    # Reorder columns
+    cols = ['email', 'first_name', 'last_name', 'title', 'company', 'sequence_name', 
+            'step_number', 'step_day', 'step_type', 'subject', 'body']
+    df = df[[c for c in cols if c in df.columns]]
+    
+    return df
+
+
+def build_lanes_zip(df: "pd.DataFrame") -> bytes:
+    """Zip one Outreach CSV per lane from a combined export."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for lane_name, lane_df in df.groupby("lane", sort=False):
+            slug = re.sub(r"[^a-z0-9]+", "_", str(lane_name).lower()).strip("_") or "lane"
+            zf.writestr(f"outreach_sequence_{slug}.csv", lane_df.drop(columns=["lane"]).to_csv(index=False))
+    return buffer.getvalue()
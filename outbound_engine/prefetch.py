@@ -0,0 +1,117 @@
+"""
+Speculative lane prefetch.
+Predicts which persona lanes a rep will pick for a hypothesis (extracted personas and the
+hypothesis text matched against each lane's name and example titles) and generates those
+sequences in the background, within a per-session call budget. Results go to the stage
+graph memo, so a prefetched lane the rep doesn't pick now is still there if they pick it
+later. Hit rate = prefetched sequences the rep went on to use / prefetched sequences.
+"""
+
+import re
+import threading
+
+from outbound_engine.graph import StageGraph, sequence_key
+
+_STOPWORDS = {"of", "the", "and", "a", "an", "to", "for", "in", "on", "who", "head", "lead", "leads", "end", "users",
+              "often", "own", "by", "into", "company", "newer", "lane", "high", "growth"}
+
+
+def _tokens(text: str) -> set:
+    return {t for t in re.findall(r"[a-z0-9]+", (text or "").lower()) if t not in _STOPWORDS and len(t) > 1}
+
+
+def lane_titles(lane: dict) -> list:
+    """Lane name plus each comma-separated example title, parentheticals dropped."""
+    titles = re.sub(r"\([^)]*\)", "", lane.get("example_titles", "")).split(",")
+    return [lane.get("name", "")] + [t.strip() for t in titles if t.strip()]
+
+
+def score_lane(lane: dict, personas: list, hypothesis: str) -> float:
+    """Best token overlap between any persona and any lane title (weight 2), plus title terms the hypothesis mentions."""
+    title_tokens = [_tokens(t) for t in lane_titles(lane)]
+    title_tokens = [t for t in title_tokens if t]
+    persona_score = 0.0
+    for persona in personas:
+        p = _tokens(persona)
+        for t in title_tokens:
+            if p and t:
+                persona_score = max(persona_score, len(p & t) / len(t))
+    hyp = _tokens(hypothesis)
+    text_score = max((len(t & hyp) / len(t) for t in title_tokens), default=0.0)
+    return 2 * persona_score + text_score
+
+
+def predict_lanes(hypothesis: str, personas: list, lanes: list, limit: int = 2, min_score: float = 0.5) -> list:
+    """Lanes most likely to be picked for this hypothesis, best first."""
+    scored = [(score_lane(lane, personas, hypothesis), i, lane) for i, lane in enumerate(lanes)]
+    scored = [item for item in scored if item[0] >= min_score]
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return [lane for _, _, lane in scored[:limit]]
+
+
+class Prefetcher:
+    """Per-session speculative prefetch with a call budget and hit-rate accounting."""
+
+    def __init__(self, max_lanes: int = 2, budget: int = 6):
+        self.max_lanes = max_lanes
+        self.budget = budget
+        self.spent = 0
+        self.prefetched = set()  # sequence node keys generated speculatively
+        self.used = set()
+        self.futures = {}  # lane id -> future, for the most recent hypothesis
+        self._lock = threading.Lock()
+
+    def start(self, graph: StageGraph, executor, hypothesis: str, personas: list, lanes: list, prospect_info: dict,
+              reference_customers: str = "", skip_lane_ids=()) -> list:
+        """Submit predicted lanes that aren't already memoized, until the budget runs out. Returns the lanes started."""
+        self.futures = {}
+        if graph.config.demo_mode:
+            return []
+        background = graph.with_notify(None)
+        started = []
+        for lane in predict_lanes(hypothesis, personas, lanes, limit=self.max_lanes):
+            if lane["id"] in skip_lane_ids:
+                continue
+            key = sequence_key(lane, hypothesis, prospect_info, reference_customers, graph.config)
+            with self._lock:
+                if key in self.prefetched or graph.memo.get(key) is not None:
+                    continue
+                if self.spent >= self.budget:
+                    break
+                self.spent += 1
+                self.prefetched.add(key)
+            self.futures[lane["id"]] = executor.submit(background.sequence, dict(lane), hypothesis,
+                                                       dict(prospect_info), reference_customers)
+            started.append(lane)
+        return started
+
+    def wait(self, lane_id: str) -> None:
+        """Let an in-flight prefetch for this lane finish rather than generating it twice."""
+        future = self.futures.get(lane_id)
+        if future is not None:
+            try:
+                future.result()
+            except Exception:
+                pass
+
+    def record_use(self, graph: StageGraph, lane: dict, hypothesis: str, prospect_info: dict,
+                   reference_customers: str = "") -> bool:
+        """Note that the rep generated this lane's sequence. True when a prefetch served it: one was started and
+        its output is in the memo (a prefetch that failed or fell back to demo text memoizes nothing)."""
+        key = sequence_key(lane, hypothesis, prospect_info, reference_customers, graph.config)
+        with self._lock:
+            if key not in self.prefetched:
+                return False
+        if graph.memo.get(key) is None:
+            return False
+        with self._lock:
+            self.used.add(key)
+        return True
+
+    @property
+    def hit_rate(self) -> float:
+        return len(self.used) / len(self.prefetched) if self.prefetched else 0.0
+
+    def stats(self) -> dict:
+        return {"prefetched": len(self.prefetched), "used": len(self.used), "spent": self.spent,
+                "budget": self.budget, "hit_rate": round(self.hit_rate, 3)}
@@ -0,0 +1,210 @@
+"""
+Prompt assembly.
+Builds the hypothesis, sequence, AE handoff, persona and CSV prompts from the templates and KB.
+"""
+
+from pathlib import Path
+
+from outbound_engine.kb import load_file, load_kb_files
+
+HYPOTHESIS_SYSTEM = "You are an expert B2B sales strategist. Generate a complete, actionable outbound hypothesis. Always finish every section and sentence—do not stop mid-sentence or omit sections. You MUST include all five sections including Tech Stack and Risks."
+HYPOTHESIS_GEMINI_PREFIX = "You are an expert B2B sales strategist. Generate a complete, actionable outbound hypothesis. Your response MUST include all five sections (Why This Account, Why Now, Proof Points, Tech Stack, Risks). Do not stop after section 2—always complete sections 3, 4, and 5. Use up to 8192 tokens if needed."
+
+SEQUENCE_SYSTEM = "You are an expert B2B sales copywriter. Generate the COMPLETE outbound sequence. You MUST include every step through Day 15 breakup (core) and Day 9 (LinkedIn-only). Do not stop early or omit any step."
+
+HANDOFF_SYSTEM = "You are an expert sales strategist. Generate an AE handoff note and filled-in first call agenda using ONLY the provided hypothesis. Follow the templates exactly. Do not invent information. You MUST complete both sections in full—do not stop early or omit the First Call Agenda."
+
+PERSONA_SYSTEM = "Extract the recommended target personas from this sales hypothesis. Return ONLY a Python list of job titles, nothing else. Example: [\"VP Engineering\", \"DevEx Lead\", \"CTO\"]"
+
+CSV_SYSTEM = "You are a data formatter. Convert sequences to clean CSV format. Extract ALL 12 core steps (through Day 15 breakup). Do not stop at step 9 or skip any steps."
+EXEMPLAR_CHARS = 2000  # per example hypothesis; enough for the structure and angle, not the whole thing
+
+CSV_GEMINI_PREFIX = "You are a data formatter. Convert sequences to clean CSV format. Extract ALL 12 core steps (through Day 15 breakup). Do not stop at step 9."
+
+
+def with_gemini_prefix(prompt: str, prefix: str, provider: str) -> str:
+    """Gemini has no separate system message, so its instructions lead the prompt."""
+    return f"{prefix}\n\n{prompt}" if provider == "gemini" else prompt
+
+
+def build_hypothesis_prompt(research_data: dict, provider: str, root: Path = None, exemplars: list = None) -> str:
+    """Fill prompts/hypothesis.md with the research and append KB context. exemplars = hypotheses written for
+    similar accounts, shown as examples of the expected depth and angle."""
+    # Load prompts
+    cursor_context = load_file("prompts/cursor_context.md", root)
+    hypothesis_template = load_file("prompts/hypothesis.md", root)
+    
+    # Load knowledge base files (for personalization guidance)
+    kb_content = load_kb_files(root)
+    
+    # Build the prompt
+    prompt = hypothesis_template.replace("{{company_info}}", research_data.get("company_info", "Not provided"))
+    prompt = prompt.replace("{{job_postings}}", research_data.get("job_postings", "Not provided"))
+    prompt = prompt.replace("{{linkedin_profiles}}", research_data.get("linkedin_profiles", "Not provided"))
+    prompt = prompt.replace("{{news_signals}}", research_data.get("news_signals", "Not provided"))
+    prompt = prompt.replace("{{cursor_context}}", cursor_context)
+    
+    # Inject KB content if available (Cursor encyclopedia + personalization for hypothesis quality)
+    if kb_content.get("cursor_encyclopedia"):
+        prompt += "\n\n## Cursor Technical & Competitive Context\n\n" + kb_content["cursor_encyclopedia"] + "\n\n"
+    if kb_content.get("personalization"):
+        prompt += "\n\n## Personalization Guidelines\n\n" + kb_content["personalization"] + "\n\n"
+    if exemplars:
+        prompt += ("\n\n## Hypotheses Written for Similar Accounts\n\n"
+                   "For reference only: match their depth and structure, but base every claim on THIS account's research.\n\n")
+        prompt += "\n\n---\n\n".join(example[:EXEMPLAR_CHARS] for example in exemplars) + "\n\n"
+    
+    return with_gemini_prefix(prompt, HYPOTHESIS_GEMINI_PREFIX, provider)
+
+
+def build_persona_prompt(hypothesis: str) -> str:
+    return f"{PERSONA_SYSTEM}\n\n{hypothesis}"
+
+
+def build_sequence_prompt(lane: dict, hypothesis: str, prospect_info: dict, provider: str,
+                          reference_customers: str = "", root: Path = None) -> str:
+    """Fill prompts/sequence.md for a persona lane. reference_customers = optional list of current customers to cite in 1-2 steps."""
+    # Load templates
+    cursor_context = load_file("prompts/cursor_context.md", root)
+    sequence_template = load_file("prompts/sequence.md", root)
+    sequence_structure = load_file("templates/sequence_structure.md", root)
+    
+    # Load knowledge base files
+    kb_content = load_kb_files(root)
+    
+    # Build prospect context: use placeholders if no prospect provided
+    has_prospect = prospect_info.get("first_name") and prospect_info.get("company")
+    if has_prospect:
+        prospect_context = f"""
+Prospect (for this draft)—USE THESE EXACT NAMES IN THE COPY; do not use [Company] or [First Name]:
+- Name: {prospect_info.get('first_name', '')} {prospect_info.get('last_name', '').strip() or ''}
+- Title: {prospect_info.get('title', lane.get('name', ''))}
+- Company: {prospect_info.get('company', '')}
+- Email: {prospect_info.get('email', '') or 'unknown@company.com'}
+"""
+    else:
+        prospect_context = """
+No specific prospect—use placeholders so this sequence can scale:
+- Use [First Name] where you would use their first name
+- Use [Company] where you would use their company name
+- Keep tone and messaging tailored to this persona lane; they can fill in details when they use it
+"""
+    
+    peer_pivot_block = ""
+    if lane.get("peer_pivot"):
+        peer_pivot_block = "\n**Peer pivot (optional):** " + lane["peer_pivot"]
+    
+    # Build the prompt
+    prompt = sequence_template.replace("{{persona_lane_name}}", lane.get("name", ""))
+    prompt = prompt.replace("{{persona_lane_titles}}", lane.get("example_titles", ""))
+    prompt = prompt.replace("{{persona_lane_hook}}", lane.get("hook", ""))
+    prompt = prompt.replace("{{persona_lane_play}}", lane.get("cursor_play", ""))
+    prompt = prompt.replace("{{persona_lane_peer_pivot}}", peer_pivot_block)
+    prompt = prompt.replace("{{prospect_context}}", prospect_context)
+    prompt = prompt.replace("{{hypothesis}}", hypothesis)
+    # Reference customers: from Research Input, or from kb/reference_customers.md if field empty
+    ref_customers = (reference_customers or "").strip()
+    if not ref_customers:
+        ref_customers = (load_file("kb/reference_customers.md", root) or "").strip()
+    ref_block = ref_customers if ref_customers else "None provided—do not add customer references to the sequence."
+    prompt = prompt.replace("{{reference_customers}}", ref_block)
+    prompt = prompt.replace("{{sequence_template}}", sequence_structure)
+    prompt = prompt.replace("{{cursor_context}}", cursor_context)
+    
+    # Inject knowledge base content if available
+    kb_section = ""
+    if kb_content:
+        kb_section = "\n\n## Knowledge Base & Style Guide\n\n"
+        if "cursor_encyclopedia" in kb_content:
+            kb_section += "### Cursor Technical & Competitive Encyclopedia\n" + kb_content["cursor_encyclopedia"] + "\n\n"
+        if "voice" in kb_content:
+            kb_section += "### Voice & Style Guide\n" + kb_content["voice"] + "\n\n"
+        if "offers" in kb_content:
+            kb_section += "### Offer Library\n" + kb_content["offers"] + "\n\n"
+        if "sequence_patterns" in kb_content:
+            kb_section += "### Sequence Patterns\n" + kb_content["sequence_patterns"] + "\n\n"
+        if "personalization" in kb_content:
+            kb_section += "### Personalization Playbook\n" + kb_content["personalization"] + "\n\n"
+        kb_section += "---\n\n**CRITICAL**: The content above (Cursor encyclopedia, voice, offers, sequence patterns, personalization) is the PRIMARY source for wording, Cursor-specific claims, and style. Use it exactly. The persona lane (hook / Cursor play) only orients the angle for this audience—it must not override or replace the sharper messaging in this KB. Every email and LinkedIn message must end with a CTA (question preferred). Vary openers—do not use the same opener phrase more than once in the sequence.\n\n"
+    
+    prompt = prompt + kb_section
+    
+    return with_gemini_prefix(prompt, SEQUENCE_SYSTEM, provider)
+
+
+def build_handoff_prompt(hypothesis: str, root: Path = None) -> str:
+    """AE handoff + first call agenda prompt. Empty string if either template is missing."""
+    handoff_template = load_file("prompts/ae_handoff_template.md", root)
+    agenda_template = load_file("prompts/agenda_template.md", root)
+    if not handoff_template or not agenda_template:
+        return ""
+    return f"""You are an expert sales strategist. Using ONLY the hypothesis below, generate two artifacts:
+
+1. **AE Handoff Note** – Follow the structure and instructions in the handoff template. Fill every section using only details from the hypothesis. Match the tone and depth of the Canva example in the template.
+
+2. **First Call Agenda** – Follow the agenda template. Fill in every section marked "[Fill from hypothesis]" or with placeholders like [N], [API/product], [vertical], [challenge], [outcome], [Platform Engineering / relevant] using only the hypothesis. Keep all other wording from the template as written.
+
+Do not invent information. Use only what is in the hypothesis.
+
+---
+## Handoff Template (structure to follow)
+{handoff_template}
+
+---
+## Agenda Template (structure to follow, fill placeholders from hypothesis)
+{agenda_template}
+
+---
+## Hypothesis (your only source)
+{hypothesis}
+
+---
+Output your response in two clear sections with headers:
+## AE Handoff Note
+[full handoff note]
+
+## First Call Agenda
+[full filled-in agenda]
+
+**Critical:** Complete BOTH sections in full. Do not stop mid-sentence or omit the First Call Agenda. If you run out of space, prioritize finishing the agenda.
+"""
+
+
+def build_csv_prompt(sequence: str) -> str:
+    """Build the LLM prompt that converts a sequence into Outreach CSV rows."""
+    return f"""
+Convert this outbound sequence into a structured CSV format. Extract EVERY SINGLE STEP and return ONLY valid CSV data with these exact columns:
+step_number,step_day,step_type,subject,body
+
+CRITICAL REQUIREMENTS:
+- The core sequence has 12 steps: Day 1 (email, LinkedIn connect, call), Day 3 (email, call), Day 5 (email, call), Day 8 (email), Day 9 (call), Day 11 (email), Day 12 (call), Day 15 (breakup email). Extract ALL 12 steps.
+- There may also be a separate "LinkedIn only" sequence (Day 1, 3, 5, 9). Include those steps too if present, so the CSV can have 12 or more rows for the core sequence.
+- Do NOT stop at step 9. You MUST include steps 10, 11, 12 (Day 11 email, Day 12 call, Day 15 breakup).
+- Count the steps in the sequence and ensure the CSV has a row for every single one.
+
+Rules:
+- step_number: 1, 2, 3, ... (numeric only, sequential)
+- step_day: Extract the day number from each step (e.g., "Day 1" = 1, "Day 15" = 15)
+- step_type: Email, LinkedIn, or Phone (exact values, case-sensitive)
+- subject: Email subject line (leave empty for LinkedIn/Phone steps)
+- body: The full message content (for phone, include opener and voicemail script)
+
+IMPORTANT CSV FORMATTING RULES:
+- Use double quotes to wrap fields that contain commas, newlines, or quotes
+- Escape any double quotes inside fields by doubling them ("" becomes "")
+- Do NOT include any markdown code blocks (no ```)
+- Do NOT include any explanations or text before/after the CSV
+- Start immediately with the header row: step_number,step_day,step_type,subject,body
+- Each row must be on a single line (use \\n for newlines within body field)
+- Ensure all rows have the same number of columns
+- Include ALL 12 core steps minimum. Do not truncate.
+
+Return ONLY the raw CSV data, nothing else.
+
+Sequence to convert:
+{sequence}
+"""
+
+
+def build_csv_request(sequence: str, provider: str) -> str:
+    return with_gemini_prefix(build_csv_prompt(sequence), CSV_GEMINI_PREFIX, provider)
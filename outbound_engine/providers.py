@@ -0,0 +1,387 @@
+"""
+AI providers.
+OpenAI and Gemini clients behind one complete() call, with rate-limit errors normalized.
+
+Every call carries a deadline (config.request_timeout). Inside cancel_scope(event) calls
+stream, so setting the event abandons them between chunks (and skips calls not yet
+started) with CallCancelled. Outcomes are counted in provider_stats(). Each call is traced
+(tracing.py): time queued behind the rate limit, then the call itself with the model,
+token usage and time to first token.
+
+The SDKs are imported when the first client is built, not with this module: openai alone
+takes most of a second to import, and only one provider is active at a time. get_client()
+reuses one OpenAI client (and its connection pool) per key and resolves the Gemini model
+once per key, so warm_up() (warmup.py) can do both before the first rep arrives.
+"""
+
+import contextvars
+import importlib.util
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from outbound_engine.config import EngineConfig
+from outbound_engine.tracing import CLIENT, current_span, span
+
+# Optional Gemini SDK: checked without importing it (see _genai)
+try:
+    GEMINI_AVAILABLE = importlib.util.find_spec("google.generativeai") is not None
+except ImportError:
+    GEMINI_AVAILABLE = False
+
+GEMINI_MODEL_FALLBACKS = [
+    'gemini-1.5-flash',
+    'gemini-1.5-pro',
+    'gemini-pro',
+    'models/gemini-1.5-flash',
+    'models/gemini-1.5-pro',
+    'models/gemini-pro'
+]
+
+_RATE_LIMIT_MARKERS = ("429", "quota", "insufficient", "rate limit", "resource_exhausted")
+
+
+class ProviderError(Exception):
+    """A provider call failed. raw keeps the provider's full error text for debugging."""
+
+    def __init__(self, message: str, raw: str = ""):
+        super().__init__(message)
+        self.raw = raw or message
+
+
+class ProviderNotConfigured(ProviderError):
+    """No API key (or SDK) for the selected provider."""
+
+
+class RateLimitError(ProviderError):
+    """Quota or rate limit hit. Message is RATE_LIMIT (Gemini) or QUOTA_EXCEEDED (OpenAI)."""
+
+
+class ProviderTimeout(ProviderError):
+    """The call ran past its deadline (config.request_timeout)."""
+
+
+class CallCancelled(ProviderError):
+    """The call's cancel scope was cancelled (e.g. the UI session was reset)."""
+
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _record(outcome: str) -> None:
+    with _stats_lock:
+        _stats["calls"] += 1
+        _stats[outcome] += 1
+
+
+def provider_stats() -> dict:
+    """Process-wide call outcomes: calls, ok, failed, rate_limited, timed_out, cancelled."""
+    with _stats_lock:
+        return {key: _stats.get(key, 0) for key in ("calls", "ok", "failed", "rate_limited", "timed_out", "cancelled")}
+
+
+def reset_provider_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+_cancel_event = contextvars.ContextVar("outbound_cancel_event", default=None)
+
+
+@contextmanager
+def cancel_scope(event: threading.Event):
+    """Provider calls made inside the block (same thread) stop once event is set."""
+    token = _cancel_event.set(event)
+    try:
+        yield event
+    finally:
+        _cancel_event.reset(token)
+
+
+def current_cancel_event():
+    """The cancel scope's event for this thread, or None outside any scope."""
+    return _cancel_event.get()
+
+
+def _check_cancelled(event) -> None:
+    if event is not None and event.is_set():
+        raise CallCancelled("Cancelled")
+
+
+def _is_timeout(error: Exception) -> bool:
+    name = type(error).__name__.lower()
+    return "timeout" in name or "deadline" in name or "timed out" in str(error).lower()
+
+
+def is_rate_limit_error(error_msg: str) -> bool:
+    lowered = error_msg.lower()
+    return any(marker in lowered for marker in _RATE_LIMIT_MARKERS) or "RATE_LIMIT" in error_msg
+
+
+class RequestThrottle:
+    """Spaces calls evenly so all threads together stay under requests_per_minute."""
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_throttles = {}
+_throttles_lock = threading.Lock()
+
+
+def get_throttle(provider: str, requests_per_minute: float):
+    """Process-wide throttle per (provider, rpm); None when unthrottled."""
+    if not requests_per_minute or requests_per_minute <= 0:
+        return None
+    with _throttles_lock:
+        key = (provider, float(requests_per_minute))
+        if key not in _throttles:
+            _throttles[key] = RequestThrottle(requests_per_minute)
+        return _throttles[key]
+
+
+_clients = {}  # (api key, base url, client factory) -> OpenAI client
+_gemini_models = {}  # api key -> resolved model name
+_clients_lock = threading.Lock()
+
+
+def _genai():
+    import google.generativeai as genai
+    return genai
+
+
+def get_openai_client(api_key: str, base_url: str = ""):
+    """Get OpenAI client for the key (None if no key); base_url points it at a compatible server."""
+    if api_key:
+        from openai import OpenAI
+        return OpenAI(api_key=api_key, base_url=base_url or None)
+    return None
+
+
+def list_available_gemini_models(api_key: str) -> list:
+    """List available Gemini models for debugging."""
+    if not GEMINI_AVAILABLE or not api_key:
+        return []
+    try:
+        genai = _genai()
+        genai.configure(api_key=api_key)
+        models = genai.list_models()
+        available = []
+        for model in models:
+            if 'generateContent' in model.supported_generation_methods:
+                available.append(model.name)
+        return available
+    except Exception:
+        return []
+
+
+def get_gemini_client(api_key: str):
+    """Get Gemini model for the key (None if no key or SDK)."""
+    if not GEMINI_AVAILABLE or not api_key:
+        return None
+    genai = _genai()
+    genai.configure(api_key=api_key)
+
+    # First, try to list available models and use the first one that supports generateContent
+    try:
+        models = genai.list_models()
+        for model in models:
+            if 'generateContent' in model.supported_generation_methods:
+                # Extract model name (remove 'models/' prefix if present)
+                model_name = model.name.replace('models/', '')
+                return genai.GenerativeModel(model_name)
+    except Exception:
+        pass
+
+    # Fallback: try model names directly
+    for model_name in GEMINI_MODEL_FALLBACKS:
+        try:
+            return genai.GenerativeModel(model_name)
+        except Exception:
+            continue
+
+    # If all else fails, try the first one and let it error
+    return genai.GenerativeModel('gemini-1.5-flash')
+
+
+def _cached_gemini_client(api_key: str):
+    with _clients_lock:
+        model_name = _gemini_models.get(api_key)
+    if model_name is None:
+        model = get_gemini_client(api_key)
+        if model is not None:
+            with _clients_lock:
+                _gemini_models[api_key] = model.model_name
+        return model
+    genai = _genai()
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model_name)
+
+
+def get_client(config: EngineConfig, provider: str = None):
+    """Gemini model or OpenAI client for provider (defaults to config.provider), reused per API key."""
+    provider = provider or config.provider
+    if provider == "gemini":
+        if not GEMINI_AVAILABLE or not config.gemini_api_key:
+            return None
+        return _cached_gemini_client(config.gemini_api_key)
+    api_key = config.openai_api_key
+    if not api_key:
+        return None
+    factory = config.client_factory or get_openai_client
+    key = (api_key, config.openai_base_url, factory)
+    with _clients_lock:
+        client = _clients.get(key)
+    if client is None:
+        client = factory(api_key, config.openai_base_url)
+        with _clients_lock:
+            client = _clients.setdefault(key, client)
+    return client
+
+
+def resolved_model(config: EngineConfig, provider: str = None) -> str:
+    """Model name calls for provider go to ("" for Gemini until its model has been resolved)."""
+    provider = provider or config.provider
+    if provider == "gemini":
+        with _clients_lock:
+            return _gemini_models.get(config.gemini_api_key, "")
+    return config.openai_model
+
+
+def _trace_usage(input_tokens, output_tokens) -> None:
+    current_span().set(**{"gen_ai.usage.input_tokens": input_tokens, "gen_ai.usage.output_tokens": output_tokens})
+
+
+def _trace_first_token(started: float, parts: list) -> None:
+    if not parts:
+        current_span().set(time_to_first_token_ms=round((time.monotonic() - started) * 1000, 1))
+
+
+def _openai_call(client, config: EngineConfig, messages: list, temperature: float, max_tokens: int,
+                 deadline: float, cancel) -> str:
+    started = time.monotonic()
+    timeout = max(deadline - started, 1.0)
+    if cancel is None:
+        response = client.chat.completions.create(
+            model=config.openai_model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout
+        )
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            _trace_usage(usage.prompt_tokens, usage.completion_tokens)
+        return response.choices[0].message.content
+    stream = client.chat.completions.create(
+        model=config.openai_model,
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        timeout=timeout,
+        stream=True,
+        stream_options={"include_usage": True}  # openai>=1.26 (requirements.txt)
+    )
+    parts = []
+    try:
+        for chunk in stream:
+            _check_cancelled(cancel)
+            if time.monotonic() > deadline:
+                raise ProviderTimeout(f"No complete response within {config.request_timeout:g}s")
+            if chunk.choices and chunk.choices[0].delta.content:
+                _trace_first_token(started, parts)
+                parts.append(chunk.choices[0].delta.content)
+            if getattr(chunk, "usage", None) is not None:
+                _trace_usage(chunk.usage.prompt_tokens, chunk.usage.completion_tokens)
+    finally:
+        stream.close()
+    return "".join(parts)
+
+
+def _gemini_call(client, config: EngineConfig, prompt: str, temperature: float, max_tokens: int,
+                 deadline: float, cancel) -> str:
+    generation_config = _genai().types.GenerationConfig(temperature=temperature, max_output_tokens=max_tokens)
+    started = time.monotonic()
+    request_options = {"timeout": max(deadline - started, 1.0)}
+    if cancel is None:
+        response = client.generate_content(prompt, generation_config=generation_config, request_options=request_options)
+        _trace_gemini_usage(response)
+        return response.text
+    parts = []
+    chunk = None
+    for chunk in client.generate_content(prompt, generation_config=generation_config,
+                                         request_options=request_options, stream=True):
+        _check_cancelled(cancel)
+        if time.monotonic() > deadline:
+            raise ProviderTimeout(f"No complete response within {config.request_timeout:g}s")
+        _trace_first_token(started, parts)
+        parts.append(chunk.text)
+    _trace_gemini_usage(chunk)
+    return "".join(parts)
+
+
+def _trace_gemini_usage(response) -> None:
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        _trace_usage(getattr(usage, "prompt_token_count", None), getattr(usage, "candidates_token_count", None))
+
+
+def complete(config: EngineConfig, prompt: str, system: str = "", temperature: float = 0.7,
+             max_tokens: int = 8192, provider: str = None, client=None) -> str:
+    """One completion. Gemini has no system role, so callers fold its instructions into the prompt; system is OpenAI-only."""
+    provider = provider or config.provider
+    client = client or get_client(config, provider)
+    if not client:
+        raise ProviderNotConfigured(f"{'Gemini' if provider == 'gemini' else 'OpenAI'} API key not configured")
+    cancel = _cancel_event.get()
+    throttle = get_throttle(provider, config.requests_per_minute)
+    if throttle:
+        with span("provider.queue", rpm=config.requests_per_minute):
+            throttle.acquire()
+    try:
+        _check_cancelled(cancel)
+        deadline = time.monotonic() + config.request_timeout
+        with span("provider.call", kind=CLIENT, **{"gen_ai.system": provider,
+                                                    "gen_ai.request.model": resolved_model(config, provider),
+                                                    "gen_ai.request.max_tokens": max_tokens,
+                                                    "prompt_chars": len(prompt) + len(system or "")}) as call:
+            if provider == "gemini":
+                text = _gemini_call(client, config, prompt, temperature, max_tokens, deadline, cancel)
+            else:
+                messages = [{"role": "system", "content": system}] if system else []
+                messages.append({"role": "user", "content": prompt})
+                text = _openai_call(client, config, messages, temperature, max_tokens, deadline, cancel)
+            call.set(output_chars=len(text or ""))
+        _record("ok")
+        return text
+    except CallCancelled:
+        _record("cancelled")
+        raise
+    except ProviderTimeout:
+        _record("timed_out")
+        raise
+    except ProviderError:
+        _record("failed")
+        raise
+    except Exception as e:
+        error_msg = str(e)
+        if is_rate_limit_error(error_msg):
+            _record("rate_limited")
+            raise RateLimitError("RATE_LIMIT" if provider == "gemini" else "QUOTA_EXCEEDED", raw=error_msg) from e
+        if _is_timeout(e):
+            _record("timed_out")
+            raise ProviderTimeout(f"No response within {config.request_timeout:g}s", raw=error_msg) from e
+        _record("failed")
+        raise ProviderError(error_msg) from e
@@ -0,0 +1,243 @@
+"""
+Typed per-session state for the UI.
+One SessionData per Streamlit session holds the current run: research, hypothesis,
+personas, lanes, sequences, CSV exports and the AE handoff. Large text is kept
+zlib-compressed. A session's blob stores (its SessionData and its stage memo) share one
+MemoryBudget: once their compressed bytes together pass max_bytes, the least recently used
+entries across both move to a spill directory and are read back on access, so many
+concurrent reps don't grow the server's memory without bound. Spill directories are
+removed when their store is garbage collected.
+
+reset() is the one way to start over.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+import weakref
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+
+DEFAULT_MAX_BYTES = int(os.getenv("OUTBOUND_SESSION_MAX_BYTES") or 256 * 1024)
+SPILL_ROOT = Path(tempfile.gettempdir()) / "outbound-sessions"
+
+
+class MemoryBudget:
+    """One in-memory byte ceiling shared by several blob stores. Past max_bytes, the least recently used entry
+    across all of them spills to disk."""
+
+    __slots__ = ("max_bytes", "used", "lock", "_lru")
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self.lock = threading.RLock()  # stores sharing a budget may be written from different threads
+        self._lru = OrderedDict()  # (id(store), name) -> weakref to the store
+
+    def touch(self, store: "BlobStore", name: str) -> None:
+        key = (id(store), name)
+        if key in self._lru:
+            self._lru.move_to_end(key)
+        else:
+            self._lru[key] = weakref.ref(store)
+
+    def forget(self, store_id: int, name: str) -> None:
+        self._lru.pop((store_id, name), None)
+
+    def spill(self) -> None:
+        while self.used > self.max_bytes and self._lru:
+            (_, name), ref = self._lru.popitem(last=False)
+            store = ref()
+            if store is not None:
+                store._spill(name)
+
+
+class BlobStore:
+    """Compressed text/bytes by name, counted against a MemoryBudget (its own unless one is shared)."""
+
+    __slots__ = ("budget", "memory_bytes", "_memory", "_disk", "_dir", "__weakref__")
+
+    def __init__(self, budget: MemoryBudget = None):
+        self.budget = budget if budget is not None else MemoryBudget()
+        self.memory_bytes = 0
+        self._memory = {}  # name -> (compressed, is_text)
+        self._disk = {}  # name -> (path, is_text)
+        self._dir = None
+        weakref.finalize(self, _release, self.budget, id(self), self._memory)
+
+    def set(self, name: str, value) -> None:
+        is_text = isinstance(value, str)
+        data = None if value is None else zlib.compress(value.encode("utf-8") if is_text else value, 6)
+        with self.budget.lock:
+            self.discard(name)
+            if data is None:
+                return
+            self._memory[name] = (data, is_text)
+            self.memory_bytes += len(data)
+            self.budget.used += len(data)
+            self.budget.touch(self, name)
+            self.budget.spill()
+
+    def get(self, name: str):
+        with self.budget.lock:
+            if name in self._memory:
+                self.budget.touch(self, name)
+                data, is_text = self._memory[name]
+            elif name in self._disk:
+                path, is_text = self._disk[name]
+                data = path.read_bytes()
+            else:
+                return None
+        raw = zlib.decompress(data)
+        return raw.decode("utf-8") if is_text else raw
+
+    def discard(self, name: str) -> None:
+        with self.budget.lock:
+            if name in self._memory:
+                data, _ = self._memory.pop(name)
+                self.memory_bytes -= len(data)
+                self.budget.used -= len(data)
+                self.budget.forget(id(self), name)
+            if name in self._disk:
+                path, _ = self._disk.pop(name)
+                path.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        with self.budget.lock:
+            for name in list(self._memory) + list(self._disk):
+                self.discard(name)
+
+    @property
+    def disk_bytes(self) -> int:
+        return sum(path.stat().st_size for path, _ in self._disk.values() if path.exists())
+
+    def _spill(self, name: str) -> None:
+        """Move one entry to disk (called by the budget with its lock held)."""
+        data, is_text = self._memory.pop(name)
+        self.memory_bytes -= len(data)
+        self.budget.used -= len(data)
+        path = self._directory() / f"{name.encode('utf-8').hex()}.z"
+        path.write_bytes(data)
+        self._disk[name] = (path, is_text)
+
+    def _directory(self) -> Path:
+        if self._dir is None:
+            self._dir = SPILL_ROOT / uuid.uuid4().hex
+            self._dir.mkdir(parents=True, exist_ok=True)
+            weakref.finalize(self, shutil.rmtree, str(self._dir), True)
+        return self._dir
+
+
+def _release(budget: MemoryBudget, store_id: int, memory: dict) -> None:
+    """Give a collected store's in-memory bytes back to a budget that outlives it."""
+    with budget.lock:
+        for name, (data, _) in memory.items():
+            budget.used -= len(data)
+            budget.forget(store_id, name)
+
+
+class SessionData:
+    """The current run for one UI session. Text artifacts are properties backed by the blob store; pass the
+    budget the session's stage memo uses so both count against one ceiling."""
+
+    __slots__ = ("personas", "selected_lanes", "current_sequence_lane_id", "prospect_info", "hypothesis_source",
+                 "_sequence_meta", "_blobs")
+
+    def __init__(self, budget: MemoryBudget = None):
+        self.personas = []
+        self.selected_lanes = []  # lane labels the rep chose (1-3)
+        self.current_sequence_lane_id = None  # which lane's sequence is displayed
+        self.prospect_info = {}
+        self.hypothesis_source = None  # {"run_id", "company", "similarity"} when reused from a similar saved run
+        self._sequence_meta = {}  # lane id -> {"name", "validation"}
+        self._blobs = BlobStore(budget)
+
+    @property
+    def budget(self) -> MemoryBudget:
+        return self._blobs.budget
+
+    @property
+    def research_data(self) -> dict:
+        encoded = self._blobs.get("research_data")
+        return json.loads(encoded) if encoded else {}
+
+    @research_data.setter
+    def research_data(self, value: dict) -> None:
+        self._blobs.set("research_data", json.dumps(value) if value else None)
+
+    @property
+    def hypothesis(self):
+        return self._blobs.get("hypothesis")
+
+    @hypothesis.setter
+    def hypothesis(self, value) -> None:
+        self._blobs.set("hypothesis", value)
+
+    @property
+    def ae_handoff(self):
+        return self._blobs.get("ae_handoff")
+
+    @ae_handoff.setter
+    def ae_handoff(self, value) -> None:
+        self._blobs.set("ae_handoff", value)
+
+    @property
+    def csv_data(self):
+        return self._blobs.get("csv_data")
+
+    @csv_data.setter
+    def csv_data(self, value) -> None:
+        self._blobs.set("csv_data", value)
+
+    @property
+    def csv_all_data(self):
+        return self._blobs.get("csv_all_data")
+
+    @csv_all_data.setter
+    def csv_all_data(self, value) -> None:
+        self._blobs.set("csv_all_data", value)
+
+    @property
+    def csv_all_zip(self):
+        return self._blobs.get("csv_all_zip")
+
+    @csv_all_zip.setter
+    def csv_all_zip(self, value) -> None:
+        self._blobs.set("csv_all_zip", value)
+
+    @property
+    def sequences(self) -> dict:
+        """lane id -> {"name", "content", "validation"} (a fresh dict; assign to change it)."""
+        return {lane_id: {**meta, "content": self._blobs.get(f"sequence:{lane_id}")}
+                for lane_id, meta in self._sequence_meta.items()}
+
+    @sequences.setter
+    def sequences(self, value: dict) -> None:
+        for lane_id in self._sequence_meta:
+            self._blobs.discard(f"sequence:{lane_id}")
+        self._sequence_meta = {}
+        for lane_id, entry in (value or {}).items():
+            self._sequence_meta[lane_id] = {k: v for k, v in entry.items() if k != "content"}
+            self._blobs.set(f"sequence:{lane_id}", entry.get("content"))
+
+    def clear_exports(self) -> None:
+        self.csv_data = None
+        self.csv_all_data = None
+        self.csv_all_zip = None
+
+    def reset(self) -> None:
+        """Start over: drop the whole run (memory and spilled files)."""
+        self._blobs.clear()
+        self._sequence_meta = {}
+        self.personas = []
+        self.selected_lanes = []
+        self.current_sequence_lane_id = None
+        self.prospect_info = {}
+        self.hypothesis_source = None
+
+    def footprint(self) -> dict:
+        return {"memory_bytes": self._blobs.memory_bytes, "disk_bytes": self._blobs.disk_bytes}
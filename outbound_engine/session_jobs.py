@@ -0,0 +1,155 @@
+"""
+Per-session background jobs.
+Generation used to run inside button handlers, so any rerun (sidebar nav, Start Over)
+aborted the script mid-call and dropped a result the provider had already billed for.
+A SessionJobs lives in a UI session and owns a small executor: jobs keep running across
+reruns and report progress, and a finished job's result is handed back on the next
+script run (collect), so session state is only ever written from the script thread.
+
+Jobs can't talk to the UI while they run; stage messages are recorded on the job and
+replayed when it is collected.
+
+cancel() (session reset) stops the session's outstanding work: queued jobs never start
+and provider calls in flight are abandoned (see providers.cancel_scope). Work the session
+hands to a shared executor goes through scoped(executor) so it is cancelled too.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from outbound_engine.providers import cancel_scope
+from outbound_engine.tracing import span
+
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class Job:
+    """One background generation. fn(job) runs on the executor; apply(result) runs in the script on collect."""
+
+    def __init__(self, name: str, label: str, apply=None, total_steps: int = 1):
+        self.name = name
+        self.label = label
+        self.apply = apply
+        self.total_steps = total_steps
+        self.done_steps = 0
+        self.step_label = ""
+        self.events = []  # (level, message) from notify, replayed on collect
+        self.started = time.monotonic()
+        self.finished = None
+        self.future = None
+
+    def notify(self, level: str, message: str) -> None:
+        self.events.append((level, message))
+
+    def progress(self, done_steps: int, step_label: str = "") -> None:
+        self.done_steps = done_steps
+        self.step_label = step_label
+
+    @property
+    def status(self) -> str:
+        if not self.future.done():
+            return RUNNING
+        return FAILED if self.future.exception() is not None else DONE
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+
+def _run_scoped(event: threading.Event, fn, args, kwargs):
+    with cancel_scope(event):
+        return fn(*args, **kwargs)
+
+
+class _ScopedExecutor:
+    """submit()-compatible view of a shared executor whose work belongs to one session."""
+
+    def __init__(self, jobs: "SessionJobs", executor):
+        self._jobs = jobs
+        self._executor = executor
+
+    def submit(self, fn, *args, **kwargs):
+        future = self._executor.submit(_run_scoped, self._jobs._cancel, fn, args, kwargs)
+        self._jobs._track(future)
+        return future
+
+
+class SessionJobs:
+    """Background jobs for one session, at most one per name."""
+
+    def __init__(self, max_workers: int = 2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="session-job")
+        self._jobs = {}
+        self._futures = []  # everything submitted for this session, for cancel()
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self.cancelled = 0
+
+    def _track(self, future) -> None:
+        with self._lock:
+            self._futures = [f for f in self._futures if not f.done()]
+            self._futures.append(future)
+
+    def scoped(self, executor) -> _ScopedExecutor:
+        """Wrap a (shared) executor so work submitted through it is cancelled with this session's jobs."""
+        return _ScopedExecutor(self, executor)
+
+    def submit(self, name: str, label: str, fn, apply=None, total_steps: int = 1) -> Job:
+        """Start fn(job) in the background. A job already running under this name is superseded: it finishes
+        (its output still reaches the stage memo) but is never applied. Provider calls fn makes stop on cancel()."""
+        job = Job(name, label, apply, total_steps)
+        event = self._cancel
+
+        def run():
+            queued_ms = round((time.monotonic() - job.started) * 1000, 1)  # waiting for a free executor thread
+            try:
+                with cancel_scope(event), span(f"job.{name}", label=label, queued_ms=queued_ms):
+                    return fn(job)
+            finally:
+                job.finished = time.monotonic()
+
+        job.future = self._executor.submit(run)
+        self._track(job.future)
+        with self._lock:
+            self._jobs[name] = job
+        return job
+
+    def get(self, name: str):
+        with self._lock:
+            return self._jobs.get(name)
+
+    def running(self, name: str = None) -> list:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job for job in jobs if not job.future.done() and (name is None or job.name == name)]
+
+    def pending(self) -> list:
+        """Names of jobs running or finished but not yet collected (empty when there's nothing to wait for)."""
+        with self._lock:
+            return list(self._jobs)
+
+    def collect(self) -> list:
+        """Remove and return finished jobs (done or failed), oldest first, for the script to apply."""
+        with self._lock:
+            finished = [job for job in self._jobs.values() if job.future.done()]
+            for job in finished:
+                del self._jobs[job.name]
+        return sorted(finished, key=lambda job: job.started)
+
+    def cancel(self) -> int:
+        """Session reset: cancel everything outstanding and forget every job. Returns how many were cancelled.
+        Work already past its last provider call may still finish (its output reaches the stage memo), but no
+        job is ever applied."""
+        with self._lock:
+            event, self._cancel = self._cancel, threading.Event()
+            outstanding = [f for f in self._futures if not f.done()]
+            self._futures = []
+            self._jobs.clear()
+        event.set()
+        for future in outstanding:
+            future.cancel()  # not started yet: never runs
+        self.cancelled += len(outstanding)
+        return len(outstanding)
@@ -0,0 +1,137 @@
+"""
+Look-alike accounts.
+MinHash signatures over word 3-grams of an account's research (company info, job postings,
+profiles, news) estimate how much two accounts' research overlaps (Jaccard similarity)
+without comparing the text itself. Signatures are split into bands for locality-sensitive
+hashing: accounts that share any band bucket are candidates, and only those are scored.
+With 32 bands of 4 rows, pairs around 0.4 similar or more are found almost always.
+
+Signatures and band buckets live next to the runs in the history file (history.py);
+this module is the math, plus NearDuplicates: an opt-in cache tier that serves a
+hypothesis generated moments ago for research that differs only by a tweak.
+numpy is imported on the first signature, so importing this module stays cheap.
+"""
+
+import difflib
+import hashlib
+import re
+import threading
+from functools import lru_cache
+
+from outbound_engine.graph import RESEARCH_KEYS
+
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+_PRIME = (1 << 31) - 1
+
+
+@lru_cache(maxsize=1)
+def _permutations():
+    """(a, b) of the NUM_PERM hash functions a*x + b mod _PRIME."""
+    import numpy as np
+    rng = np.random.RandomState(20240611)  # fixed: stored signatures must stay comparable across processes
+    return (rng.randint(1, _PRIME, size=NUM_PERM, dtype=np.uint64),
+            rng.randint(0, _PRIME, size=NUM_PERM, dtype=np.uint64))
+
+
+def research_text(research_data: dict) -> str:
+    return "\n".join(str(research_data.get(k) or "") for k in RESEARCH_KEYS)
+
+
+def shingles(text: str) -> "np.ndarray":
+    """32-bit hashes of every run of SHINGLE_WORDS consecutive words (lowercased)."""
+    import numpy as np
+    words = re.findall(r"[a-z0-9]+", (text or "").lower())
+    if len(words) < SHINGLE_WORDS:
+        grams = {" ".join(words)} if words else set()
+    else:
+        grams = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    return np.array([int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "little")
+                     for g in grams], dtype=np.uint64)
+
+
+def signature(research_data: dict):
+    """MinHash signature (NUM_PERM uint32 values) of the research, or None when there's no text."""
+    import numpy as np
+    hashed = shingles(research_text(research_data))
+    if not hashed.size:
+        return None
+    a, b = _permutations()
+    return ((a[:, None] * hashed[None, :] + b[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def to_bytes(sig: "np.ndarray") -> bytes:
+    return sig.astype("<u4").tobytes()
+
+
+def from_bytes(blob: bytes) -> "np.ndarray":
+    import numpy as np
+    return np.frombuffer(blob, dtype="<u4")
+
+
+def band_buckets(sig: "np.ndarray") -> list:
+    """(band, bucket) pairs; two signatures sharing any pair are candidates."""
+    raw = to_bytes(sig)
+    width = ROWS * 4
+    return [(band, int.from_bytes(hashlib.blake2b(raw[band * width:(band + 1) * width], digest_size=8).digest(),
+                                  "little", signed=True))
+            for band in range(BANDS)]
+
+
+def similarity(a: "np.ndarray", b: "np.ndarray") -> float:
+    """Estimated Jaccard similarity of the two research texts' 3-gram sets."""
+    return float((a == b).mean())
+
+
+class NearDuplicates:
+    """Opt-in near-duplicate tier for the hypothesis stage: outputs recently generated for research at least
+    `threshold` similar to the new research, under the same provider/model/KB/examples (the context)."""
+
+    def __init__(self, threshold: float = 0.85, max_entries: int = 64):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self._entries = []  # (context, signature, research_data, output), newest last
+        self._lock = threading.Lock()
+
+    def add(self, context: str, research_data: dict, output: str) -> None:
+        sig = signature(research_data)
+        if sig is None:
+            return
+        with self._lock:
+            self._entries.append((context, sig, dict(research_data), output))
+            del self._entries[:-self.max_entries]
+
+    def find(self, context: str, research_data: dict):
+        """The closest earlier output at or above the threshold: {output, similarity, research_data}, or None."""
+        sig = signature(research_data)
+        if sig is None:
+            return None
+        with self._lock:
+            scored = [(similarity(sig, entry_sig), i) for i, (ctx, entry_sig, _, _) in enumerate(self._entries)
+                      if ctx == context]
+            if not scored:
+                return None
+            score, i = max(scored)
+            if score < self.threshold:
+                return None
+            self.hits += 1
+            _, _, research, output = self._entries[i]
+        return {"output": output, "similarity": round(score, 3), "research_data": research}
+
+
+def research_diff(old: dict, new: dict) -> str:
+    """Unified diff of two research payloads, field by field (what changed since the served result)."""
+    lines = []
+    for key in RESEARCH_KEYS:
+        before, after = str(old.get(key) or ""), str(new.get(key) or "")
+        if before != after:
+            lines.extend(difflib.unified_diff(_sentences(before), _sentences(after), key, key, lineterm="", n=0))
+    return "\n".join(lines)
+
+
+def _sentences(text: str) -> list:
+    """Research is often pasted as one long paragraph; compare it sentence by sentence."""
+    return [s for s in re.split(r"(?<=[.!?])\s+|\n+", text) if s.strip()]
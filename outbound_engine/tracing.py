@@ -0,0 +1,228 @@
+"""
+Tracing.
+Spans around each generation stage and its parts, so a slow sequence can be split into
+prompt build, queueing (behind the job pool or the rate limit), the provider call (with time
+to first token and token counts), parsing and the page render:
+
+    with span("generate_sequence", lane=lane["name"]) as current:
+        ...
+        current.add("retries")
+
+Spans opened inside another span (same thread) join its trace. Tracing is off unless
+OUTBOUND_TRACE_FILE or OUTBOUND_OTLP_ENDPOINT is set (or configure() is called); span()
+is then a no-op. Finished spans are exported in OpenTelemetry's OTLP/JSON encoding
+(resourceSpans -> scopeSpans -> spans), one export request per line of the trace file,
+so any OTLP-aware tool can read it. With an OTLP endpoint (an OpenTelemetry Collector,
+Jaeger, Tempo...) the same requests are also POSTed to <endpoint>/v1/traces. Export runs on
+a background thread and never fails the traced code.
+
+Attribute names follow the OpenTelemetry GenAI conventions where one exists
+(gen_ai.system, gen_ai.request.model, gen_ai.usage.input_tokens/output_tokens).
+"""
+
+import atexit
+import contextvars
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from pathlib import Path
+
+TRACE_FILE_ENV = "OUTBOUND_TRACE_FILE"
+OTLP_ENDPOINT_ENV = "OUTBOUND_OTLP_ENDPOINT"
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME") or "outbound-engine"
+FLUSH_EVERY = 64  # spans per export request (also flushed when a trace's root span ends)
+
+INTERNAL, CLIENT = 1, 3  # OTLP span kinds
+_STATUS_OK, _STATUS_ERROR = 1, 2
+
+_current = contextvars.ContextVar("outbound_span", default=None)
+
+
+class Span:
+    """One timed operation. set() replaces attributes, add() increments a counter attribute."""
+
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, parent=None, kind: int = INTERNAL, start_ns: int = None, **attributes):
+        self.name = name
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else ""
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.attributes = {k: v for k, v in attributes.items() if v is not None}
+        self.error = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+
+    def add(self, key: str, amount: int = 1) -> None:
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def to_otlp(self) -> dict:
+        out = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": _STATUS_ERROR, "message": self.error} if self.error else {"code": _STATUS_OK},
+        }
+        if self.parent_id:
+            out["parentSpanId"] = self.parent_id
+        return out
+
+
+class _NoSpan:
+    """What span() yields while tracing is off."""
+
+    def set(self, **attributes) -> None:
+        pass
+
+    def add(self, key: str, amount: int = 1) -> None:
+        pass
+
+
+NO_SPAN = _NoSpan()
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: dict) -> list:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+class Exporter:
+    """Writes batches of finished spans as OTLP/JSON lines to path and/or POSTs them to an OTLP/HTTP endpoint."""
+
+    def __init__(self, path: Path = None, endpoint: str = "", timeout: float = 5.0):
+        self.path = Path(path) if path else None
+        self.endpoint = (endpoint or "").rstrip("/")
+        self.timeout = timeout
+        self.exported = 0
+        self.failed = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._drain, name="trace-export", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._pending.append(span)
+            if span.parent_id and len(self._pending) < FLUSH_EVERY:
+                return
+            batch, self._pending = self._pending, []
+        self._queue.put(batch)
+
+    def flush(self, timeout: float = None) -> None:
+        """Hand everything pending to the export thread and wait until it is written."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if batch:
+            self._queue.put(batch)
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout if timeout is not None else self.timeout + 1)
+
+    def request(self, spans: list) -> dict:
+        """The OTLP ExportTraceServiceRequest for spans."""
+        return {"resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+            "scopeSpans": [{"scope": {"name": "outbound_engine"}, "spans": [s.to_otlp() for s in spans]}],
+        }]}
+
+    def _drain(self) -> None:
+        while True:
+            item = self._queue.get()
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            body = json.dumps(self.request(item), separators=(",", ":"))
+            try:
+                if self.path:
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    with self.path.open("a", encoding="utf-8") as f:
+                        f.write(body + "\n")
+                if self.endpoint:
+                    post = urllib.request.Request(f"{self.endpoint}/v1/traces", data=body.encode("utf-8"),
+                                                  headers={"Content-Type": "application/json"}, method="POST")
+                    urllib.request.urlopen(post, timeout=self.timeout).close()
+                self.exported += len(item)
+            except Exception:
+                self.failed += len(item)
+
+
+_exporter = None
+_configure_lock = threading.Lock()
+
+
+def configure(path=None, endpoint: str = None) -> Exporter:
+    """Start exporting spans (path and/or endpoint; defaults from the environment). None if neither is set."""
+    global _exporter
+    path = path or os.getenv(TRACE_FILE_ENV) or None
+    endpoint = endpoint if endpoint is not None else os.getenv(OTLP_ENDPOINT_ENV, "")
+    with _configure_lock:
+        if _exporter is not None:
+            _exporter.flush()
+        _exporter = Exporter(path, endpoint) if path or endpoint else None
+        return _exporter
+
+
+def exporter():
+    return _exporter
+
+
+def enabled() -> bool:
+    return _exporter is not None
+
+
+def current_span():
+    """The innermost open span on this thread (NO_SPAN outside any span or with tracing off)."""
+    return _current.get() or NO_SPAN
+
+
+@contextmanager
+def span(name: str, kind: int = INTERNAL, start_ns: int = None, **attributes):
+    """Time the block as a span (child of the current one). An exception marks it failed and propagates."""
+    if _exporter is None:
+        yield NO_SPAN
+        return
+    current = Span(name, _current.get(), kind, start_ns, **attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"[:500]
+        raise
+    finally:
+        _current.reset(token)
+        current.end_ns = time.time_ns()
+        exporter_ = _exporter
+        if exporter_ is not None:
+            exporter_.export(current)
+
+
+def _flush_at_exit() -> None:
+    if _exporter is not None:
+        _exporter.flush()
+
+
+atexit.register(_flush_at_exit)
+configure()
@@ -0,0 +1,309 @@
+"""
+Sequence validation.
+Checks a generated sequence against templates/sequence_structure.md and kb/voice.md
+right after generation, without any API calls.
+"""
+
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+
+from outbound_engine.kb import load_file
+
+# Core sequence layout from templates/sequence_structure.md: (day, channel) in order
+CORE_LAYOUT = [
+    (1, "Email"), (1, "LinkedIn"), (1, "Phone"),
+    (3, "Email"), (3, "Phone"),
+    (5, "Email"), (5, "Phone"),
+    (8, "Email"),
+    (9, "Phone"),
+    (11, "Email"),
+    (12, "Phone"),
+    (15, "Email"),
+]
+LINKEDIN_ONLY_DAYS = [1, 3, 5, 9]
+
+# Email threads: Day 1 -> Day 5 share a thread, Day 8 starts a new one that Day 11 continues
+SAME_THREAD_AS = {3: 1, 5: 1, 11: 8}
+NEW_THREAD_DAYS = {8}
+
+SEVERITY_ERROR = "error"
+SEVERITY_WARNING = "warning"
+
+# One pass over the text: every markdown heading or bold "Step N" line
+_HEADING = re.compile(r"^(?:#{1,6}[ \t]*(?P<heading>[^\n]*)|\*\*(?P<bold>Step[ \t]+\d+[^\n]*?)\*\*[^\n]*)$", re.MULTILINE)
+_STEP = re.compile(r"\bStep[ \t]+(\d+)\b", re.IGNORECASE)
+_DAY = re.compile(r"\bDay[ \t]+(\d+)\b", re.IGNORECASE)
+_LINKEDIN_ONLY = re.compile(r"linked[ \t]*in[ \t\-—–]*only", re.IGNORECASE)
+_TYPE_LINE = re.compile(r"^\*\*Type:?\*\*:?[ \t]*(?P<type>[^\n]+)$", re.IGNORECASE | re.MULTILINE)
+_SUBJECT_LINE = re.compile(r"^\**Subject(?:[ \t]+line)?:?\**:?[ \t]*(?P<subject>[^\n]*)$", re.IGNORECASE | re.MULTILINE)
+_LABEL = re.compile(r"^\**(?:Type|Subject(?:[ \t]+line)?|Body|Message|Opener|Voicemail|If voicemail)\**:?\**:?[ \t]*", re.IGNORECASE)
+_SALUTATION = re.compile(r"^(?:hi|hey|hello|dear)\b[^\n,]{0,40},?[ \t]*$|^\[First Name\],?[ \t]*$", re.IGNORECASE)
+_GREETING_PREFIX = re.compile(r"^(?:hi|hey|hello)\b[^\n,]{0,40},[ \t]*", re.IGNORECASE)
+_SIGNOFF = re.compile(r"^(?:best|thanks|cheers|regards|talk soon)\b[^\n]{0,20},?$|^\[Your Name\]$", re.IGNORECASE)
+_PLACEHOLDER = re.compile(r"\[[^\]]*\]")
+_REPLY_PREFIX = re.compile(r"^(?:re|fwd?):\s*", re.IGNORECASE)
+_SAME_THREAD_MARKER = re.compile(r"same thread|\(reply\)|no subject", re.IGNORECASE)
+_WORD = re.compile(r"[a-z0-9']+")
+_SOFT_CTA = re.compile(
+    r"\b(?:worth a|happy to|open to|let me know|up for|interested in|curious if|"
+    r"you know where to find me|feel free|would you|could we|can we|does that)\b",
+    re.IGNORECASE,
+)
+_BANNED_LINE = re.compile(r"^[-*\s]*\*\*NO\*\*:?[ \t]*(?P<items>[^\n]+)$", re.MULTILINE)
+_QUOTED = re.compile(r"[\"“]([^\"”]+)[\"”]")
+
+OPENER_WORDS = 5
+
+
+@dataclass(frozen=True)
+class Step:
+    """One parsed touchpoint in a generated sequence."""
+    number: int
+    day: int
+    channel: str
+    title: str
+    subject: str
+    body: str
+    linkedin_only: bool = False
+
+    @property
+    def label(self) -> str:
+        prefix = "LinkedIn-only step" if self.linkedin_only else "Step"
+        return f"{prefix} {self.number} (Day {self.day})"
+
+
+@dataclass(frozen=True)
+class Finding:
+    """A single validation problem. step is the Step.label it refers to, or "" for sequence-level findings."""
+    code: str
+    severity: str
+    message: str
+    step: str = ""
+
+
+@dataclass
+class ValidationReport:
+    """Result of validate_sequence: parsed steps plus findings other stages can act on."""
+    steps: list = field(default_factory=list)
+    findings: list = field(default_factory=list)
+
+    @property
+    def core_steps(self) -> list:
+        return [s for s in self.steps if not s.linkedin_only]
+
+    @property
+    def linkedin_only_steps(self) -> list:
+        return [s for s in self.steps if s.linkedin_only]
+
+    @property
+    def errors(self) -> list:
+        return [f for f in self.findings if f.severity == SEVERITY_ERROR]
+
+    @property
+    def warnings(self) -> list:
+        return [f for f in self.findings if f.severity == SEVERITY_WARNING]
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def codes(self) -> set:
+        return {f.code for f in self.findings}
+
+    def as_dict(self) -> dict:
+        return {
+            "ok": self.ok,
+            "core_steps": len(self.core_steps),
+            "linkedin_only_steps": len(self.linkedin_only_steps),
+            "findings": [
+                {"code": f.code, "severity": f.severity, "message": f.message, "step": f.step}
+                for f in self.findings
+            ],
+        }
+
+
+def _channel_for(title: str, body: str, linkedin_only: bool) -> str:
+    """Resolve Email / LinkedIn / Phone from the **Type:** line, then the header wording."""
+    if linkedin_only:
+        return "LinkedIn"
+    m = _TYPE_LINE.search(body)
+    text = (m.group("type") if m else title).lower()
+    if "linkedin" in text or "connect" in text:
+        return "LinkedIn"
+    if "call" in text or "phone" in text or "voicemail" in text:
+        return "Phone"
+    return "Email"
+
+
+def parse_steps(sequence: str) -> list:
+    """Split a generated sequence into Step records (core steps first in text order, then LinkedIn-only)."""
+    headings = list(_HEADING.finditer(sequence or ""))
+    steps = []
+    in_linkedin_only = False
+    for idx, m in enumerate(headings):
+        text = (m.group("heading") or m.group("bold") or "").strip().strip("*").strip()
+        step_m = _STEP.search(text)
+        if not step_m:
+            # Section heading: toggles the LinkedIn-only block on or off
+            if _LINKEDIN_ONLY.search(text):
+                in_linkedin_only = True
+            elif re.search(r"\bcore\b", text, re.IGNORECASE):
+                in_linkedin_only = False
+            continue
+        end = headings[idx + 1].start() if idx + 1 < len(headings) else len(sequence)
+        body = sequence[m.end():end].strip()
+        linkedin_only = in_linkedin_only or bool(_LINKEDIN_ONLY.search(text))
+        day_m = _DAY.search(text) or _DAY.search(body[:200])
+        subject_m = _SUBJECT_LINE.search(body)
+        steps.append(Step(
+            number=int(step_m.group(1)),
+            day=int(day_m.group(1)) if day_m else 0,
+            channel=_channel_for(text, body, linkedin_only),
+            title=text,
+            subject=subject_m.group("subject").strip().strip("*").strip() if subject_m else "",
+            body=body,
+            linkedin_only=linkedin_only,
+        ))
+    return steps
+
+
+def _message_lines(body: str) -> list:
+    """Body lines with labels, salutation, sign-off, P.S. and separators removed."""
+    lines = []
+    for raw in body.splitlines():
+        line = raw.strip()
+        if not line or line == "---" or _SUBJECT_LINE.match(line) or _TYPE_LINE.match(line):
+            continue
+        line = _LABEL.sub("", line).strip()
+        if not line or line.upper().startswith("P.S") or _SALUTATION.match(line) or _SIGNOFF.match(line):
+            continue
+        lines.append(line)
+    return lines
+
+
+def has_cta(body: str) -> bool:
+    """True if the message asks a question or closes with a soft statement CTA."""
+    text = " ".join(_message_lines(body))
+    return "?" in text or bool(_SOFT_CTA.search(text))
+
+
+def opener_of(body: str) -> str:
+    """Normalized first words of the message (placeholders dropped), used to spot repeated openers."""
+    lines = _message_lines(body)
+    if not lines:
+        return ""
+    first = _GREETING_PREFIX.sub("", lines[0])
+    words = _WORD.findall(_PLACEHOLDER.sub(" ", first).lower())
+    return " ".join(words[:OPENER_WORDS])
+
+
+def parse_banned_phrases(voice_text: str) -> tuple:
+    """Pull the quoted phrases from the **NO** line(s) of kb/voice.md Tone Constraints."""
+    phrases = []
+    for m in _BANNED_LINE.finditer(voice_text or ""):
+        phrases.extend(p.strip().strip(",.").lower() for p in _QUOTED.findall(m.group("items")))
+    return tuple(p for p in phrases if p)
+
+
+def default_banned_phrases(root: Path = None) -> tuple:
+    """Banned phrases from root's kb/voice.md (empty if the KB file is missing). Follows edits like load_file."""
+    return _parsed_banned_phrases(load_file("kb/voice.md", root))
+
+
+@lru_cache(maxsize=8)
+def _parsed_banned_phrases(voice_text: str) -> tuple:
+    return parse_banned_phrases(voice_text)
+
+
+@lru_cache(maxsize=32)
+def _banned_pattern(phrases: tuple):
+    if not phrases:
+        return None
+    return re.compile(r"\b(?:" + "|".join(re.escape(p) for p in sorted(phrases, key=len, reverse=True)) + r")\b", re.IGNORECASE)
+
+
+def _check_layout(report: ValidationReport) -> None:
+    core = report.core_steps
+    expected = Counter(CORE_LAYOUT)
+    actual = Counter((s.day, s.channel) for s in core)
+    for (day, channel), n in sorted((expected - actual).items()):
+        report.findings.append(Finding("missing_step", SEVERITY_ERROR, f"Core sequence is missing {n} {channel} step(s) on Day {day}."))
+    for (day, channel), n in sorted((actual - expected).items()):
+        report.findings.append(Finding("unexpected_step", SEVERITY_WARNING, f"Core sequence has {n} unexpected {channel} step(s) on Day {day}."))
+
+    li_days = Counter(s.day for s in report.linkedin_only_steps)
+    for day, n in sorted((Counter(LINKEDIN_ONLY_DAYS) - li_days).items()):
+        report.findings.append(Finding("missing_linkedin_only_step", SEVERITY_ERROR, f"LinkedIn-only sequence is missing its Day {day} step."))
+
+    for group in (core, report.linkedin_only_steps):
+        numbers = [s.number for s in group]
+        if numbers and numbers != list(range(1, len(numbers) + 1)):
+            report.findings.append(Finding("step_numbering", SEVERITY_WARNING, f"Step numbers are not sequential: {', '.join(map(str, numbers))}.", group[0].label))
+        for prev, cur in zip(group, group[1:]):
+            if cur.day < prev.day:
+                report.findings.append(Finding("day_order", SEVERITY_ERROR, f"Day {cur.day} comes after Day {prev.day}.", cur.label))
+        for s in group:
+            if not s.day:
+                report.findings.append(Finding("missing_day", SEVERITY_ERROR, "Step has no Day number.", s.label))
+
+
+def _check_threads(report: ValidationReport) -> None:
+    emails = {}
+    for s in report.core_steps:
+        if s.channel == "Email":
+            emails.setdefault(s.day, s)
+    for day, anchor_day in SAME_THREAD_AS.items():
+        step, anchor = emails.get(day), emails.get(anchor_day)
+        if not step or not anchor or not step.subject or _SAME_THREAD_MARKER.search(step.subject):
+            continue
+        subject = _REPLY_PREFIX.sub("", step.subject).strip().lower()
+        if subject != _REPLY_PREFIX.sub("", anchor.subject).strip().lower():
+            report.findings.append(Finding("thread_new_subject", SEVERITY_WARNING, f"Day {day} email should reply on the Day {anchor_day} thread but uses a new subject.", step.label))
+    first = emails.get(1)
+    for day in NEW_THREAD_DAYS:
+        step = emails.get(day)
+        if not step or not first:
+            continue
+        same = _REPLY_PREFIX.match(step.subject or "") or _SAME_THREAD_MARKER.search(step.subject or "") or (
+            step.subject and step.subject.strip().lower() == first.subject.strip().lower())
+        if same or not step.subject:
+            report.findings.append(Finding("thread_not_new", SEVERITY_WARNING, f"Day {day} email should start a new thread with its own subject.", step.label))
+
+
+def _check_copy(report: ValidationReport, banned) -> None:
+    openers = {}
+    for s in report.steps:
+        if s.channel == "Email" and s.subject and not _SAME_THREAD_MARKER.search(s.subject):
+            subject = _PLACEHOLDER.sub("", _REPLY_PREFIX.sub("", s.subject))
+            if subject != subject.lower():
+                report.findings.append(Finding("subject_case", SEVERITY_WARNING, f"Subject line should be all lowercase: \"{s.subject}\".", s.label))
+        if s.channel == "Phone":
+            continue
+        is_connect = s.channel == "LinkedIn" and not s.linkedin_only
+        if not is_connect and not has_cta(s.body):
+            report.findings.append(Finding("missing_cta", SEVERITY_WARNING, f"{s.channel} step does not end with a CTA.", s.label))
+        if banned is not None:
+            for hit in sorted({h.lower() for h in banned.findall(s.subject + "\n" + s.body)}):
+                report.findings.append(Finding("banned_phrase", SEVERITY_WARNING, f"Uses banned phrase \"{hit}\" (kb/voice.md).", s.label))
+        opener = opener_of(s.body)
+        if opener:
+            if opener in openers:
+                report.findings.append(Finding("repeated_opener", SEVERITY_WARNING, f"Opener \"{opener}…\" repeats {openers[opener]}.", s.label))
+            else:
+                openers[opener] = s.label
+
+
+def validate_sequence(sequence: str, banned_phrases=None, root: Path = None) -> ValidationReport:
+    """Validate a generated sequence. banned_phrases defaults to the **NO** list in root's kb/voice.md."""
+    report = ValidationReport(steps=parse_steps(sequence))
+    if not report.steps:
+        report.findings.append(Finding("no_steps", SEVERITY_ERROR, "No steps found (expected \"## Step N: ... (Day D)\" headers)."))
+        return report
+    phrases = default_banned_phrases(root) if banned_phrases is None else tuple(p.lower() for p in banned_phrases)
+    _check_layout(report)
+    _check_threads(report)
+    _check_copy(report, _banned_pattern(phrases))
+    return report
@@ -0,0 +1,120 @@
+"""
+Server warm-up.
+The first rep after a deploy used to pay for reading and parsing the KB, resolving the
+Gemini model and building the provider client. warm_up() does all of that once per
+process, before traffic arrives:
+
+    python -m outbound_engine serve --probe -- --server.port 8501
+
+runs it and only then starts Streamlit in the same process, so the port doesn't open (and
+/_stcore/health doesn't answer) until the caches are warm. The app also calls warm_up() on
+its first run, which returns immediately when serve already did the work.
+
+readiness() reports progress; with OUTBOUND_READY_FILE set (or ready_file passed), the same
+report is written there as JSON once warm-up finishes, for exec-style health checks
+(python -m outbound_engine ready). The file is removed when the process exits. Warm-up ends
+before Streamlit binds its port, so serve also records the port in the file and ready only
+passes once that port accepts connections.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from outbound_engine.config import PROVIDERS, READY_FILE_ENV, EngineConfig
+from outbound_engine.kb import KB_VERSION_DIRS, KB_VERSION_FILES, kb_version, load_file, load_persona_lanes
+from outbound_engine.providers import ProviderError, complete, get_client, resolved_model
+from outbound_engine.validation import default_banned_phrases
+
+PROBE_PROMPT = "Reply with the single word OK."
+
+_state = {"status": "cold", "started": None, "finished": None, "steps": {}, "errors": {}, "models": {}}
+_lock = threading.Lock()
+_done = threading.Event()
+
+
+def readiness() -> dict:
+    """{"ready", "status" (cold/warming/ready/failed), "started", "finished", "steps" (ms), "errors", "models"}."""
+    with _lock:
+        report = json.loads(json.dumps(_state))
+    report["ready"] = report["status"] == "ready"
+    return report
+
+
+def _step(name: str, fn):
+    start = time.perf_counter()
+    try:
+        result = fn()
+    except Exception as e:
+        with _lock:
+            _state["errors"][name] = str(e)
+        result = None
+    with _lock:
+        _state["steps"][name] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+def _load_kb(root: Path) -> int:
+    files = list(KB_VERSION_FILES)
+    for folder in KB_VERSION_DIRS:
+        files.extend(path.relative_to(root).as_posix() for path in sorted((root / folder).glob("*.md")))
+    return sum(len(load_file(rel, root)) for rel in files)
+
+
+def _build_clients(config: EngineConfig) -> None:
+    for provider in PROVIDERS:
+        if config.api_key(provider) and get_client(config, provider) is not None:
+            with _lock:
+                _state["models"][provider] = resolved_model(config, provider)
+
+
+def _probe(config: EngineConfig) -> None:
+    if not config.has_api_key:
+        raise ProviderError(f"{config.provider_name} API key not configured")
+    complete(config, PROBE_PROMPT, temperature=0, max_tokens=5)
+
+
+def _write_ready_file(path: Path, port: int = None) -> None:
+    report = readiness()
+    if port:
+        report["port"] = port
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    tmp.replace(path)
+    atexit.register(path.unlink, missing_ok=True)
+
+
+def warm_up(config: EngineConfig = None, probe: bool = False, ready_file: Path = None, port: int = None) -> dict:
+    """Preload the KB, templates and persona lanes, resolve provider models, build clients and
+    optionally send one tiny probe request. Runs once per process; later (or concurrent) calls
+    wait for the first and return its readiness(). Failed steps are reported, not raised.
+    port: where the server is about to listen, recorded in the ready file for the health check."""
+    with _lock:
+        first = _state["status"] == "cold"
+        if first:
+            _state.update(status="warming", started=time.time())
+    if not first:
+        _done.wait()
+        return readiness()
+
+    config = config or EngineConfig.from_env()
+    root = Path(config.root)
+    _step("kb", lambda: _load_kb(root))
+    _step("persona_lanes", lambda: load_persona_lanes(root))
+    _step("banned_phrases", lambda: default_banned_phrases(root))
+    _step("kb_version", lambda: kb_version(root))
+    _step("clients", lambda: _build_clients(config))
+    if probe:
+        _step("probe", lambda: _probe(config))
+    with _lock:
+        _state.update(status="failed" if _state["errors"] else "ready", finished=time.time())
+    _done.set()
+
+    ready_file = ready_file or os.getenv(READY_FILE_ENV)
+    if ready_file:
+        _write_ready_file(Path(ready_file), port)
+    return readiness()
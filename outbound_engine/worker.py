@@ -0,0 +1,149 @@
+"""
+Shared local worker.
+Several Streamlit frontends on one machine (one per team / app version) used to call the
+providers independently, so rate limits and caches were per process. With
+OUTBOUND_WORKER_STORE pointing at a SQLite file, a frontend's stage graph queues its
+provider-backed stages there instead, and one worker process owns the calls:
+
+    python -m outbound_engine worker --store /srv/outbound/worker.sqlite3 --threads 4
+
+The worker holds the API keys, applies one request budget per provider across every
+frontend, and writes outputs to the file's memo, so a stage one frontend paid for is a
+cache hit for all of them. Requests carry the frontend's KB root and model, so frontends
+on different app versions still get prompts from their own templates (and their own
+node keys).
+"""
+
+import threading
+import time
+from pathlib import Path
+
+from outbound_engine.config import DEFAULT_REQUESTS_PER_MINUTE, EngineConfig
+from outbound_engine.graph import SingleFlight, StageGraph, csv_key, run_stage
+from outbound_engine.jobstore import DONE, FAILED, JobStore
+from outbound_engine.providers import CallCancelled, ProviderError, ProviderTimeout, current_cancel_event
+from outbound_engine.tracing import span
+
+
+class WorkerGraph(StageGraph):
+    """StageGraph whose provider calls run in the shared worker. store is both the call queue and the memo."""
+
+    def __init__(self, config: EngineConfig, store: JobStore, notify=None, poll_interval: float = 0.25,
+                 near_duplicates=None):
+        super().__init__(config, memo=store, notify=notify, near_duplicates=near_duplicates)
+        self.store = store
+        self.poll_interval = poll_interval
+
+    def _call(self, stage: str, key: str, request: dict) -> str:
+        settings = {"provider": self.config.provider, "openai_model": self.config.openai_model,
+                    "root": str(self.config.root), "request_timeout": self.config.request_timeout}
+        call_id = self.store.submit_call(key, stage, {**request, "config": settings})
+        cancel = current_cancel_event()
+        # Queueing behind other frontends, the call itself and one rate-limit retry
+        deadline = time.monotonic() + 3 * self.config.request_timeout
+        with span("worker.wait", call_id=call_id, stage=stage):
+            while True:
+                call = self.store.call(call_id)
+                if call["status"] == DONE:
+                    return call["output"]
+                if call["status"] == FAILED:
+                    raise ProviderError(call["error"])
+                if cancel is not None and cancel.is_set():
+                    self.store.cancel_call(call_id)
+                    raise CallCancelled("Cancelled")
+                if time.monotonic() > deadline:
+                    self.store.cancel_call(call_id)
+                    raise ProviderTimeout(f"Shared worker gave no result within {3 * self.config.request_timeout:g}s")
+                time.sleep(self.poll_interval)
+
+    def _produce(self, stage: str, key: str, request: dict) -> str:
+        try:
+            return self._call(stage, key, request)
+        except CallCancelled:
+            raise
+        except ProviderError as e:
+            # The worker can't reach this session's UI; report here like a local call would
+            if self.notify:
+                self.notify("api_error", e.raw)
+                self.notify("error", f"⚠️ **API Error** (shared worker): {str(e)[:500]}")
+            raise
+
+    def _csv_client(self):
+        return None  # the worker holds the keys
+
+    def _csv_text(self, sequence: str, client) -> str:
+        return self._call("csv", csv_key(sequence, self.config), {"sequence": sequence})
+
+
+class Worker:
+    """Claims queued stage calls from store and runs them on `threads` threads."""
+
+    def __init__(self, store: JobStore, threads: int = 4, requests_per_minute: float = None,
+                 poll_interval: float = 0.5, log=None):
+        self.store = store
+        self.threads = threads
+        self.requests_per_minute = requests_per_minute
+        self.poll_interval = poll_interval
+        self.log = log
+        self.completed = 0
+        self.failed = 0
+        self._in_flight = SingleFlight()  # not the frontend registry: a graph in this process may be waiting on us
+        self._lock = threading.Lock()
+
+    def config_for(self, request: dict) -> EngineConfig:
+        settings = request.get("config") or {}
+        config = EngineConfig.from_env(
+            provider=settings.get("provider"),
+            openai_model=settings.get("openai_model"),
+            root=Path(settings["root"]) if settings.get("root") else None,
+            request_timeout=settings.get("request_timeout"),
+            demo_fallback=False,
+        )
+        rpm = self.requests_per_minute
+        config.requests_per_minute = rpm if rpm is not None else DEFAULT_REQUESTS_PER_MINUTE.get(config.provider, 0)
+        return config
+
+    def run_call(self, call: dict) -> None:
+        started = time.monotonic()
+        try:
+            # Frontends in other processes may have queued the same node; run it once
+            with span("worker.call", call_id=call["call_id"], stage=call["stage"]):
+                output, _ = self._in_flight.do(call["node_key"], lambda: run_stage(call["stage"], call["request"],
+                                                                             self.config_for(call["request"])))
+        except Exception as e:
+            self.store.fail_call(call["call_id"], getattr(e, "raw", None) or str(e))
+            with self._lock:
+                self.failed += 1
+            if self.log:
+                self.log(f"call {call['call_id']} {call['stage']}: FAILED ({e})")
+            return
+        # CSV text is memoized by the frontend once it parses
+        if call["stage"] != "csv":
+            self.store.put(call["node_key"], output, call["stage"])
+        self.store.finish_call(call["call_id"], output)
+        with self._lock:
+            self.completed += 1
+        if self.log:
+            self.log(f"call {call['call_id']} {call['stage']}: ok in {time.monotonic() - started:.1f}s")
+
+    def _loop(self, stop: threading.Event) -> None:
+        while not stop.is_set():
+            call = self.store.claim_call()
+            if call is None:
+                stop.wait(self.poll_interval)
+                continue
+            self.run_call(call)
+
+    def serve(self, stop: threading.Event = None) -> None:
+        """Run until stop is set (or forever). Blocks."""
+        stop = stop or threading.Event()
+        threads = [threading.Thread(target=self._loop, args=(stop,), name=f"worker-{i}", daemon=True)
+                   for i in range(self.threads)]
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=1.0)
+        except KeyboardInterrupt:
+            stop.set()
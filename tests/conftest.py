@@ -0,0 +1,128 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# A sequence that follows templates/sequence_structure.md and kb/voice.md: 12 core steps, 4 LinkedIn-only steps
+GOOD_SEQUENCE = """# Outbound Sequence — Platform Leaders
+
+## Core Sequence
+
+## Step 1: Email (Day 1)
+**Type:** Email
+**Subject:** platform team at [Company]
+
+Hi [First Name],
+
+Saw the platform engineering roles you're hiring for. Teams at that stage usually hit review bottlenecks first.
+
+Worth comparing notes on how others handled it?
+
+Best,
+[Your Name]
+
+---
+
+## Step 2: LinkedIn Connect (Day 1)
+**Type:** LinkedIn
+**Message:** Hi [First Name], following your platform work at [Company].
+
+## Step 3: Call (Day 1)
+**Type:** Phone
+**Opener:** Hi [First Name], this is [Your Name] from Cursor.
+
+## Step 4: Email (Day 3)
+**Type:** Email
+**Subject:** re: platform team at [Company]
+
+Hi [First Name],
+
+Adding one data point: onboarding time dropped by half for a similar team once reviews sped up.
+
+Open to a short call next week?
+
+## Step 5: Call (Day 3)
+**Type:** Phone
+**Opener:** Quick follow-up on my note about onboarding.
+
+## Step 6: Email (Day 5)
+**Type:** Email
+**Subject:** re: platform team at [Company]
+
+Hi [First Name],
+
+Most leaders I talk to measure this through cycle time on pull requests.
+
+Curious if that is on your radar this quarter?
+
+## Step 7: Call (Day 5)
+**Type:** Phone
+**Opener:** Calling about pull request cycle time.
+
+## Step 8: Email (Day 8)
+**Type:** Email
+**Subject:** cycle time at [Company]
+
+Hi [First Name],
+
+Different angle: your job posts mention a monorepo migration, which is where context-aware tooling pays off.
+
+Would a ten minute walkthrough help?
+
+## Step 9: Call (Day 9)
+**Type:** Phone
+**Opener:** Following up on the monorepo note.
+
+## Step 10: Email (Day 11)
+**Type:** Email
+**Subject:** re: cycle time at [Company]
+
+Hi [First Name],
+
+A peer team shared their migration checklist with us, and I can pass it along.
+
+Want me to send it over?
+
+## Step 11: Call (Day 12)
+**Type:** Phone
+**Opener:** Last call about the migration checklist.
+
+## Step 12: Email (Day 15)
+**Type:** Email
+**Subject:** closing the loop
+
+Hi [First Name],
+
+I'll stop reaching out for now, since timing clearly isn't right.
+
+If priorities shift, you know where to find me.
+
+## LinkedIn-Only Sequence
+
+## Step 1: Connection Request (Day 1)
+**Message:** Hi [First Name], I work with platform leaders on developer productivity. Open to connecting?
+
+## Step 2: Message (Day 3)
+**Message:** Thanks for connecting. Teams scaling platform work often hit review bottlenecks first. Is that true for you?
+
+## Step 3: Message (Day 5)
+**Message:** Sharing a short case study on onboarding time. Happy to send it if useful?
+
+## Step 4: Message (Day 9)
+**Message:** Last note from me here. If developer tooling comes up this year, let me know.
+"""
+
+
+@pytest.fixture(autouse=True)
+def _isolated_history(tmp_path, monkeypatch):
+    """Keep runs the code under test records out of the repo's run_history.sqlite3."""
+    monkeypatch.setenv("OUTBOUND_HISTORY", str(tmp_path / "history.sqlite3"))
+
+
+@pytest.fixture
+def good_sequence() -> str:
+    return GOOD_SEQUENCE
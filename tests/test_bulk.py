@@ -0,0 +1,144 @@
+import json
+
+import pytest
+from openai import OpenAI
+
+from outbound_engine import bulk, cli
+from outbound_engine.batch import Account, plan_accounts
+from outbound_engine.config import EngineConfig
+from outbound_engine.graph import handoff_key, hypothesis_key, sequence_key
+from outbound_engine.jobstore import DONE, JobStore
+from outbound_engine.openai_batch_mock import MockBatchServer, default_responder
+
+ACCOUNTS = [
+    Account(f"account-{i}", {"company_info": f"Account {i} runs a {kind} platform with {100 * i} engineers."}, {})
+    for i, kind in enumerate(("payments", "logistics", "retail"), start=1)
+]
+
+
+def config(server) -> EngineConfig:
+    return EngineConfig(provider="openai", openai_api_key="test", openai_base_url=server.base_url, demo_fallback=False)
+
+
+def client(server) -> OpenAI:
+    return OpenAI(api_key="test", base_url=server.base_url)
+
+
+def stage_keys(cfg: EngineConfig, store: JobStore) -> list:
+    """Node keys of every stage a live run would need, in the order it needs them."""
+    keys = []
+    for account, lanes in plan_accounts(ACCOUNTS, cfg, ["1"]):
+        key = hypothesis_key(account.research_data, cfg)
+        keys.append(key)
+        hypothesis = store.get(key)
+        if hypothesis is not None:
+            keys.extend(sequence_key(lane, hypothesis, account.prospect_info, "", cfg) for lane in lanes)
+            keys.append(handoff_key(hypothesis, cfg))
+    return keys
+
+
+@pytest.fixture
+def server():
+    with MockBatchServer(polls_to_complete=2) as server:
+        yield server
+
+
+def test_submit_poll_and_ingest(server, tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    cfg = config(server)
+    report = bulk.run_bulk(ACCOUNTS, cfg, store, tmp_path, client=client(server), default_lanes=["1"], poll_interval=0)
+
+    assert report.failed == 0
+    assert report.submitted == report.ingested == 9  # 3 hypotheses, then 3 sequences + 3 handoffs
+    assert len(report.batches) == 2
+    assert all(store.get(key) is not None for key in stage_keys(cfg, store))
+    assert store.open_bulk_batches() == []
+
+
+def test_failed_lines_are_counted_and_not_stored(server, tmp_path):
+    def responder(body):
+        if "Account 2 runs" in body["messages"][-1]["content"]:
+            raise RuntimeError("model overloaded")
+        return default_responder(body)
+
+    server.store.responder = responder
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    cfg = config(server)
+    report = bulk.run_bulk(ACCOUNTS, cfg, store, tmp_path, client=client(server), default_lanes=["1"], poll_interval=0)
+
+    assert report.failed == 1
+    assert report.submitted == 7  # no sequence or handoff for the account without a hypothesis
+    assert report.ingested == 6
+    assert store.get(hypothesis_key(ACCOUNTS[1].research_data, cfg)) is None
+
+
+def test_files_split_at_the_request_limit(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(bulk, "MAX_REQUESTS_PER_FILE", 2)
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    report = bulk.run_bulk(ACCOUNTS, config(server), store, tmp_path, client=client(server), default_lanes=["1"],
+                           poll_interval=0)
+
+    assert report.ingested == 9 and report.failed == 0
+    assert len(report.batches) == 2 + 3  # hypotheses in files of 2 + 1, downstream in 2 + 2 + 2
+    for path in (tmp_path / "bulk").glob("*.jsonl"):
+        assert len(path.read_text(encoding="utf-8").splitlines()) <= 2
+
+
+def test_files_split_at_the_byte_limit(tmp_path, monkeypatch):
+    cfg = EngineConfig(provider="openai", openai_api_key="test")
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    requests = bulk.render_hypothesis_requests(plan_accounts(ACCOUNTS, cfg, ["1"]), cfg, store)
+    line_bytes = [len((json.dumps(r, ensure_ascii=False) + "\n").encode("utf-8")) for _, r in requests.values()]
+    monkeypatch.setattr(bulk, "MAX_FILE_BYTES", max(line_bytes))  # any two lines together are over the limit
+
+    files = bulk.write_batch_files(requests, tmp_path / "bulk", "hypothesis")
+    assert [len(stages) for _, stages in files] == [1, 1, 1]
+    assert sorted(k for _, stages in files for k in stages) == sorted(requests)
+    for path, _ in files:
+        assert path.stat().st_size <= bulk.MAX_FILE_BYTES
+
+
+def test_rerun_resumes_submitted_batches_instead_of_resubmitting(server, tmp_path, monkeypatch):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    cfg = config(server)
+
+    def interrupted(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(bulk, "wait", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        bulk.run_bulk(ACCOUNTS, cfg, store, tmp_path, client=client(server), default_lanes=["1"], poll_interval=0)
+    [open_batch] = store.open_bulk_batches()
+    assert len(server.store.batches) == 1
+
+    monkeypatch.undo()
+    report = bulk.run_bulk(ACCOUNTS, cfg, store, tmp_path, client=client(server), default_lanes=["1"], poll_interval=0)
+    assert report.batches[0] == open_batch["batch_id"]
+    assert len(server.store.batches) == 2  # the resumed hypothesis batch + one downstream batch, nothing resubmitted
+    assert report.ingested == 9 and report.failed == 0
+
+
+def test_command_sends_live_follow_up_calls_to_the_base_url(server, tmp_path, monkeypatch):
+    seen = set()
+
+    def responder(body):
+        prompt = body["messages"][-1]["content"]
+        if "Account 3 runs" in prompt and prompt not in seen:  # fails in the batch, succeeds live
+            seen.add(prompt)
+            raise RuntimeError("model overloaded")
+        return default_responder(body)
+
+    server.store.responder = responder
+    accounts = tmp_path / "accounts.jsonl"
+    accounts.write_text("".join(json.dumps({"id": a.account_id, **a.research_data}) + "\n" for a in ACCOUNTS),
+                        encoding="utf-8")
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.delenv("OPENAI_BASE_URL", raising=False)
+
+    code = cli.main(["bulk", str(accounts), "--out", str(tmp_path / "out"), "--lanes", "1", "--poll", "0",
+                     "--base-url", server.base_url])
+
+    assert code == 0
+    assert server.store.live_calls == 3  # account-3's hypothesis, sequence and handoff
+    store = JobStore(tmp_path / "out" / "jobs.sqlite3")
+    assert {job["status"] for job in store.jobs()} == {DONE}
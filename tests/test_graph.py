@@ -0,0 +1,60 @@
+import threading
+
+from outbound_engine.config import EngineConfig
+from outbound_engine.graph import SingleFlight, hypothesis_key, in_flight_key
+
+RESEARCH = {"company_info": "Acme builds logistics software with 800 engineers."}
+
+
+def test_in_flight_key_separates_credentials():
+    alice = EngineConfig(provider="openai", openai_api_key="sk-alice")
+    bob = EngineConfig(provider="openai", openai_api_key="sk-bob")
+    key = hypothesis_key(RESEARCH, alice)
+    assert key == hypothesis_key(RESEARCH, bob)  # the memoized output is the same...
+    assert in_flight_key(key, alice) != in_flight_key(key, bob)  # ...but a call is only shared within one account
+    assert "sk-alice" not in in_flight_key(key, alice)
+
+
+def test_waiters_share_the_leaders_result():
+    flight = SingleFlight()
+    started, joined, release = threading.Event(), threading.Event(), threading.Event()
+    wait = flight._wait
+    flight._wait = lambda future: (joined.set(), wait(future))[1]
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "output"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", slow)))
+    leader.start()
+    started.wait(5)
+    waiter = threading.Thread(target=lambda: results.append(flight.do("k", slow)))
+    waiter.start()
+    joined.wait(5)
+    release.set()
+    leader.join(5)
+    waiter.join(5)
+
+    assert len(calls) == 1
+    assert sorted(results) == [("output", False), ("output", True)]
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_csv_frames_notifies_from_the_calling_thread(good_sequence):
+    from test_parsing import core_csv
+
+    from outbound_engine.graph import MemoryMemo, StageGraph, csv_key
+
+    config = EngineConfig(provider="openai", openai_api_key="test")
+    memo = MemoryMemo()
+    memo.put(csv_key(good_sequence, config), core_csv(good_sequence, drop=2), "csv")  # two steps short
+    threads = []
+    graph = StageGraph(config, memo=memo, notify=lambda level, message: threads.append(threading.get_ident()))
+
+    df, failures = graph.csv_frames({"1": {"name": "Lane", "content": good_sequence}}, {})
+    assert failures == {} and len(df) == 10
+    assert threads and set(threads) == {threading.get_ident()}
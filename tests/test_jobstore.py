@@ -0,0 +1,117 @@
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from outbound_engine.batch import Account, run_batch
+from outbound_engine.config import EngineConfig
+from outbound_engine.jobstore import DONE, PENDING, RUNNING, JobStore
+
+from conftest import ROOT
+
+RESEARCH = {"company_info": "Acme builds logistics software with 800 engineers."}
+
+
+def accounts(*ids) -> list:
+    return [Account(account_id, dict(RESEARCH), {}) for account_id in ids]
+
+
+def enqueue(store: JobStore, *ids) -> None:
+    for account_id in ids:
+        store.enqueue(account_id, {"research_data": RESEARCH})
+
+
+def run(store: JobStore, tmp_path, *ids, **kwargs) -> list:
+    return run_batch(accounts(*ids), EngineConfig(demo_mode=True), tmp_path / "out", default_lanes=["1"],
+                     workers=1, store=store, **kwargs)
+
+
+def test_rerun_takes_over_from_a_crashed_process(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    enqueue(JobStore(path), "acme")
+    crash = f"import os; from outbound_engine.jobstore import JobStore; JobStore({str(path)!r}).claim('acme'); os._exit(1)"
+    subprocess.run([sys.executable, "-c", crash], cwd=ROOT, check=False)
+    store = JobStore(path)
+    assert store.job("acme")["status"] == RUNNING
+
+    [result] = run(store, tmp_path, "acme")
+    assert result.ok and not result.skipped
+    assert store.job("acme")["status"] == DONE
+
+
+def test_rerun_takes_over_from_a_closed_store_in_this_process(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    abandoned = JobStore(path)
+    enqueue(abandoned, "acme")
+    abandoned.claim("acme")
+    abandoned.close()
+
+    [result] = run(JobStore(path), tmp_path, "acme")
+    assert result.ok and not result.skipped
+
+
+def test_live_owner_keeps_its_claim(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    first = JobStore(path)
+    enqueue(first, "acme")
+    assert first.claim("acme") is not None
+    assert JobStore(path).claim("acme") is None
+
+
+def test_expired_owner_cannot_overwrite_the_new_owner(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    slow = JobStore(path)
+    enqueue(slow, "acme")
+    slow.claim("acme")
+    takeover = JobStore(path, lease_seconds=0)
+    assert takeover.claim("acme") is not None
+    assert takeover.finish("acme", {"ok": True})
+    assert not slow.fail("acme", "late failure")
+    job = takeover.job("acme")
+    assert job["status"] == DONE and job["error"] == ""
+
+
+def test_release_returns_running_jobs_to_pending(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    enqueue(store, "acme", "globex")
+    store.claim("acme")
+    assert store.release() == 1
+    assert store.job("acme")["status"] == PENDING
+    assert store.job("globex")["status"] == PENDING
+
+
+def test_interrupted_batch_resumes(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    store = JobStore(path)
+
+    def interrupt(result):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        run(store, tmp_path, "acme", "globex", "initech", on_result=interrupt)
+    for thread in threading.enumerate():
+        if thread.name.startswith("ThreadPoolExecutor"):
+            thread.join(10)
+    assert store.counts().get(RUNNING, 0) == 0
+
+    results = run(JobStore(path), tmp_path, "acme", "globex", "initech")
+    assert [(r.account_id, r.ok) for r in results] == [("acme", True), ("globex", True), ("initech", True)]
+
+
+def test_history_failure_does_not_fail_the_batch(tmp_path):
+    import sqlite3
+
+    from outbound_engine.bench import FakeProvider, FakeSettings
+
+    class LockedHistory:
+        def save(self, *args, **kwargs):
+            raise sqlite3.OperationalError("database is locked")
+
+    fake = FakeProvider(FakeSettings(latency_ms=0, latency_sigma=0))
+    config = EngineConfig(provider="openai", openai_api_key="fake", client_factory=fake.client, demo_fallback=False)
+    results = run_batch(accounts("acme", "globex"), config, tmp_path / "out", default_lanes=["1"], workers=1,
+                        history=LockedHistory())
+    assert [r.ok for r in results] == [True, True]
+    assert all("database is locked" in r.events[-1]["message"] for r in results)
+    assert fake.calls == 6  # hypothesis, sequence and handoff per account
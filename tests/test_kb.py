@@ -0,0 +1,30 @@
+from outbound_engine.kb import load_persona_lanes, parse_persona_lanes
+
+LANES = """# Persona lanes
+
+## 1. Big Picture Leaders
+**Example titles:** VP of Engineering, CTO
+
+**Hook:** How do we ship faster?
+
+**Cursor play**: Force multiplier.
+
+---
+
+## 2. Platform Owners
+**Example titles**: Head of Platform
+**Hook:** Tools are too shallow.
+"""
+
+
+def test_labels_parse_with_the_colon_inside_or_after_the_bold():
+    first, second = parse_persona_lanes(LANES)
+    assert first == {"id": "1", "name": "Big Picture Leaders", "example_titles": "VP of Engineering, CTO",
+                     "hook": "How do we ship faster?", "cursor_play": "Force multiplier.", "peer_pivot": ""}
+    assert (second["example_titles"], second["hook"]) == ("Head of Platform", "Tools are too shallow.")
+
+
+def test_bundled_lanes_have_titles_hook_and_play():
+    lanes = load_persona_lanes()
+    assert lanes
+    assert all(lane["example_titles"] and lane["hook"] and lane["cursor_play"] for lane in lanes)
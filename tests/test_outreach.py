@@ -0,0 +1,122 @@
+import pytest
+
+from outbound_engine import outreach
+from outbound_engine.outreach import OutreachClient, OutreachConfig, sync_to_outreach
+from outbound_engine.outreach_mock import MockOutreachServer
+
+STEPS = [(1, 1, "Email"), (2, 1, "LinkedIn"), (3, 1, "Phone"), (4, 3, "Email")]
+PROSPECTS = [
+    ("Ada", "Lovelace", "ada@example.com"),
+    ("Grace", "Hopper", "grace@example.com"),
+    ("Alan", "Turing", "alan@example.com"),
+    ("Edsger", "Dijkstra", "edsger@example.com"),
+    ("Placeholder", "Row", "[email]"),
+]
+
+
+def rows() -> list:
+    """CSV records like parse_sequence_to_csv: every step repeated for every prospect."""
+    return [
+        {"step_number": n, "step_day": day, "step_type": kind, "subject": f"subject {n}", "body": f"body {n}\nline two",
+         "first_name": first, "last_name": last, "email": email, "company": "Example", "title": "VP Engineering"}
+        for first, last, email in PROSPECTS
+        for n, day, kind in STEPS
+    ]
+
+
+@pytest.fixture
+def server():
+    with MockOutreachServer() as server:
+        yield server
+
+
+def config(server, **overrides) -> OutreachConfig:
+    return OutreachConfig(access_token="test", base_url=server.base_url, backoff=0.01, **overrides)
+
+
+def counts(server) -> dict:
+    return {kind: len(server.resources(kind))
+            for kind in ("sequences", "sequenceSteps", "templates", "sequenceTemplates", "prospects")}
+
+
+def test_push_twice_creates_nothing_new(server):
+    first = sync_to_outreach(rows(), config(server), "Platform Leaders")
+    assert first.errors == []
+    assert first.created == {"sequences": 1, "sequenceSteps": 4, "prospects": 4}
+    assert first.skipped == len(STEPS)  # the placeholder email's rows
+    after_first = counts(server)
+    assert after_first == {"sequences": 1, "sequenceSteps": 4, "templates": 2, "sequenceTemplates": 2, "prospects": 4}
+
+    second = sync_to_outreach(rows(), config(server), "Platform Leaders")
+    assert second.errors == []
+    assert second.sequence_id == first.sequence_id
+    assert second.created == {}
+    assert second.updated == {"sequenceSteps": 4, "prospects": 4}
+    assert counts(server) == after_first
+
+
+def test_edited_email_text_is_pushed_to_the_existing_template(server):
+    sync_to_outreach(rows(), config(server), "Platform Leaders")
+    edited = [dict(row, subject="EDITED", body="new body") if row["step_number"] == 1 else row for row in rows()]
+
+    result = sync_to_outreach(edited, config(server), "Platform Leaders")
+    assert result.errors == []
+    templates = {t["attributes"]["name"].rsplit(" ", 1)[-1]: t["attributes"] for t in server.resources("templates")}
+    assert len(templates) == 2  # updated in place, not duplicated
+    assert templates["1"]["subject"] == "EDITED" and templates["1"]["bodyHtml"] == "new body"
+    assert templates["4"]["subject"] == "subject 4"
+
+
+def test_repush_adds_a_template_that_failed_before(server):
+    server.reject_next_creates("templates")
+    first = sync_to_outreach(rows(), config(server), "Platform Leaders")
+    assert len(first.errors) == 1 and first.errors[0].startswith("sequenceSteps:")
+    assert len(server.resources("sequenceTemplates")) == 1
+
+    second = sync_to_outreach(rows(), config(server), "Platform Leaders")
+    assert second.errors == []
+    assert second.updated["sequenceSteps"] == 4
+    assert len(server.resources("templates")) == len(server.resources("sequenceTemplates")) == 2
+
+
+def test_lost_write_responses_are_not_duplicated(server):
+    server.fail_next_writes(3)
+    result = sync_to_outreach(rows(), config(server), "Platform Leaders")
+    assert result.errors == []
+    assert counts(server) == {"sequences": 1, "sequenceSteps": 4, "templates": 2, "sequenceTemplates": 2, "prospects": 4}
+
+
+def test_429_waits_for_retry_after(server, monkeypatch):
+    delays = []
+    monkeypatch.setattr(outreach.time, "sleep", delays.append)
+    server.throttle_next(2, retry_after="7")
+    with OutreachClient(config(server)) as client:
+        doc = client.request("GET", "/prospects")
+    assert doc["data"] == []
+    assert delays == [7.0, 7.0]  # Retry-After wins over the exponential backoff
+    assert client.requests_sent == 3
+
+
+def test_429_gives_up_after_max_retries(server, monkeypatch):
+    monkeypatch.setattr(outreach.time, "sleep", lambda seconds: None)
+    server.throttle_next(10, retry_after="1")
+    with OutreachClient(config(server, max_retries=2)) as client, pytest.raises(outreach.OutreachError) as raised:
+        client.request("GET", "/prospects")
+    assert raised.value.status == 429
+
+
+def test_prospect_lookups_are_batched(server):
+    sync_to_outreach(rows(), config(server, batch_size=3), "Platform Leaders")
+    lookups = [r for r in server.store.requests if r == ("GET", "prospects")]
+    assert len(lookups) == 2  # four real emails in batches of three
+
+
+def test_row_errors_do_not_abort_the_push(server):
+    server.reject_emails("grace@example.com")
+    result = sync_to_outreach(rows(), config(server), "Platform Leaders")
+    assert len(result.errors) == 1
+    assert result.errors[0].startswith("prospects:") and "422" in result.errors[0]
+    assert result.created["prospects"] == 3
+    assert result.created["sequenceSteps"] == 4
+    emails = {p["attributes"]["emails"][0] for p in server.resources("prospects")}
+    assert emails == {"ada@example.com", "alan@example.com", "edsger@example.com"}
@@ -0,0 +1,23 @@
+from outbound_engine.parsing import csv_text_to_dataframe
+from outbound_engine.validation import parse_steps
+
+
+def core_csv(sequence: str, drop: int = 0) -> str:
+    rows = ["step_number,step_day,step_type,subject,body"]
+    core = [s for s in parse_steps(sequence) if not s.linkedin_only]
+    for step in core[:len(core) - drop]:
+        rows.append(f'{step.number},{step.day},{step.channel},"{step.subject}","body of step {step.number}"')
+    return "\n".join(rows)
+
+
+def test_full_core_csv_has_no_coverage_warning(good_sequence):
+    warnings = []
+    df = csv_text_to_dataframe(core_csv(good_sequence), good_sequence, {}, notify=lambda level, msg: warnings.append(msg))
+    assert len(df) == 12
+    assert warnings == []  # the four LinkedIn-only steps are not expected in the CSV
+
+
+def test_short_csv_warns_about_missing_steps(good_sequence):
+    warnings = []
+    csv_text_to_dataframe(core_csv(good_sequence, drop=2), good_sequence, {}, notify=lambda level, msg: warnings.append(msg))
+    assert any("Missing steps: 11, 12" in w for w in warnings)
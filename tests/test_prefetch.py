@@ -0,0 +1,32 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from outbound_engine.bench import FakeProvider, FakeSettings
+from outbound_engine.config import EngineConfig
+from outbound_engine.graph import StageGraph
+from outbound_engine.kb import load_persona_lanes
+from outbound_engine.prefetch import Prefetcher
+
+HYPOTHESIS = "## Hypothesis\nThe VP of Engineering and platform leaders want faster code review."
+
+
+def prefetch_then_use(error_rate: float):
+    fake = FakeProvider(FakeSettings(latency_ms=0, latency_sigma=0, error_rate=error_rate))
+    graph = StageGraph(EngineConfig(provider="openai", openai_api_key="fake", client_factory=fake.client,
+                                    rate_limit_wait=0.0))
+    lanes = load_persona_lanes()
+    prefetcher = Prefetcher(max_lanes=1)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        [lane] = prefetcher.start(graph, executor, HYPOTHESIS, ["VP of Engineering"], lanes, {})
+        prefetcher.wait(lane["id"])
+    return prefetcher, prefetcher.record_use(graph, lane, HYPOTHESIS, {})
+
+
+def test_successful_prefetch_counts_as_a_hit():
+    prefetcher, hit = prefetch_then_use(error_rate=0.0)
+    assert hit and prefetcher.hit_rate == 1.0
+
+
+def test_failed_prefetch_is_not_a_hit():
+    prefetcher, hit = prefetch_then_use(error_rate=1.0)  # every call fails; the UI graph falls back to demo text
+    assert not hit
+    assert prefetcher.stats()["prefetched"] == 1 and prefetcher.hit_rate == 0.0
@@ -0,0 +1,34 @@
+import json
+import socket
+
+from outbound_engine import cli
+
+
+def write_ready(path, port):
+    path.write_text(json.dumps({"ready": True, "status": "ready", "port": port}), encoding="utf-8")
+
+
+def test_ready_waits_for_the_port(tmp_path, capsys):
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]  # free once closed: nothing listens there
+    ready_file = tmp_path / "ready.json"
+    write_ready(ready_file, port)
+    assert cli.main(["ready", "--ready-file", str(ready_file)]) == 1
+    assert "not listening" in capsys.readouterr().out
+
+
+def test_ready_once_warm_and_listening(tmp_path):
+    with socket.socket() as server:
+        server.bind(("127.0.0.1", 0))
+        server.listen()
+        ready_file = tmp_path / "ready.json"
+        write_ready(ready_file, server.getsockname()[1])
+        assert cli.main(["ready", "--ready-file", str(ready_file)]) == 0
+
+
+def test_serve_records_the_streamlit_port(monkeypatch):
+    monkeypatch.delenv("STREAMLIT_SERVER_PORT", raising=False)
+    assert cli._streamlit_port(["--server.port", "9000"]) == 9000
+    assert cli._streamlit_port(["--server.port=9001"]) == 9001
+    assert cli._streamlit_port([]) == 8501
@@ -0,0 +1,30 @@
+import os
+
+from outbound_engine.graph import MemoryMemo
+from outbound_engine.session import MemoryBudget, SessionData
+
+
+def blob(seed: int) -> str:
+    return os.urandom(4096).hex() + str(seed)  # random, so compression can't shrink it below the budget
+
+
+def test_session_and_memo_share_one_ceiling():
+    data = SessionData(MemoryBudget(max_bytes=20_000))
+    memo = MemoryMemo(budget=data.budget)
+    data.hypothesis = blob(0)
+    for i in range(4):
+        memo.put(f"key-{i}", blob(i))
+
+    assert data.budget.used <= 20_000
+    assert data.budget.used == data.footprint()["memory_bytes"] + memo.footprint()["memory_bytes"]
+    assert data.footprint()["disk_bytes"] > 0  # the oldest entry was the session's, so it spilled first
+    assert data.hypothesis.endswith("0") and memo.get("key-3").endswith("3")
+
+
+def test_reset_returns_bytes_to_the_budget():
+    data = SessionData()
+    data.hypothesis = "hypothesis"
+    data.sequences = {"lane": {"name": "Lane", "content": "sequence"}}
+    data.reset()
+    assert data.budget.used == 0
+    assert data.hypothesis is None and data.sequences == {}
@@ -0,0 +1,89 @@
+import os
+
+from outbound_engine.validation import parse_steps, validate_sequence
+
+
+def codes(sequence: str) -> set:
+    return validate_sequence(sequence).codes()
+
+
+def test_known_good_sequence_has_no_findings(good_sequence):
+    report = validate_sequence(good_sequence)
+    assert report.ok
+    assert report.findings == []
+    assert len(report.core_steps) == 12
+    assert [s.day for s in report.linkedin_only_steps] == [1, 3, 5, 9]
+
+
+def test_parse_steps_reads_channels_and_subjects(good_sequence):
+    steps = parse_steps(good_sequence)
+    assert [(s.day, s.channel) for s in steps[:3]] == [(1, "Email"), (1, "LinkedIn"), (1, "Phone")]
+    assert steps[0].subject == "platform team at [Company]"
+    assert all(s.channel == "LinkedIn" for s in steps if s.linkedin_only)
+
+
+def test_layout_missing_step(good_sequence):
+    without_day_9_call = good_sequence.replace(
+        "## Step 9: Call (Day 9)\n**Type:** Phone\n**Opener:** Following up on the monorepo note.\n\n", "")
+    report = validate_sequence(without_day_9_call)
+    assert "missing_step" in report.codes()
+    assert "step_numbering" in report.codes()
+    assert not report.ok
+
+
+def test_layout_day_order(good_sequence):
+    assert "day_order" in codes(good_sequence.replace("## Step 9: Call (Day 9)", "## Step 9: Call (Day 2)"))
+
+
+def test_layout_missing_linkedin_only_step(good_sequence):
+    sequence = good_sequence.replace(
+        "## Step 4: Message (Day 9)\n**Message:** Last note from me here. If developer tooling comes up this year, let me know.\n", "")
+    assert "missing_linkedin_only_step" in codes(sequence)
+
+
+def test_same_thread_reply_with_new_subject(good_sequence):
+    sequence = good_sequence.replace("**Subject:** re: platform team at [Company]", "**Subject:** another idea", 1)
+    assert "thread_new_subject" in codes(sequence)
+
+
+def test_new_thread_reusing_first_subject(good_sequence):
+    sequence = good_sequence.replace("**Subject:** cycle time at [Company]", "**Subject:** re: platform team at [Company]")
+    assert "thread_not_new" in codes(sequence)
+
+
+def test_subject_case(good_sequence):
+    assert "subject_case" in codes(good_sequence.replace("**Subject:** closing the loop", "**Subject:** Closing The Loop"))
+
+
+def test_missing_cta(good_sequence):
+    sequence = good_sequence.replace("Would a ten minute walkthrough help?", "Here is a ten minute walkthrough.")
+    report = validate_sequence(sequence)
+    assert [f.step for f in report.findings if f.code == "missing_cta"] == ["Step 8 (Day 8)"]
+    assert report.ok  # warnings only
+
+
+def test_banned_phrase(good_sequence):
+    sequence = good_sequence.replace("Adding one data point:", "Hope this finds you well. Adding one data point:")
+    assert "banned_phrase" in codes(sequence)
+    assert "banned_phrase" in validate_sequence(good_sequence.replace("monorepo", "synergy"), ["synergy"]).codes()
+
+
+def test_repeated_opener(good_sequence):
+    sequence = good_sequence.replace("Most leaders I talk to measure", "Adding one data point: onboarding time dropped by half. Measure")
+    report = validate_sequence(sequence)
+    assert [f.step for f in report.findings if f.code == "repeated_opener"] == ["Step 6 (Day 5)"]
+
+
+def test_no_steps():
+    assert validate_sequence("Just some prose, no headers.").codes() == {"no_steps"}
+
+
+def test_banned_phrases_follow_the_kb_root_and_its_edits(tmp_path, good_sequence):
+    voice = tmp_path / "kb" / "voice.md"
+    voice.parent.mkdir()
+    voice.write_text('- **NO**: "monorepo"\n', encoding="utf-8")
+    assert "banned_phrase" in validate_sequence(good_sequence, root=tmp_path).codes()
+
+    voice.write_text('- **NO**: "synergy", "circle back"\n', encoding="utf-8")
+    os.utime(voice, ns=(voice.stat().st_atime_ns, voice.stat().st_mtime_ns + 10**9))  # a later edit
+    assert "banned_phrase" not in validate_sequence(good_sequence, root=tmp_path).codes()